@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ai"
+
+    def ready(self):
+        # registra os signals que mantêm o índice de busca atualizado
+        from ai import signals  # noqa: F401
@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from common.keyword_index import fold
+
+# Filtros estruturados da busca de candidatos.
+# Os atributos de cada linha do CandidateIndex ficam em arrays paralelos à
+# matriz de embeddings; cada filtro vira uma máscara booleana (bitmap) sobre
+# as linhas, memorizada (LRU de MAX_BITMAPS) até a próxima alteração. A busca
+# só pontua as linhas que passam no filtro.
+
+FILTER_FIELDS = ("location", "current_position", "min_years", "max_years", "skills")
+
+# anos de experiência não informados: nunca passam em min_years / max_years
+UNKNOWN_YEARS = -1
+
+# bitmaps memorizados por instância (chaves vêm de valores livres dos filtros)
+MAX_BITMAPS = 256
+
+
+def parse_filters(data) -> dict:
+    """
+    Valida os filtros vindos da API e devolve a forma normalizada
+    (textos sem acento/minúsculos, skills ordenadas), ou None se vazio.
+    Levanta ValueError se algum filtro for inválido.
+    """
+    if not data:
+        return None
+    if not isinstance(data, dict):
+        raise ValueError("filters deve ser um objeto.")
+
+    unknown = set(data) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"filtros desconhecidos: {', '.join(sorted(unknown))}.")
+
+    filters = {}
+    for field in ("location", "current_position"):
+        if data.get(field):
+            filters[field] = fold(str(data[field]))
+
+    for field in ("min_years", "max_years"):
+        if data.get(field) not in (None, ""):
+            try:
+                filters[field] = int(data[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} deve ser inteiro.")
+
+    skills = data.get("skills") or []
+    if isinstance(skills, str):
+        skills = [skills]
+    if not isinstance(skills, list):
+        raise ValueError("skills deve ser uma lista.")
+    skills = sorted({fold(str(s)) for s in skills} - {""})
+    if skills:
+        filters["skills"] = skills
+
+    return filters or None
+
+
+def row_attributes(location, years_experience, current_position, word_cloud) -> tuple:
+    """Atributos filtráveis de um vínculo, já normalizados."""
+    skills = frozenset(fold(e) for e in (word_cloud or []) if isinstance(e, str)) - {""}
+    years = UNKNOWN_YEARS if years_experience in (None, "") else int(years_experience)
+    return fold(location), years, fold(current_position), skills
+
+
+class CandidateAttributes:
+    """
+    Arrays paralelos às linhas do CandidateIndex (mesma ordem).
+    Imutável: alterações devolvem uma nova instância, como a matriz.
+    """
+
+    FIELDS = ("locations", "years", "positions", "skills")
+
+    def __init__(self, rows=()):
+        rows = list(rows)
+        self.locations = np.array([r[0] for r in rows], dtype=object)
+        self.years = np.array([r[1] for r in rows], dtype=np.int64)
+        self.positions = np.array([r[2] for r in rows], dtype=object)
+        self.skills = np.empty(len(rows), dtype=object)
+        self.skills[:] = [r[3] for r in rows]
+        self._bitmaps = OrderedDict()
+        self._bitmaps_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.years)
+
+    def _with(self, **arrays) -> "CandidateAttributes":
+        new = CandidateAttributes()
+        for field in self.FIELDS:
+            setattr(new, field, arrays.get(field, getattr(self, field)))
+        return new
+
+    def insert(self, pos: int, row: tuple) -> "CandidateAttributes":
+        skills = np.empty(1, dtype=object)
+        skills[0] = row[3]
+        return self._with(
+            locations=np.insert(self.locations, pos, row[0]),
+            years=np.insert(self.years, pos, row[1]),
+            positions=np.insert(self.positions, pos, row[2]),
+            skills=np.insert(self.skills, pos, skills),
+        )
+
+    def take(self, keep: np.ndarray) -> "CandidateAttributes":
+        return self._with(**{field: getattr(self, field)[keep] for field in self.FIELDS})
+
+    def replace(self, mask: np.ndarray, row: tuple, fields=FIELDS) -> "CandidateAttributes":
+        """Nova instância com os valores de `row` nos `fields` das linhas de `mask`."""
+        arrays = {}
+        for field, value in zip(self.FIELDS, row):
+            if field in fields:
+                array = getattr(self, field).copy()
+                for i in np.flatnonzero(mask):
+                    array[i] = value
+                arrays[field] = array
+        return self._with(**arrays)
+
+    # -------------------------
+    # BITMAPS
+    # -------------------------
+    def clear_bitmaps(self):
+        with self._bitmaps_lock:
+            self._bitmaps.clear()
+
+    def _compute_bitmap(self, field: str, value) -> np.ndarray:
+        if field == "location":
+            return np.fromiter((value in v for v in self.locations), bool, len(self))
+        if field == "current_position":
+            return np.fromiter((value in v for v in self.positions), bool, len(self))
+        if field == "min_years":
+            return (self.years != UNKNOWN_YEARS) & (self.years >= value)
+        if field == "max_years":
+            return (self.years != UNKNOWN_YEARS) & (self.years <= value)
+        # skill
+        return np.fromiter((value in v for v in self.skills), bool, len(self))
+
+    def _bitmap(self, field: str, value):
+        key = (field, value)
+        with self._bitmaps_lock:
+            bitmap = self._bitmaps.get(key)
+            if bitmap is not None:
+                self._bitmaps.move_to_end(key)
+                return bitmap
+
+        bitmap = self._compute_bitmap(field, value)
+        with self._bitmaps_lock:
+            self._bitmaps[key] = bitmap
+            while len(self._bitmaps) > MAX_BITMAPS:
+                self._bitmaps.popitem(last=False)
+        return bitmap
+
+    def mask(self, filters: dict):
+        """AND dos bitmaps de cada filtro (None = sem filtro)."""
+        if not filters:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for field, value in filters.items():
+            if field == "skills":
+                for skill in value:
+                    mask &= self._bitmap("skill", skill)
+            else:
+                mask &= self._bitmap(field, value)
+        return mask
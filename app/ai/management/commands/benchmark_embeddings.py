@@ -0,0 +1,55 @@
+import glob
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from project import settings
+from common.embedding_backends import get_backend, parity_check
+from rh.pdf_extractor import extract_pdf_text
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara backends de embedding (paridade de cosseno e latência) "
+        "usando os PDFs de exemplo em app/uploads/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+        parser.add_argument("--pdf-dir", default=os.path.join(settings.BASE_DIR, "uploads"))
+        parser.add_argument("--threshold", type=float, default=0.99,
+                            help="Cosseno mínimo por texto contra o backend torch.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=32)
+
+    def handle(self, *args, **options):
+        texts = [extract_pdf_text(p) for p in sorted(glob.glob(os.path.join(options["pdf_dir"], "*.pdf")))]
+        texts = [t for t in texts if t]
+        if not texts:
+            self.stderr.write("nenhum PDF com texto encontrado")
+            return
+
+        reference = get_backend("torch")
+        self.stdout.write(f"{len(texts)} textos, {options['repeat']} repetições\n")
+        self.stdout.write(f"{'backend':<12}{'ms/lote':>10}{'textos/s':>10}{'cos médio':>11}{'cos mín':>9}  paridade")
+
+        for name in options["backends"]:
+            try:
+                backend = get_backend(name)
+            except (RuntimeError, OSError) as e:
+                self.stdout.write(f"{name:<12}indisponível: {e}")
+                continue
+
+            backend.encode(texts[:1])  # aquecimento
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                backend.encode(texts, batch_size=options["batch_size"])
+            elapsed = (time.perf_counter() - start) / options["repeat"]
+
+            parity = parity_check(reference, backend, texts, threshold=options["threshold"])
+            self.stdout.write(
+                f"{name:<12}{elapsed * 1000:>10.1f}{len(texts) / elapsed:>10.1f}"
+                f"{parity['mean_cos']:>11.4f}{parity['min_cos']:>9.4f}  "
+                f"{'ok' if parity['ok'] else 'FALHOU'}"
+            )
@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from company.models import FileCandidate
+from common.embedding import EMBEDDING_DIM, vector_from_bytes
+from common.quantization import Quantizer
+from common.vector_ops import normalize_rows, top_k
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a busca exata em float32 com a primeira passada quantizada "
+        "(int8 / binary) + re-rank em float: memória, recall@k e latência."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Usa N vetores aleatórios em vez das embeddings do banco.")
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--rerank", type=int, default=200)
+        parser.add_argument("--modes", nargs="+", default=["int8", "binary"])
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        if options["synthetic"]:
+            matrix = rng.standard_normal((options["synthetic"], EMBEDDING_DIM)).astype(np.float32)
+        else:
+            vectors = [
+                vector_from_bytes(e)
+                for e in FileCandidate.objects
+                .filter(file__embedding__isnull=False)
+                .values_list("file__embedding", flat=True)
+            ]
+            vectors = [v for v in vectors if len(v) == EMBEDDING_DIM]
+            if not vectors:
+                self.stderr.write("nenhuma embedding no banco (use --synthetic N)")
+                return
+            matrix = np.stack(vectors)
+        matrix = normalize_rows(matrix)
+
+        # consultas: vetores do corpus com ruído (parecido com prompts reais)
+        picks = rng.integers(0, len(matrix), options["queries"])
+        noise = rng.standard_normal((len(picks), EMBEDDING_DIM)).astype(np.float32)
+        queries = normalize_rows(matrix[picks] + 0.5 * noise / np.sqrt(EMBEDDING_DIM))
+
+        k = min(options["k"], len(matrix))
+        n = len(matrix)
+
+        start = time.perf_counter()
+        exact = [set(top_k(matrix @ q, k).tolist()) for q in queries]
+        exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        self.stdout.write(f"{n} vetores, {len(queries)} consultas, k={k}, re-rank={options['rerank']}\n")
+        self.stdout.write(f"{'modo':<8}{'memória':>12}{'ms/consulta':>13}{'recall@k':>10}")
+        self.stdout.write(f"{'float32':<8}{Quantizer.nbytes(n, EMBEDDING_DIM, 'none') / 2**20:>10.2f}MB{exact_ms:>13.2f}{1.0:>10.3f}")
+
+        for mode in options["modes"]:
+            quantizer = Quantizer(mode).fit(matrix)
+            codes = quantizer.encode(matrix)
+
+            hits = 0
+            start = time.perf_counter()
+            for q, truth in zip(queries, exact):
+                first = top_k(quantizer.scores(codes, q), max(k, options["rerank"]))
+                # o re-rank lê só as linhas candidatas em float (no servidor: do banco)
+                best = first[top_k(matrix[first] @ q, k)]
+                hits += len(truth.intersection(best.tolist()))
+            elapsed_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            self.stdout.write(
+                f"{mode:<8}{Quantizer.nbytes(n, EMBEDDING_DIM, mode) / 2**20:>10.2f}MB"
+                f"{elapsed_ms:>13.2f}{hits / (k * len(queries)):>10.3f}"
+            )
@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from common.embedding import EMBEDDING_DIM
+from common.vector_ops import (
+    cosine_matrix, cosine_sim, matrix_top_k, normalize_rows, top_k, top_k_rows,
+)
+
+
+def timed(fn, repeat: int) -> float:
+    """Melhor tempo (ms) entre `repeat` execuções."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmarks dos kernels de common/vector_ops.py contra a forma "
+        "ingênua equivalente (loop/argsort/matriz inteira)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=100_000, help="Linhas do corpus sintético.")
+        parser.add_argument("--queries", type=int, default=64)
+        parser.add_argument("--k", type=int, default=50)
+        parser.add_argument("--block", type=int, default=16_384, help="Linhas por bloco no top-k em blocos.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        n, k, repeat = options["n"], options["k"], options["repeat"]
+        matrix = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+        queries = rng.standard_normal((options["queries"], EMBEDDING_DIM)).astype(np.float32)
+        unit = normalize_rows(matrix)
+        unit_queries = normalize_rows(queries)
+        sample = matrix[:2000]
+
+        def naive_normalize():
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return matrix / norms
+
+        def naive_cosine():
+            # um cosine_sim por par, como os helpers antigos
+            return [
+                float(np.dot(queries[0], v) / (np.linalg.norm(queries[0]) * np.linalg.norm(v)))
+                for v in sample
+            ]
+
+        scores = unit @ unit_queries[0]
+        all_scores = unit_queries @ unit.T
+
+        rows = [
+            ("normalização (N, d)", naive_normalize, lambda: normalize_rows(matrix)),
+            ("cosseno 1 x 2000", naive_cosine, lambda: cosine_matrix(queries[:1], sample)),
+            ("top-k 1 consulta", lambda: np.argsort(-scores)[:k], lambda: top_k(scores, k)),
+            ("top-k (Q, N)", lambda: np.argsort(-all_scores, axis=1)[:, :k], lambda: top_k_rows(all_scores, k)),
+            (
+                "score + top-k (Q, N)",
+                lambda: top_k_rows(unit_queries @ unit.T, k),
+                lambda: matrix_top_k(unit_queries, unit, k, block=options["block"]),
+            ),
+        ]
+
+        self.stdout.write(
+            f"N={n}, d={EMBEDDING_DIM}, Q={len(queries)}, k={k}, bloco={options['block']} "
+            f"(melhor de {repeat})\n"
+        )
+        self.stdout.write(f"{'kernel':<24}{'ingênuo ms':>12}{'vector_ops ms':>15}{'ganho':>8}")
+        for name, naive, kernel in rows:
+            naive_ms = timed(naive, repeat)
+            kernel_ms = timed(kernel, repeat)
+            self.stdout.write(f"{name:<24}{naive_ms:>12.2f}{kernel_ms:>15.2f}{naive_ms / kernel_ms:>7.1f}x")
+
+        # memória de pico da matriz de scores: inteira x um bloco
+        full_mb = len(queries) * n * 4 / 2 ** 20
+        block_mb = len(queries) * min(options["block"], n) * 4 / 2 ** 20
+        self.stdout.write(f"\nscores (Q, N) inteira: {full_mb:.1f} MB; por bloco: {block_mb:.1f} MB")
+        self.stdout.write(f"cosine_sim com vetor vazio [0.0]: {cosine_sim([0.0], queries[0])}")
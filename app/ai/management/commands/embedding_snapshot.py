@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.search import corpus_epoch, corpus_version, fetch_tenant_rows
+from ai.snapshot import SnapshotStore, tenant_key
+from company.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava o snapshot em disco (.npy + manifest) das embeddings de cada empresa. "
+        "Com --watch, regrava só as empresas cuja corpus_version ou corpus_epoch mudou."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Pasta do snapshot (padrão: EMBEDDING_SNAPSHOT_DIR).")
+        parser.add_argument("--force", action="store_true",
+                            help="Regrava todas as empresas, mesmo as já atualizadas.")
+        parser.add_argument("--watch", action="store_true",
+                            help="Fica rodando e atualiza o snapshot incrementalmente.")
+        parser.add_argument("--interval", type=float, default=30.0,
+                            help="Segundos entre verificações no modo --watch.")
+
+    def handle(self, *args, **options):
+        store = SnapshotStore(options["path"])
+        if not store.enabled:
+            raise CommandError("defina EMBEDDING_SNAPSHOT_DIR ou use --path")
+
+        force = options["force"]
+        while True:
+            self.refresh(store, force)
+            if not options["watch"]:
+                return
+            force = False
+            time.sleep(options["interval"])
+
+    def refresh(self, store: SnapshotStore, force: bool):
+        tenants = store.manifest()["tenants"]
+        for company_id in [None, *Company.objects.values_list("id", flat=True)]:
+            # versão e epoch lidos ANTES das linhas: se algo mudar durante a
+            # leitura, o snapshot fica com os antigos e é regravado na próxima volta
+            version = corpus_version(company_id)
+            epoch = corpus_epoch(company_id)
+            entry = tenants.get(tenant_key(company_id))
+            if not force and entry and entry["version"] == version and entry.get("epoch") == epoch:
+                continue
+
+            start = time.monotonic()
+            entry = store.write(company_id, version, epoch, fetch_tenant_rows(company_id))
+            self.stdout.write(
+                f"empresa {tenant_key(company_id)}: v{version}, {entry['rows']} linhas, "
+                f"{entry['passages']} trechos ({time.monotonic() - start:.1f}s)"
+            )
@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from access.models import User
+from ai.matching import match_job_descriptions
+
+
+class Command(BaseCommand):
+    help = (
+        "Match em lote de descrições de vaga contra os candidatos da empresa do usuário; "
+        "grava uma Queries por vaga e as Indication dos melhores candidatos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Arquivo .json (lista de textos) ou .txt (uma vaga por linha).")
+        parser.add_argument("--user", required=True, help="E-mail do usuário dono das buscas.")
+        parser.add_argument("--top-n", type=int, default=5)
+        parser.add_argument("--memory-mb", type=int, default=None,
+                            help="Teto de memória dos blocos de scores (padrão: SEARCH_BATCH_MEMORY_MB).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"usuário não encontrado: {options['user']}")
+
+        with open(options["input"], encoding="utf-8") as f:
+            if options["input"].endswith(".json"):
+                descriptions = json.load(f)
+            else:
+                descriptions = [line.strip() for line in f if line.strip()]
+
+        start = time.monotonic()
+        matches = match_job_descriptions(
+            user, descriptions, top_n=options["top_n"], memory_mb=options["memory_mb"]
+        )
+        elapsed = time.monotonic() - start
+
+        for m in matches:
+            ranking = ", ".join(f"{r['candidate_id']} ({r['score']:.3f})" for r in m["results"])
+            self.stdout.write(f"#{m['query'].id} {m['query'].ask[:60]}: {ranking or '-'}")
+        self.stdout.write(self.style.SUCCESS(f"{len(matches)} vagas em {elapsed:.2f}s"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from project import settings
+from common.model_server import ModelServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Sobe o servidor local de modelos (SentenceTransformer + spaCy) num Unix socket. "
+        "Os workers usam-no quando MODEL_SERVER_SOCKET aponta para o mesmo caminho."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.MODEL_SERVER_SOCKET or "/tmp/central-talentos-models.sock")
+        parser.add_argument("--max-batch", type=int, default=64,
+                            help="Máximo de textos por lote do micro-batching.")
+        parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                            help="Espera máxima por outras requests antes de rodar o lote.")
+
+    def handle(self, *args, **options):
+        server = ModelServer(
+            options["socket"],
+            max_batch=options["max_batch"],
+            max_wait=options["max_wait_ms"] / 1000,
+        )
+        self.stdout.write(self.style.SUCCESS(f"model server ouvindo em {options['socket']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
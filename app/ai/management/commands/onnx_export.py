@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from project import settings
+from common.embedding_backends import export_onnx
+
+
+class Command(BaseCommand):
+    help = "Exporta o all-MiniLM-L6-v2 para ONNX (EMBEDDING_BACKEND=onnx / onnx-int8)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.EMBEDDING_ONNX_DIR)
+        parser.add_argument("--no-quantize", action="store_true",
+                            help="Não gera a versão int8 (model.int8.onnx).")
+
+    def handle(self, *args, **options):
+        manifest = export_onnx(options["output"], quantize=not options["no_quantize"])
+        self.stdout.write(self.style.SUCCESS(f"modelo exportado em {options['output']}: {manifest}"))
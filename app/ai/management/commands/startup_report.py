@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from common.model_loader import import_report, warm_up, HEAVY_DEPENDENCIES
+
+
+class Command(BaseCommand):
+    help = "Mostra o tempo de import de cada dependência pesada e, opcionalmente, o carregamento dos modelos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", action="store_true",
+                            help="Também carrega SentenceTransformer e spaCy e mede o tempo.")
+
+    def handle(self, *args, **options):
+        # com o carregamento lazy, o django.setup() não deve ter puxado nada disso
+        loaded = [m for m in HEAVY_DEPENDENCIES if m in sys.modules]
+        self.stdout.write(f"já importados no boot do Django: {', '.join(loaded) or 'nenhum'}")
+
+        self.stdout.write("\nimport (interpretador isolado):")
+        for module, secs in import_report().items():
+            value = "não instalado" if secs is None else f"{secs:.3f}s"
+            self.stdout.write(f"  {module:<24}{value}")
+
+        if options["models"]:
+            self.stdout.write("\ncarregamento dos modelos:")
+            for name, secs in warm_up().items():
+                self.stdout.write(f"  {name:<24}{secs:.3f}s")
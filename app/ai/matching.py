@@ -0,0 +1,49 @@
+from django.db import transaction
+
+from ai.models import Indication, Queries
+from ai.search import candidate_index
+from common.embedding import create_embeddings
+
+
+def match_job_descriptions(user, descriptions: list, top_n: int = 5, memory_mb: int = None) -> list:
+    """
+    Match em lote de várias descrições de vaga contra os candidatos da
+    empresa do usuário (em vez de um find_best_candidates por vaga):
+    - embeddings de todas as descrições num único encode
+    - uma passada em blocos pela matriz (CandidateIndex.search_batch)
+    - uma Queries por vaga e as indicações (top_n candidatos) num bulk_create
+
+    Retorna [{"query": Queries, "results": [{"candidate_id", "file_id", "score"}, ...]}, ...].
+    """
+    descriptions = [d for d in descriptions if d and d.strip()]
+    if not descriptions:
+        return []
+
+    vectors = create_embeddings(descriptions)
+    # top_n * 4 vínculos por vaga: um candidato pode ter vários arquivos
+    hits = candidate_index(user.company_id).search_batch(vectors, k=top_n * 4, memory_mb=memory_mb)
+
+    matches = []
+    with transaction.atomic():
+        indications = []
+        for description, query_hits in zip(descriptions, hits):
+            query = Queries.objects.create(ask=description, user=user)
+
+            results, seen = [], set()
+            for file_id, candidate_id, score in query_hits:
+                if candidate_id in seen:
+                    continue
+                seen.add(candidate_id)
+                results.append({"candidate_id": candidate_id, "file_id": file_id, "score": score})
+                if len(results) == top_n:
+                    break
+
+            indications.extend(
+                Indication(query=query, candidate_id=r["candidate_id"], file_id=r["file_id"], score=r["score"], rank=rank)
+                for rank, r in enumerate(results)
+            )
+            matches.append({"query": query, "results": results})
+
+        Indication.objects.bulk_create(indications)
+
+    return matches
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0006_file_embedding_version'),
+        ('ai', '0003_alter_queries_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indication',
+            name='file',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='indications', to='rh.file', verbose_name='Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='indication',
+            name='rank',
+            field=models.PositiveIntegerField(default=0, verbose_name='Posição'),
+        ),
+        migrations.AddField(
+            model_name='indication',
+            name='score',
+            field=models.FloatField(blank=True, null=True, verbose_name='Score'),
+        ),
+    ]
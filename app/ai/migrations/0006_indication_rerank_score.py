@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_corpusversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indication',
+            name='rerank_score',
+            field=models.FloatField(blank=True, null=True, verbose_name='Score do re-rank'),
+        ),
+    ]
@@ -1,20 +1,12 @@
 from django.db import models
 from access.models import User
 from company.models import Candidate
-import numpy as np
-from numpy.linalg import norm
 from django.db import models
 from django.db.models import JSONField
 
 from rh.models import File  # seu modelo de arquivos
 from common.embedding import create_embedding  # função que você escreveu
-
-
-def cosine_sim(v1, v2):
-    """Cosine similarity entre dois vetores."""
-    v1 = np.array(v1)
-    v2 = np.array(v2)
-    return float(np.dot(v1, v2) / (norm(v1) * norm(v2)))
+from ai.search import candidate_index
 
 
 class Queries(models.Model):
@@ -51,10 +43,28 @@ class Queries(models.Model):
         """Verifica se a query já foi respondida."""
         return bool(self.answer and self.answer.strip())
 
-    def create_indication(self, candidate):
+    def create_indication(self, candidate, file=None, score=None, rank=0):
         """Cria uma indicação associada a esta query e a um candidato."""
         from .models import Indication  # evita import circular
-        return Indication.objects.create(candidate=candidate, query=self)
+        return Indication.objects.create(candidate=candidate, query=self, file=file, score=score, rank=rank)
+
+    def save_results(self, results: list):
+        """
+        Grava o ranking da busca como indicações (um bulk_create).
+        `results`: [{"id" ou "candidate_id", "file_id", "score", "rerank_score"}, ...] já ordenados.
+        """
+        from .models import Indication  # evita import circular
+        return Indication.objects.bulk_create([
+            Indication(
+                query=self,
+                candidate_id=r.get("candidate_id", r.get("id")),
+                file_id=r.get("file_id"),
+                score=r.get("score"),
+                rerank_score=r.get("rerank_score"),
+                rank=rank,
+            )
+            for rank, r in enumerate(results)
+        ])
 
     # -------------------------
     # MATCH SEMÂNTICO (LLM)
@@ -62,35 +72,32 @@ class Queries(models.Model):
     def find_best_candidates(self, job_description: str, top_n: int = 5):
         """
         Gera embedding da descrição da vaga,
-        compara com todos os candidatos processados,
-        e retorna os melhores matches.
+        compara com a matriz de embeddings em cache (ai.search)
+        da empresa do usuário e retorna os melhores matches.
         """
 
         # Embedding da vaga
         job_emb = create_embedding(job_description)
 
-        candidates = File.objects.filter(processed=True)
-        scored = []
-
-        for c in candidates:
-            # Ignorar candidatos sem embedding
-            if not c.embedding:
-                continue
+        # matriz normalizada em cache: um produto matriz-vetor + top-k
+        hits = candidate_index(self.user.company_id).search(job_emb, k=top_n * 4)
 
-            try:
-                sim = cosine_sim(job_emb, c.embedding)
-            except Exception:
+        scored = []
+        seen = set()
+        for file_id, _, sim in hits:
+            if file_id in seen:
                 continue
+            seen.add(file_id)
+            scored.append({"file_id": file_id, "similaridade": sim})
 
-            scored.append({
-                "candidate": c,
-                "similaridade": sim,
-            })
-
-        # Ordena do maior para o menor
-        scored.sort(key=lambda x: x["similaridade"], reverse=True)
+        scored = scored[:top_n]
+        files = File.objects.filter(processed=True).in_bulk([s["file_id"] for s in scored])
 
-        return scored[:top_n]
+        return [
+            {"candidate": files[s["file_id"]], "similaridade": s["similaridade"]}
+            for s in scored
+            if s["file_id"] in files
+        ]
 
 
 class Indication(models.Model):
@@ -113,6 +120,20 @@ class Indication(models.Model):
         verbose_name="Candidato"
     )
 
+    # arquivo que deu o match e o score da busca (reabrir a busca não recalcula)
+    file = models.ForeignKey(
+        File,
+        on_delete=models.SET_NULL,
+        related_name="indications",
+        verbose_name="Arquivo",
+        null=True,
+        blank=True
+    )
+    score = models.FloatField("Score", null=True, blank=True)
+    # score do cross-encoder (outra escala); só nos hits re-ranqueados
+    rerank_score = models.FloatField("Score do re-rank", null=True, blank=True)
+    rank = models.PositiveIntegerField("Posição", default=0)
+
     class Meta:
         verbose_name = "Indicação"
         verbose_name_plural = "Indicações"
@@ -129,4 +150,22 @@ class Indication(models.Model):
 
     def get_candidate(self):
         """Retorna o candidato associado."""
-        return self.candidate
\ No newline at end of file
+        return self.candidate
+
+class CorpusVersion(models.Model):
+    """
+    Versão do corpus buscável de uma empresa (ai.search.corpus_version).
+    No banco, e não no cache, para ser a mesma em todos os processos e
+    sobreviver a restart / flush: só cresce, nunca volta a um valor que
+    um índice antigo já tenha lido.
+    """
+    # ai.snapshot.tenant_key: id da empresa ou "none"
+    tenant = models.CharField(max_length=32, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versão do corpus"
+        verbose_name_plural = "Versões do corpus"
+
+    def __str__(self):
+        return f"{self.tenant}: v{self.version}"
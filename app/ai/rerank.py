@@ -0,0 +1,110 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+from django.db import close_old_connections
+
+from project import settings
+from common.embedding import split_passages
+from common.model_loader import get_cross_encoder
+from rh.models import File
+
+logger = logging.getLogger(__name__)
+
+# Re-rank do prompt com cross-encoder.
+# O score do bi-encoder (cosseno) ordena o corpus inteiro; o cross-encoder
+# lê pergunta + trecho juntos e é bem mais preciso, mas custa uma inferência
+# por par. Por isso só os SEARCH_CROSS_ENCODER_TOP_K primeiros hits passam
+# por ele, num único lote, e com orçamento de tempo por request (que cobre
+# também a leitura dos trechos no banco): se não termina a tempo, a resposta
+# sai na ordem do bi-encoder.
+# O score do cross-encoder (logit, outra escala) só define a ordem do topo e
+# volta à parte ("rerank_score"): o score de cada hit continua o da busca.
+
+
+def best_passages(query_emb, file_ids: list) -> dict:
+    """
+    {file_id: texto} com o trecho de cada arquivo mais próximo da pergunta
+    (pelas embeddings de trecho já gravadas); sem trechos, o começo do texto.
+    """
+    query = np.asarray(query_emb, dtype=np.float32)
+    files = File.objects.filter(id__in=file_ids).only("id", "full_text", "passage_embeddings")
+
+    texts = {}
+    for f in files:
+        vectors = f.passage_vectors
+        passages = split_passages(f.full_text) if len(vectors) else []
+        if passages and len(passages) == len(vectors) and len(query) == vectors.shape[1]:
+            texts[f.id] = passages[int(np.argmax(vectors @ query))]
+        else:
+            words = (f.full_text or "").split()
+            texts[f.id] = " ".join(words[:settings.EMBEDDING_PASSAGE_WORDS])
+    return texts
+
+
+class CrossEncoderReranker:
+
+    def __init__(self, model_name: str = None, top_k: int = None, budget_ms: int = None):
+        self.model_name = model_name
+        self.top_k = top_k
+        self.budget_ms = budget_ms
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_name or settings.SEARCH_CROSS_ENCODER)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                settings.SEARCH_CROSS_ENCODER_WORKERS, thread_name_prefix="rerank"
+            )
+        return self._executor
+
+    def _predict(self, query_text: str, passages: list) -> np.ndarray:
+        model = get_cross_encoder(self.model_name or settings.SEARCH_CROSS_ENCODER)
+        pairs = [(query_text, p) for p in passages]
+        return np.asarray(model.predict(pairs, batch_size=len(pairs)), dtype=np.float32)
+
+    def _score(self, query_text: str, query_emb, file_ids: list) -> np.ndarray:
+        """Roda no executor: trechos (banco) + cross-encoder, tudo dentro do orçamento."""
+        # conexão própria da thread: tratada como a de uma request
+        close_old_connections()
+        try:
+            texts = best_passages(query_emb, file_ids)
+            return self._predict(query_text, [texts.get(file_id, "") for file_id in file_ids])
+        finally:
+            close_old_connections()
+
+    def rerank(self, query_text: str, query_emb, hits: list, budget_ms: int = None):
+        """
+        Re-pontua os primeiros hits [(file_id, candidate_id, score), ...]
+        com o cross-encoder. Retorna (hits, rerank_scores): os re-pontuados
+        vêm primeiro, na ordem do cross-encoder e com o score da busca; os
+        demais seguem na ordem original. rerank_scores = {file_id: score do
+        cross-encoder}. Se o orçamento estourar, devolve (`hits`, {}).
+        """
+        top_k = self.top_k or settings.SEARCH_CROSS_ENCODER_TOP_K
+        budget = (budget_ms or self.budget_ms or settings.SEARCH_CROSS_ENCODER_BUDGET_MS) / 1000
+        head, tail = hits[:top_k], hits[top_k:]
+        if len(head) < 2:
+            return hits, {}
+
+        future = self.executor.submit(self._score, query_text, query_emb, [file_id for file_id, _, _ in head])
+        try:
+            scores = future.result(timeout=budget)
+        except TimeoutError:
+            # o lote termina em segundo plano; a request não espera
+            future.cancel()
+            logger.info("re-rank excedeu %.0f ms; usando a ordem do bi-encoder", budget * 1000)
+            return hits, {}
+        except Exception as e:
+            logger.warning("re-rank falhou (%s); usando a ordem do bi-encoder", e)
+            return hits, {}
+
+        order = np.argsort(-scores, kind="stable")
+        return [head[i] for i in order] + tail, {head[i][0]: float(scores[i]) for i in order}
+
+
+reranker = CrossEncoderReranker()
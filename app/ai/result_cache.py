@@ -0,0 +1,70 @@
+import numpy as np
+from django.core.cache import cache
+
+from project import settings
+from ai.search import corpus_version
+from common.embedding import vector_from_bytes, vector_to_bytes
+from common.vector_ops import normalize_rows, unit_vector
+
+
+class ResultCache:
+    """
+    Cache semântico de resultados do prompt, por empresa.
+
+    Guarda os últimos rankings (embedding do prompt + resultado + versão
+    do corpus). Um prompt novo reaproveita um ranking quando:
+    - o cosseno com um prompt recente da mesma empresa >= threshold
+    - os parâmetros da busca são os mesmos
+    - o corpus da empresa não mudou (mesma corpus_version)
+    Qualquer arquivo/vínculo adicionado ou removido muda a versão e
+    invalida as entradas antigas.
+    """
+
+    def __init__(self, threshold: float = None, size: int = None, timeout: int = None):
+        self.threshold = threshold or settings.SEARCH_RESULT_CACHE_THRESHOLD
+        self.size = size or settings.SEARCH_RESULT_CACHE_SIZE
+        self.timeout = timeout or settings.SEARCH_RESULT_CACHE_TTL
+
+    def _key(self, company_id) -> str:
+        return f"ai:results:{company_id or 'none'}"
+
+    def _entries(self, company_id, version: int) -> list:
+        # descarta entradas de versões antigas do corpus
+        return [e for e in cache.get(self._key(company_id), []) if e["version"] == version]
+
+    def get(self, company_id, query_emb, params: dict):
+        """Resultado guardado para um prompt similar, ou None."""
+        query = unit_vector(query_emb)
+        if query is None:
+            return None
+
+        entries = [e for e in self._entries(company_id, corpus_version(company_id)) if e["params"] == params]
+        if not entries:
+            return None
+
+        matrix = np.stack([vector_from_bytes(e["embedding"]) for e in entries])
+        if matrix.shape[1] != query.shape[0]:
+            return None
+
+        sims = normalize_rows(matrix, copy=False) @ query
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        return entries[best]["results"]
+
+    def put(self, company_id, query_emb, params: dict, results: list, version: int):
+        """
+        Guarda o ranking. `version` é a corpus_version lida ANTES da busca,
+        para não marcar como atual um ranking calculado sobre um corpus antigo.
+        """
+        entries = self._entries(company_id, version)
+        entries.append({
+            "embedding": vector_to_bytes(query_emb),
+            "params": params,
+            "results": results,
+            "version": version,
+        })
+        cache.set(self._key(company_id), entries[-self.size:], timeout=self.timeout)
+
+
+result_cache = ResultCache()
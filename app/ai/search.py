@@ -0,0 +1,641 @@
+import logging
+import threading
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from project import settings
+from ai.filters import CandidateAttributes, row_attributes
+from ai.snapshot import snapshot_store, tenant_key
+from company.models import FileCandidate
+from common.embedding import EMBEDDING_DIM, EMBEDDING_VERSION, vector_from_bytes, matrix_from_bytes
+from common.keyword_index import BM25Index, reciprocal_rank_fusion
+from common.quantization import Quantizer
+from common.vector_index import IVFIndex, SegmentMatrix
+from common.vector_ops import block_rows, blocked_top_k, normalize_rows, top_k, unit_vector
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# VERSÃO DO CORPUS (por empresa)
+# -------------------------
+def corpus_version(company_id=None) -> int:
+    """
+    Versão atual das embeddings buscáveis da empresa: contador no banco
+    (ai.CorpusVersion), o mesmo para todos os processos. 0 = nunca alterado.
+    """
+    from ai.models import CorpusVersion  # evita import circular
+    version = (
+        CorpusVersion.objects
+        .filter(tenant=tenant_key(company_id))
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def bump_corpus_version(company_id=None) -> int:
+    """
+    Incrementa a versão do corpus da empresa (arquivo/vínculo adicionado,
+    alterado ou removido). Dentro de uma transação o incremento é desfeito
+    junto num rollback e só fica visível para os outros processos no commit.
+    """
+    from ai.models import CorpusVersion  # evita import circular
+    key = tenant_key(company_id)
+    with transaction.atomic():
+        CorpusVersion.objects.get_or_create(tenant=key)
+        CorpusVersion.objects.filter(tenant=key).update(version=F("version") + 1)
+        return CorpusVersion.objects.filter(tenant=key).values_list("version", flat=True).get()
+
+
+def corpus_epoch(company_id=None) -> dict:
+    """
+    Resumo do que está no banco para a empresa, por embedding_version:
+    [vínculos com embedding, maior id de vínculo, maior id de arquivo].
+    Não depende da corpus_version: muda também com bulk_update/reembed e
+    com dados alterados fora dos signals. Serializável em JSON (manifest).
+    """
+    epoch = (
+        FileCandidate.objects
+        .filter(file__embedding__isnull=False, candidate__user_creator__company_id=company_id)
+        .values("file__embedding_version")
+        .annotate(rows=Count("id"), last_link=Max("id"), last_file=Max("file_id"))
+        .order_by("file__embedding_version")
+    )
+    return {row["file__embedding_version"] or "": [row["rows"], row["last_link"], row["last_file"]] for row in epoch}
+
+
+def company_of_link(link: FileCandidate):
+    """Empresa dona do vínculo: a do usuário que cadastrou o candidato."""
+    return link.candidate.user_creator.company_id
+
+
+# -------------------------
+# LINHAS DE UMA EMPRESA (banco -> arrays)
+# -------------------------
+def passage_block(vec, passages) -> np.ndarray:
+    """Bloco de trechos da linha: vetor do documento + trechos, normalizados."""
+    return normalize_rows(np.vstack([vec[None, :], matrix_from_bytes(passages)]), copy=False)
+
+
+def fetch_tenant_rows(company_id, passages: bool = True) -> dict:
+    """
+    Lê do banco os vínculos com embedding (da EMBEDDING_VERSION atual) da
+    empresa, ordenados pelo id:
+    arrays de ids, matriz normalizada (N, 384), trechos (SegmentMatrix:
+    passages + offsets), atributos filtráveis e termos do BM25.
+    Usado pelo CandidateIndex e pelo snapshot em disco (ai/snapshot.py).
+    """
+    tenant = FileCandidate.objects.filter(
+        file__embedding__isnull=False,
+        candidate__user_creator__company_id=company_id,
+    )
+    # vetores de outro modelo/pré-processamento não são comparáveis: ficam fora
+    stale = tenant.exclude(file__embedding_version=EMBEDDING_VERSION).count()
+    if stale:
+        logger.warning(
+            "empresa %s: %d embeddings fora da versão %s ignoradas (rode manage.py reembed)",
+            company_id, stale, EMBEDDING_VERSION,
+        )
+
+    links = (
+        tenant
+        .filter(file__embedding_version=EMBEDDING_VERSION)
+        .order_by("id")
+        .values_list(
+            "id", "file_id", "candidate_id", "file__embedding", "file__terms",
+            "file__passage_embeddings", "candidate__location", "candidate__years_experience",
+            "candidate__current_position", "file__word_cloud",
+        )
+    )
+
+    link_ids, file_ids, candidate_ids, vectors, attrs, terms, blocks = [], [], [], [], [], [], []
+    for link_id, file_id, candidate_id, embedding, link_terms, link_passages, *attributes in links:
+        embedding = vector_from_bytes(embedding)
+        # ignora embeddings vazias ([0.0]) ou de outra dimensão
+        if len(embedding) != EMBEDDING_DIM:
+            continue
+        link_ids.append(link_id)
+        file_ids.append(file_id)
+        candidate_ids.append(candidate_id)
+        vectors.append(embedding)
+        terms.append(link_terms)
+        attrs.append(row_attributes(*attributes))
+        if passages:
+            blocks.append(passage_block(embedding, link_passages))
+
+    segments = SegmentMatrix.from_blocks(blocks, EMBEDDING_DIM) if passages else None
+    return {
+        "link_ids": np.asarray(link_ids, dtype=np.int64),
+        "file_ids": np.asarray(file_ids, dtype=np.int64),
+        "candidate_ids": np.asarray(candidate_ids, dtype=np.int64),
+        "matrix": normalize_rows(np.array(vectors, dtype=np.float32).reshape(len(vectors), EMBEDDING_DIM), copy=False),
+        "passages": segments.vectors if passages else None,
+        "offsets": segments.offsets if passages else None,
+        "attrs": attrs,
+        "terms": terms,
+    }
+
+
+class CandidateIndex:
+    """
+    Cache em memória (por processo) das embeddings dos arquivos
+    vinculados a candidatos (company.FileCandidate) de UMA empresa
+    (candidate.user_creator.company; None = usuários sem empresa).
+
+    Guarda uma matriz (N, 384) float32 já normalizada (L2) e arrays
+    paralelos de ids (vínculo, arquivo, candidato), ordenados pelo id
+    do vínculo. Cada consulta é um produto matriz-vetor + argpartition.
+
+    A matriz é mantida incrementalmente pelos signals de rh.File e
+    company.FileCandidate (ai/signals.py), depois do commit. Se outro
+    processo alterar o corpus (corpus_version no banco mudou), a matriz é
+    recarregada do banco.
+
+    Acima de SEARCH_IVF_MIN_TRAIN linhas um IVFIndex gera os candidatos;
+    linhas alteradas depois do build do IVF são sempre pontuadas. O k-means
+    roda numa thread, fora do lock: até a troca as buscas seguem no IVF
+    anterior (ou exatas, logo após uma carga).
+
+    Com SEARCH_QUANTIZATION = int8 / binary a matriz fica só com os
+    códigos quantizados: a primeira passada varre o corpus inteiro com
+    aritmética inteira / Hamming e os SEARCH_RERANK melhores são
+    reordenados pelo cosseno exato (vetores float lidos do banco).
+
+    Os mesmos vínculos ficam num índice BM25 (File.terms), mantido junto
+    com a matriz: `keyword_search` e `hybrid_search` (RRF das duas listas)
+    trabalham sobre o mesmo conjunto de candidatos.
+
+    Atributos filtráveis (local, cargo, anos de experiência, skills do
+    word_cloud) ficam em arrays paralelos (ai/filters.py); com `filters`
+    a busca só pontua as linhas do bitmap, sem passar pelo IVF.
+
+    Com SEARCH_PASSAGES (desligado por padrão: até 33 vetores float32 por
+    arquivo em cada worker) cada linha tem também os trechos do currículo
+    (File.passage_embeddings) num SegmentMatrix: o score da linha é o do
+    melhor trecho (ou a média dos SEARCH_PASSAGE_TOP_M melhores), num
+    único reduceat. O IVF continua indexando o vetor do documento.
+    """
+
+    def __init__(self, company_id=None, n_lists: int = None, n_probe: int = None,
+                 min_train: int = None, quantization: str = None, rerank: int = None,
+                 passages: bool = None, top_m: int = None):
+        self._lock = threading.RLock()
+        self._version = None
+        self.company_id = company_id
+        self.n_lists = n_lists or settings.SEARCH_IVF_LISTS or None
+        self.n_probe = n_probe or settings.SEARCH_IVF_PROBE
+        self.min_train = min_train or settings.SEARCH_IVF_MIN_TRAIN
+        self.rerank = rerank or settings.SEARCH_RERANK
+
+        quantization = quantization or settings.SEARCH_QUANTIZATION
+        self._quantizer = Quantizer(quantization) if quantization != "none" else None
+
+        # trechos só no caminho float (a quantização existe para não guardar floats)
+        passages = settings.SEARCH_PASSAGES if passages is None else passages
+        self.use_passages = passages and self._quantizer is None
+        self.top_m = top_m or settings.SEARCH_PASSAGE_TOP_M
+
+        self._ivf = None
+        self._pending = set()
+        # treino do IVF em andamento: linhas alteradas desde o início dele e
+        # a geração (carga completa) sobre a qual ele foi disparado
+        self._training = None
+        self._next_pending = None
+        self._generation = 0
+        self.keywords = BM25Index()
+        self._set_rows(
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+            np.zeros((0, EMBEDDING_DIM), dtype=np.float32),
+            CandidateAttributes(),
+            SegmentMatrix.from_blocks([], EMBEDDING_DIM),
+        )
+
+    def __len__(self):
+        return len(self.link_ids)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._version is not None
+
+    def _set_rows(self, link_ids, file_ids, candidate_ids, matrix, attrs, segments):
+        self.link_ids = link_ids
+        self.file_ids = file_ids
+        self.candidate_ids = candidate_ids
+        self.matrix = matrix
+        self.attrs = attrs
+        self.segments = segments
+
+    def _row(self, vec) -> np.ndarray:
+        """Linha da matriz para um vetor: normalizado (e quantizado, se for o caso)."""
+        row = normalize_rows(vec)
+        if self._quantizer is not None:
+            row = self._quantizer.encode(row)
+        return row[0]
+
+    def _segment(self, vec, passages) -> np.ndarray:
+        if not self.use_passages:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return passage_block(vec, passages)
+
+    def _scores(self, matrix, segments, query, rows=None):
+        """Score das linhas `rows` (None = todas): melhor trecho ou o vetor do documento."""
+        if self.use_passages:
+            return segments.scores(query, rows, m=self.top_m)
+        return matrix @ query if rows is None else matrix[rows] @ query
+
+    # -------------------------
+    # CARGA COMPLETA
+    # -------------------------
+    def _load(self, version=None):
+        """
+        Carrega as linhas da empresa: do snapshot em disco (mmap) se houver
+        um da versão atual, senão do banco (fetch_tenant_rows).
+        """
+        rows = None
+        if version is not None and snapshot_store.enabled:
+            rows = snapshot_store.load(self.company_id, version, corpus_epoch(self.company_id))
+        if rows is None:
+            rows = fetch_tenant_rows(self.company_id, passages=self.use_passages)
+
+        keywords = BM25Index()
+        for link_id, terms in zip(rows["link_ids"].tolist(), rows["terms"]):
+            keywords.add(link_id, terms or {})
+
+        matrix = rows["matrix"]
+        if self._quantizer is not None:
+            matrix = self._quantizer.fit(matrix).encode(matrix)
+
+        if self.use_passages:
+            segments = SegmentMatrix(rows["passages"], rows["offsets"])
+        else:
+            segments = SegmentMatrix(
+                np.zeros((0, EMBEDDING_DIM), dtype=np.float32),
+                np.zeros(len(matrix) + 1, dtype=np.int64),
+            )
+
+        self._set_rows(
+            rows["link_ids"], rows["file_ids"], rows["candidate_ids"],
+            matrix, CandidateAttributes(rows["attrs"]), segments,
+        )
+        self.keywords = keywords
+        # o IVF anterior não corresponde mais às linhas: busca exata até o novo
+        self._generation += 1
+        self._ivf = None
+        self._pending = set()
+        self._build_ivf()
+
+    # -------------------------
+    # IVF (treino em segundo plano)
+    # -------------------------
+    def _build_ivf(self):
+        """Dispara o (re)treino do IVF sobre as linhas atuais, se ainda não houver um rodando."""
+        if len(self) < self.min_train or self._quantizer is not None:
+            self._ivf = None
+            self._pending = set()
+            return
+        if self._training is not None:
+            return
+        self._next_pending = set()
+        self._training = threading.Thread(
+            target=self._train_ivf,
+            args=(self.matrix, self.link_ids, self._generation),
+            name=f"ivf-{self.company_id}",
+            daemon=True,
+        )
+        self._training.start()
+
+    def _train_ivf(self, matrix, link_ids, generation):
+        # matrix/link_ids são imutáveis (alterações criam arrays novos): lê sem lock
+        try:
+            ivf = IVFIndex(
+                n_lists=self.n_lists, n_probe=self.n_probe, min_train=self.min_train
+            ).build(matrix, link_ids, normalized=True, keep_vectors=False)
+        except Exception:
+            logger.exception("falha no treino do IVF da empresa %s", self.company_id)
+            ivf = None
+        with self._lock:
+            # uma carga completa no meio do caminho invalida este treino
+            if ivf is not None and generation == self._generation:
+                self._ivf = ivf
+                self._pending = self._next_pending
+            self._training = None
+            self._next_pending = None
+            if generation != self._generation:
+                self._build_ivf()
+
+    def wait_for_ivf(self, timeout: float = None):
+        """Espera o treino do IVF em andamento (testes, comandos de manutenção)."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def _mark_pending(self, link_id: int):
+        """Linha alterada depois do build do IVF: entra sempre na pontuação."""
+        self._pending.add(link_id)
+        if self._next_pending is not None:
+            self._next_pending.add(link_id)
+
+    def refresh(self, force: bool = False):
+        """Recarrega a matriz se a versão do corpus mudou (ou se force=True)."""
+        version = corpus_version(self.company_id)
+        with self._lock:
+            if force or version != self._version:
+                self._load(version)
+                self._version = version
+
+    # -------------------------
+    # ATUALIZAÇÃO INCREMENTAL
+    # -------------------------
+    def _commit(self, version: int = None):
+        """
+        Publica a alteração local. `version` é a que o signal já incrementou
+        na transação da alteração; sem ela, incrementa agora. Se outro
+        processo mexeu junto, recarrega na próxima busca.
+        """
+        if version is None:
+            version = bump_corpus_version(self.company_id)
+        # bitmaps de filtro memorizados valem só para as linhas anteriores
+        self.attrs.clear_bitmaps()
+        if self._version is not None:
+            self._version = version if version == self._version + 1 else None
+        if self._ivf is not None and len(self._pending) > 0.1 * len(self):
+            self._build_ivf()
+
+    def upsert_link(self, link_id: int, file_id: int, candidate_id: int, embedding,
+                    terms=None, attrs=None, passages=None, version: int = None):
+        """
+        Adiciona/atualiza a linha de um vínculo arquivo -> candidato.
+        `attrs` vem de ai.filters.row_attributes.
+        """
+        vec = vector_from_bytes(embedding)
+        with self._lock:
+            if self.is_loaded:
+                self._delete_rows(self.link_ids == link_id)
+                if vec is not None and len(vec) == EMBEDDING_DIM:
+                    pos = int(np.searchsorted(self.link_ids, link_id))
+                    self._set_rows(
+                        np.insert(self.link_ids, pos, link_id),
+                        np.insert(self.file_ids, pos, file_id),
+                        np.insert(self.candidate_ids, pos, candidate_id),
+                        np.insert(self.matrix, pos, self._row(vec), axis=0),
+                        self.attrs.insert(pos, attrs or row_attributes(None, None, None, None)),
+                        self.segments.insert(pos, self._segment(vec, passages)),
+                    )
+                    self.keywords.add(link_id, terms or {})
+                    self._mark_pending(link_id)
+            self._commit(version)
+
+    def remove_link(self, link_id: int, version: int = None):
+        with self._lock:
+            if self.is_loaded:
+                self._delete_rows(self.link_ids == link_id)
+            self._commit(version)
+
+    def update_file(self, file_id: int, embedding, terms=None, word_cloud=None, passages=None,
+                    version: int = None):
+        """Atualiza (ou remove, se vazia) embedding, termos e skills de todas as linhas do arquivo."""
+        vec = vector_from_bytes(embedding)
+        with self._lock:
+            if self.is_loaded:
+                rows = self.file_ids == file_id
+                if vec is None or len(vec) != EMBEDDING_DIM:
+                    self._delete_rows(rows)
+                elif rows.any():
+                    self.matrix = self.matrix.copy()
+                    self.matrix[rows] = self._row(vec)
+                    self.attrs = self.attrs.replace(
+                        rows, row_attributes(None, None, None, word_cloud), fields=("skills",)
+                    )
+                    self.segments = self.segments.replace(rows, self._segment(vec, passages))
+                    for link_id in self.link_ids[rows].tolist():
+                        self.keywords.add(link_id, terms or {})
+                        self._mark_pending(link_id)
+            self._commit(version)
+
+    def update_candidate(self, candidate_id: int, location, years_experience, current_position,
+                         version: int = None):
+        """
+        Atualiza os atributos filtráveis das linhas do candidato. O signal só
+        chama quando algum deles mudou no banco (ai/signals.py).
+        """
+        with self._lock:
+            if self.is_loaded:
+                rows = self.candidate_ids == candidate_id
+                if rows.any():
+                    row = row_attributes(location, years_experience, current_position, None)
+                    self.attrs = self.attrs.replace(rows, row, fields=("locations", "years", "positions"))
+            self._commit(version)
+
+    def _delete_rows(self, mask: np.ndarray):
+        if not mask.any():
+            return
+        for link_id in self.link_ids[mask].tolist():
+            self.keywords.remove(link_id)
+        keep = ~mask
+        self._set_rows(
+            self.link_ids[keep], self.file_ids[keep],
+            self.candidate_ids[keep], self.matrix[keep],
+            self.attrs.take(keep),
+            self.segments.take(keep),
+        )
+
+    # -------------------------
+    # BUSCA
+    # -------------------------
+    def search(self, query_emb, k: int = None, n_probe: int = None, filters: dict = None):
+        """
+        Retorna os k vínculos mais similares à consulta:
+        [(file_id, candidate_id, score), ...] em ordem decrescente.
+        `filters` (ai.filters.parse_filters) restringe as linhas pontuadas.
+        """
+        query = unit_vector(vector_from_bytes(query_emb), EMBEDDING_DIM)
+        if query is None:
+            return []
+        k = k or settings.SEARCH_TOP_K
+
+        self.refresh()
+        with self._lock:
+            link_ids, file_ids, candidate_ids, matrix, attrs, segments = (
+                self.link_ids, self.file_ids, self.candidate_ids,
+                self.matrix, self.attrs, self.segments,
+            )
+            ivf, pending = self._ivf, list(self._pending)
+
+        if len(link_ids) == 0:
+            return []
+
+        # pré-filtro: só as linhas elegíveis entram na pontuação
+        allowed = attrs.mask(filters)
+        rows = None if allowed is None else np.flatnonzero(allowed)
+        if rows is not None and len(rows) == 0:
+            return []
+
+        if self._quantizer is not None:
+            return self._search_quantized(query, k, link_ids, file_ids, candidate_ids, matrix, rows)
+
+        if rows is None and ivf is not None:
+            # IVF gera os candidatos (listas sondadas), pontuados na matriz atual;
+            # linhas alteradas depois do build entram sempre
+            ivf_links = ivf.probe(query, n_probe=n_probe)
+            wanted = np.union1d(ivf_links, np.asarray(pending, dtype=np.int64))
+            rows = np.minimum(np.searchsorted(link_ids, wanted), len(link_ids) - 1)
+            rows = rows[link_ids[rows] == wanted]
+
+        scores = self._scores(matrix, segments, query, rows)
+        best = top_k(scores, k)
+        best_rows = best if rows is None else rows[best]
+
+        return [
+            (int(file_ids[r]), int(candidate_ids[r]), float(s))
+            for r, s in zip(best_rows, scores[best])
+        ]
+
+    def search_batch(self, queries, k: int = None, filters: dict = None, memory_mb: int = None):
+        """
+        Várias consultas (Q, 384) contra o corpus inteiro numa passada só:
+        a matriz de scores (Q, N) é calculada em blocos de linhas que cabem
+        em `memory_mb` (SEARCH_BATCH_MEMORY_MB), mantendo o top-k de cada
+        consulta entre os blocos. Busca exata (sem IVF).
+        Retorna uma lista de hits por consulta, como `search`.
+        """
+        queries = normalize_rows(queries)
+        if queries.shape[1] != EMBEDDING_DIM:
+            return [[] for _ in queries]
+        # consultas nulas (texto vazio) não têm direção: ficam sem hits
+        valid = queries.any(axis=1)
+        if not valid.all():
+            results = [[] for _ in queries]
+            if valid.any():
+                for i, hits in zip(np.flatnonzero(valid), self.search_batch(queries[valid], k, filters, memory_mb)):
+                    results[i] = hits
+            return results
+        k = k or settings.SEARCH_TOP_K
+        memory = (memory_mb or settings.SEARCH_BATCH_MEMORY_MB) * 2 ** 20
+
+        if self._quantizer is not None:
+            # a primeira passada quantizada é por consulta
+            return [self.search(q, k=k, filters=filters) for q in queries]
+
+        self.refresh()
+        with self._lock:
+            link_ids, file_ids, candidate_ids, matrix, attrs, segments = (
+                self.link_ids, self.file_ids, self.candidate_ids,
+                self.matrix, self.attrs, self.segments,
+            )
+
+        allowed = attrs.mask(filters)
+        rows = np.arange(len(link_ids)) if allowed is None else np.flatnonzero(allowed)
+        if len(rows) == 0:
+            return [[] for _ in queries]
+
+        # bytes por linha do bloco além dos scores: trechos copiados e seus scores
+        row_bytes = 0
+        if self.use_passages:
+            passages_per_row = max(segments.live / max(len(segments), 1), 1)
+            row_bytes = passages_per_row * (EMBEDDING_DIM + len(queries)) * 4
+        block = block_rows(len(queries), memory, row_bytes)
+
+        if self.use_passages:
+            score_block = lambda chunk: segments.scores(queries, chunk, m=self.top_m).T
+        else:
+            score_block = lambda chunk: queries @ matrix[chunk].T
+        best_scores, best_rows = blocked_top_k(score_block, rows, len(queries), k, block)
+
+        return [
+            [(int(file_ids[r]), int(candidate_ids[r]), float(s)) for r, s in zip(q_rows, q_scores)]
+            for q_scores, q_rows in zip(best_scores, best_rows)
+        ]
+
+    def keyword_search(self, text: str, k: int = None, filters: dict = None):
+        """Busca BM25 nos termos dos arquivos: [(file_id, candidate_id, score), ...]."""
+        k = k or settings.SEARCH_TOP_K
+
+        self.refresh()
+        with self._lock:
+            allowed = self.attrs.mask(filters)
+            if allowed is not None:
+                allowed = set(self.link_ids[allowed].tolist())
+            hits = self.keywords.search(text, k=k, allowed=allowed)
+            rows = np.searchsorted(self.link_ids, [link_id for link_id, _ in hits])
+            return [
+                (int(self.file_ids[r]), int(self.candidate_ids[r]), float(score))
+                for r, (_, score) in zip(rows, hits)
+            ]
+
+    def hybrid_search(self, query_emb, text: str, k: int = None, n_probe: int = None,
+                      filters: dict = None):
+        """
+        Busca vetorial + BM25 fundidas por reciprocal rank fusion.
+        Cada lista traz os SEARCH_HYBRID_POOL melhores; o score é o do RRF.
+        """
+        k = k or settings.SEARCH_TOP_K
+        pool = max(k, settings.SEARCH_HYBRID_POOL)
+
+        rankings = [
+            [(file_id, candidate_id) for file_id, candidate_id, _ in hits]
+            for hits in (
+                self.search(query_emb, k=pool, n_probe=n_probe, filters=filters),
+                self.keyword_search(text, k=pool, filters=filters),
+            )
+        ]
+        return [
+            (file_id, candidate_id, score)
+            for (file_id, candidate_id), score in reciprocal_rank_fusion(rankings, k=k)
+        ]
+
+    def _search_quantized(self, query, k, link_ids, file_ids, candidate_ids, codes, rows=None):
+        """Primeira passada nos códigos + re-rank em float dos SEARCH_RERANK melhores."""
+        if rows is None:
+            first = top_k(self._quantizer.scores(codes, query), max(k, self.rerank))
+        else:
+            first = rows[top_k(self._quantizer.scores(codes[rows], query), max(k, self.rerank))]
+
+        vectors = dict(
+            FileCandidate.objects
+            .filter(id__in=link_ids[first].tolist())
+            .values_list("id", "file__embedding")
+        )
+        first = np.array([r for r in first if link_ids[r] in vectors], dtype=np.int64)
+        if len(first) == 0:
+            return []
+
+        matrix = normalize_rows(np.stack([vector_from_bytes(vectors[l]) for l in link_ids[first]]), copy=False)
+        scores = matrix @ query
+        best = top_k(scores, k)
+
+        return [
+            (int(file_ids[r]), int(candidate_ids[r]), float(s))
+            for r, s in zip(first[best], scores[best])
+        ]
+
+
+class TenantIndexes:
+    """
+    Um CandidateIndex por empresa, criado (e carregado do banco) só quando
+    a empresa é consultada ou alterada neste processo. Uma busca nunca
+    toca vetores de outra empresa.
+    """
+
+    def __init__(self, factory=CandidateIndex):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def __call__(self, company_id) -> CandidateIndex:
+        index = self._indexes.get(company_id)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(company_id, self._factory(company_id))
+        return index
+
+    def loaded(self) -> dict:
+        """{company_id: linhas} das partições carregadas neste processo."""
+        return {cid: len(index) for cid, index in self._indexes.items() if index.is_loaded}
+
+
+# índices compartilhados pelo processo: candidate_index(company_id).search(...)
+candidate_index = TenantIndexes()
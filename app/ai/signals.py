@@ -0,0 +1,133 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from ai.filters import row_attributes
+from ai.search import bump_corpus_version, candidate_index, company_of_link
+from company.models import Candidate, FileCandidate
+from rh.models import File
+
+
+# -------------------------
+# Mantém os CandidateIndex (um por empresa) em dia sem recarregar tudo do banco
+# -------------------------
+
+def after_commit(company_id, apply):
+    """
+    Incrementa a versão do corpus da empresa na transação da alteração
+    (desfeito junto num rollback) e só aplica `apply(index, version)` ao
+    índice em memória depois do commit: um rollback não deixa no índice
+    linhas que não existem no banco.
+    """
+    version = bump_corpus_version(company_id)
+    transaction.on_commit(lambda: apply(candidate_index(company_id), version))
+
+
+@receiver(post_save, sender=FileCandidate)
+def file_candidate_saved(sender, instance, **kwargs):
+    cand, f = instance.candidate, instance.file
+    args = (
+        instance.id, instance.file_id, instance.candidate_id,
+        f.current_embedding, f.terms,
+        row_attributes(cand.location, cand.years_experience, cand.current_position, f.word_cloud),
+        f.passage_embeddings,
+    )
+    after_commit(company_of_link(instance), lambda index, version: index.upsert_link(*args, version=version))
+
+
+@receiver(post_delete, sender=FileCandidate)
+def file_candidate_deleted(sender, instance, **kwargs):
+    try:
+        company_ids = [company_of_link(instance)]
+    except ObjectDoesNotExist:
+        # candidato/usuário já removido: procura nas partições carregadas
+        company_ids = list(candidate_index.loaded())
+    for company_id in company_ids:
+        after_commit(company_id, lambda index, version: index.remove_link(instance.id, version=version))
+
+
+# -------------------------
+# Só saves que mexem no que está indexado incrementam a versão do corpus
+# (cada incremento recarrega a empresa nos outros workers e descarta o cache de resultados)
+# -------------------------
+
+FILE_INDEXED_FIELDS = ("embedding", "embedding_version", "passage_embeddings", "terms", "word_cloud")
+FILTERABLE_CANDIDATE_FIELDS = ("location", "years_experience", "current_position")
+
+
+def _plain(value):
+    # BinaryField volta como memoryview em alguns bancos
+    return bytes(value) if isinstance(value, (memoryview, bytearray)) else value
+
+
+def _touches(fields, update_fields) -> bool:
+    return not update_fields or bool(set(fields) & set(update_fields))
+
+
+def remember_indexed(sender, instance, fields, update_fields):
+    """Guarda na instância os valores de `fields` gravados no banco antes deste save."""
+    instance._indexed_before = None
+    if instance._state.adding or not _touches(fields, update_fields):
+        return
+    row = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    if row is not None:
+        instance._indexed_before = tuple(map(_plain, row))
+
+
+def indexed_changed(instance, fields, update_fields, key=tuple) -> bool:
+    """True se o save alterou algum de `fields` (comparados por `key`); sem valor anterior, True."""
+    if not _touches(fields, update_fields):
+        return False
+    before = getattr(instance, "_indexed_before", None)
+    current = tuple(_plain(getattr(instance, field)) for field in fields)
+    return before is None or key(before) != key(current)
+
+
+@receiver(pre_save, sender=File)
+def file_saving(sender, instance, update_fields=None, **kwargs):
+    remember_indexed(sender, instance, FILE_INDEXED_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=File)
+def file_saved(sender, instance, created, update_fields=None, **kwargs):
+    # arquivo novo ainda não tem vínculo com candidato; metadados (extração, nome...) não são indexados
+    if created or not indexed_changed(instance, FILE_INDEXED_FIELDS, update_fields):
+        return
+    company_ids = (
+        FileCandidate.objects
+        .filter(file_id=instance.id)
+        .values_list("candidate__user_creator__company_id", flat=True)
+        .distinct()
+    )
+    args = (
+        instance.id, instance.current_embedding, instance.terms, instance.word_cloud,
+        instance.passage_embeddings,
+    )
+    for company_id in company_ids:
+        after_commit(company_id, lambda index, version: index.update_file(*args, version=version))
+
+
+def filterable(values) -> tuple:
+    """Atributos como o índice os guarda (ex.: anos "5" e 5 são o mesmo valor)."""
+    return row_attributes(*values, None)[:3]
+
+
+@receiver(pre_save, sender=Candidate)
+def candidate_saving(sender, instance, update_fields=None, **kwargs):
+    remember_indexed(sender, instance, FILTERABLE_CANDIDATE_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Candidate)
+def candidate_saved(sender, instance, created, update_fields=None, **kwargs):
+    # candidato novo ainda não tem arquivo vinculado; save sem mudança filtrável não invalida nada
+    if created or not indexed_changed(instance, FILTERABLE_CANDIDATE_FIELDS, update_fields, key=filterable):
+        return
+    # sem arquivo vinculado o candidato não tem linhas no índice
+    if not FileCandidate.objects.filter(candidate_id=instance.id).exists():
+        return
+    args = (instance.id, instance.location, instance.years_experience, instance.current_position)
+    after_commit(
+        instance.user_creator.company_id,
+        lambda index, version: index.update_candidate(*args, version=version),
+    )
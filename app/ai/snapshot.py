@@ -0,0 +1,158 @@
+import fcntl
+import json
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from django.utils import timezone
+
+from project import settings
+from common.embedding import EMBEDDING_DIM, EMBEDDING_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Snapshot em disco das linhas do CandidateIndex, uma pasta por empresa:
+#
+#   <EMBEDDING_SNAPSHOT_DIR>/
+#       manifest.json          {"embedding_version", "dim", "format", "tenants": {empresa: {...}}}
+#       <empresa>-v<versão>-<id>/
+#           matrix.npy         (N, 384) float32 normalizada   -> mmap
+#           passages.npy       (M, 384) float32 normalizada   -> mmap
+#           offsets.npy        (N + 1,) segmentos dos trechos
+#           link_ids.npy / file_ids.npy / candidate_ids.npy
+#           meta.pkl           atributos filtráveis + termos do BM25
+#
+# Os workers abrem as matrizes com np.load(mmap_mode="r"): o page cache do
+# SO guarda uma cópia só para todos, e o boot não lê as embeddings do banco.
+# Uma pasta só é usada se foi gerada na mesma corpus_version da empresa e
+# com o mesmo corpus_epoch (resumo lido do banco: pega o que não passou pelos
+# signals, como bulk_update); senão o CandidateIndex cai para o banco.
+
+MANIFEST = "manifest.json"
+# formato do conteúdo das pastas; 2: anos de experiência desconhecidos = ai.filters.UNKNOWN_YEARS
+FORMAT = 2
+ARRAYS = ("link_ids", "file_ids", "candidate_ids", "matrix", "passages", "offsets")
+MMAP_ARRAYS = ("matrix", "passages")
+
+
+def tenant_key(company_id) -> str:
+    return str(company_id) if company_id is not None else "none"
+
+
+class SnapshotStore:
+
+    def __init__(self, root: str = None):
+        self.root = root
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root or settings.EMBEDDING_SNAPSHOT_DIR)
+
+    @property
+    def path(self) -> str:
+        return self.root or settings.EMBEDDING_SNAPSHOT_DIR
+
+    # -------------------------
+    # MANIFEST
+    # -------------------------
+    def manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"tenants": {}}
+        # snapshot de outra versão de embedding (ou de outro formato) não serve
+        if (manifest.get("embedding_version") != EMBEDDING_VERSION or manifest.get("dim") != EMBEDDING_DIM
+                or manifest.get("format") != FORMAT):
+            return {"tenants": {}}
+        return manifest
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest: dict):
+        tmp = os.path.join(self.path, f"{MANIFEST}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    # -------------------------
+    # ESCRITA
+    # -------------------------
+    def write(self, company_id, version: int, epoch: dict, rows: dict) -> dict:
+        """
+        Grava as linhas (ai.search.fetch_tenant_rows) da empresa lidas na
+        `version` do corpus e no `epoch` (ai.search.corpus_epoch, lido ANTES
+        das linhas) e publica no manifest (troca atômica).
+        A pasta anterior da empresa é apagada; workers que ainda a tenham
+        mapeada continuam lendo (o arquivo só some quando o mmap fecha).
+        """
+        key = tenant_key(company_id)
+        name = f"{key}-v{version}-{uuid.uuid4().hex[:8]}"
+        folder = os.path.join(self.path, name)
+        os.makedirs(folder)
+
+        for array in ARRAYS:
+            np.save(os.path.join(folder, f"{array}.npy"), rows[array])
+        with open(os.path.join(folder, "meta.pkl"), "wb") as f:
+            pickle.dump({"attrs": rows["attrs"], "terms": rows["terms"]}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        entry = {
+            "version": version,
+            "epoch": epoch,
+            "dir": name,
+            "rows": int(len(rows["link_ids"])),
+            "passages": int(len(rows["passages"])),
+            "written_at": timezone.now().isoformat(),
+        }
+        with self._locked():
+            manifest = self.manifest()
+            manifest.update(embedding_version=EMBEDDING_VERSION, dim=EMBEDDING_DIM, format=FORMAT)
+            old = manifest.setdefault("tenants", {}).get(key)
+            manifest["tenants"][key] = entry
+            self._write_manifest(manifest)
+
+        if old and old["dir"] != name:
+            shutil.rmtree(os.path.join(self.path, old["dir"]), ignore_errors=True)
+        return entry
+
+    # -------------------------
+    # LEITURA
+    # -------------------------
+    def load(self, company_id, version: int, epoch: dict):
+        """Linhas da empresa (matrizes em mmap) se o snapshot é da `version` e do `epoch`; senão None."""
+        if not self.enabled:
+            return None
+        entry = self.manifest()["tenants"].get(tenant_key(company_id))
+        if not entry or entry["version"] != version or entry.get("epoch") != epoch:
+            return None
+
+        folder = os.path.join(self.path, entry["dir"])
+        try:
+            rows = {
+                array: np.load(
+                    os.path.join(folder, f"{array}.npy"),
+                    mmap_mode="r" if array in MMAP_ARRAYS else None,
+                )
+                for array in ARRAYS
+            }
+            with open(os.path.join(folder, "meta.pkl"), "rb") as f:
+                rows.update(pickle.load(f))
+        except (OSError, ValueError, pickle.UnpicklingError) as e:
+            logger.warning("snapshot de embeddings inválido (%s): %s", folder, e)
+            return None
+        return rows
+
+
+snapshot_store = SnapshotStore()
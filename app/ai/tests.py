@@ -1,15 +1,49 @@
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.core.cache import caches
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.conf import settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from unittest.mock import patch
 
-from ai.models import Queries
-from ai.serializer import QuerieSerializer
-from ai.factories import QueriesFactory
-
-from access.models import User, Token
 from access.factories import UserFactory, TokenFactory
-
+from access.models import User, Token
+from ai.factories import QueriesFactory
+from ai.filters import CandidateAttributes, parse_filters, row_attributes
+from ai.matching import match_job_descriptions
+from ai.models import Queries, Indication
+from ai.rerank import CrossEncoderReranker
+from ai.result_cache import ResultCache
+from ai.models import CorpusVersion
+from ai.search import (
+    CandidateIndex, bump_corpus_version, candidate_index, corpus_epoch, corpus_version, fetch_tenant_rows,
+)
+from ai.serializer import QuerieSerializer
+from ai.snapshot import SnapshotStore, snapshot_store
+from common.embedding import (
+    EMBEDDING_DIM, create_embeddings, create_query_embedding, query_cache_stats, split_passages,
+)
+from common.embedding_backends import OnnxBackend, get_backend, load_backend
+from common.keyword_index import BM25Index, reciprocal_rank_fusion, term_counts
+from common.model_server import MicroBatcher, send_message, recv_message
+from common.quantization import Quantizer
+from common.vector_index import IVFIndex, SegmentMatrix
+from common.vector_ops import (
+    cosine_matrix, cosine_sim, matrix_top_k, normalize_rows, top_k_rows, unit_vector,
+)
+from company.factories import CandidateFactory
+from company.models import Company, FileCandidate
+from rh.models import File
 
 class QuerieViewSetTest(APITestCase):
 
@@ -102,3 +136,923 @@ class QuerieViewSetTest(APITestCase):
 
         self.assertEqual(res.status_code, 400)
         self.assertIn("Nenhum prompt enviado", res.data["message"])
+
+
+class QueryResultsTest(APITestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_authenticate(self.user)
+        self.patch_require_token = patch('common.token.TokenValidator.require_token', lambda f: f)
+        self.patch_require_token.start()
+
+        self.query = QueriesFactory(user=self.user)
+        self.cand = CandidateFactory()
+        self.file = File.objects.create(name="cv.pdf", size_mb=0.1, word_cloud=["Python", "Django"])
+        FileCandidate.objects.create(candidate=self.cand, file=self.file)
+
+    def tearDown(self):
+        self.patch_require_token.stop()
+
+    def test_save_results_keeps_order(self):
+        other = CandidateFactory()
+        self.query.save_results([
+            {"id": other.id, "file_id": None, "score": 0.9},
+            {"id": self.cand.id, "file_id": self.file.id, "score": 0.5},
+        ])
+
+        saved = list(self.query.indications.order_by("rank").values_list("candidate_id", "file_id", "score"))
+        self.assertEqual(saved, [(other.id, None, 0.9), (self.cand.id, self.file.id, 0.5)])
+
+    def test_results_are_read_without_search(self):
+        self.query.save_results([{"id": self.cand.id, "file_id": self.file.id, "score": 0.8}])
+        url = reverse('queries-results', kwargs={"pk": self.query.pk})
+
+        with patch("ai.views.create_query_embedding") as embed:
+            res = self.client.get(url)
+
+        embed.assert_not_called()
+        self.assertEqual(res.status_code, 200)
+        result = res.data["results"][0]
+        self.assertEqual((result["id"], result["score"], result["file_id"]), (self.cand.id, 0.8, self.file.id))
+        self.assertEqual(result["key_skills"], ["Python", "Django"])
+
+    def test_build_results_skips_missing_candidates(self):
+        from ai.views import QuerieViewSet  # depois do patch do require_token
+
+        results = QuerieViewSet()._build_results([(self.file.id, 999999, 0.9), (self.file.id, self.cand.id, 0.5)])
+
+        self.assertEqual([r["id"] for r in results], [self.cand.id])
+
+    def test_rerank_score_is_kept_apart_from_score(self):
+        from ai.views import QuerieViewSet  # depois do patch do require_token
+
+        results = QuerieViewSet()._build_results([(self.file.id, self.cand.id, 0.5)], {self.file.id: 7.25})
+        self.query.save_results(results)
+
+        self.assertEqual((results[0]["score"], results[0]["rerank_score"]), (0.5, 7.25))
+        self.assertEqual(self.query.indications.get().rerank_score, 7.25)
+
+    def test_results_of_other_user(self):
+        other = QueriesFactory()
+
+        res = self.client.get(reverse('queries-results', kwargs={"pk": other.pk}))
+
+        self.assertEqual(res.status_code, 404)
+
+
+class IVFIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+        self.ids = np.arange(2000) + 100
+
+    def _exact(self, query, k):
+        v = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = v @ (query / np.linalg.norm(query))
+        return set(self.ids[np.argsort(-scores)[:k]])
+
+    def test_small_corpus_is_exact(self):
+        index = IVFIndex(min_train=5000).build(self.vectors, self.ids)
+        query = self.vectors[7]
+
+        ids, scores = index.search(query, k=10)
+
+        self.assertEqual(ids[0], 107)
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+        self.assertEqual(set(ids), self._exact(query, 10))
+
+    def test_probe_all_lists_matches_exact(self):
+        index = IVFIndex(n_lists=16, min_train=100).build(self.vectors, self.ids)
+        query = self.vectors[3] + 0.1
+
+        ids, _ = index.search(query, k=10, n_probe=16)
+
+        self.assertEqual(set(ids), self._exact(query, 10))
+
+    def test_scores_sorted_desc(self):
+        index = IVFIndex(n_lists=16, n_probe=4, min_train=100).build(self.vectors, self.ids)
+
+        _, scores = index.search(self.vectors[0], k=20)
+
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_wrong_dimension_or_empty(self):
+        index = IVFIndex().build(self.vectors, self.ids)
+
+        ids, _ = index.search([0.0], k=5)
+        self.assertEqual(len(ids), 0)
+
+        empty = IVFIndex().build(np.zeros((0, 32)), [])
+        ids, _ = empty.search(self.vectors[0], k=5)
+        self.assertEqual(len(ids), 0)
+
+    def test_lists_point_into_build_matrix(self):
+        unit = normalize_rows(self.vectors)
+
+        index = IVFIndex(n_lists=16, min_train=100).build(unit, self.ids, normalized=True)
+        probe_only = IVFIndex(n_lists=16, min_train=100).build(unit, self.ids, normalized=True, keep_vectors=False)
+
+        self.assertTrue(np.shares_memory(index._vectors, unit))
+        self.assertEqual(sorted(index.probe(unit[0], n_probe=16)), sorted(self.ids))
+        self.assertIn(100, probe_only.probe(unit[0], n_probe=2))
+        with self.assertRaises(ValueError):
+            probe_only.search(unit[0])
+
+
+class VectorOpsTest(SimpleTestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def test_zero_vectors_have_no_direction(self):
+        self.assertEqual(cosine_sim([0.0], np.ones(384)), 0.0)
+        self.assertEqual(cosine_sim(np.zeros(384), np.ones(384)), 0.0)
+        self.assertIsNone(unit_vector([0.0], 384))
+        self.assertIsNone(unit_vector(np.zeros(384)))
+        np.testing.assert_array_equal(normalize_rows(np.zeros((2, 4)))[0], np.zeros(4))
+
+    def test_cosine_matrix_matches_pairwise(self):
+        a = self.rng.normal(size=(3, 16)).astype(np.float32)
+        b = self.rng.normal(size=(5, 16)).astype(np.float32)
+
+        expected = [[cosine_sim(x, y) for y in b] for x in a]
+
+        np.testing.assert_allclose(cosine_matrix(a, b), expected, rtol=1e-5)
+
+    def test_top_k_rows_matches_argsort(self):
+        scores = self.rng.normal(size=(4, 100)).astype(np.float32)
+
+        np.testing.assert_array_equal(top_k_rows(scores, 5), np.argsort(-scores, axis=1)[:, :5])
+        self.assertEqual(top_k_rows(scores, 500).shape, (4, 100))
+
+    def test_blocked_top_k_matches_full_matrix(self):
+        matrix = normalize_rows(self.rng.normal(size=(1000, 32)))
+        queries = normalize_rows(self.rng.normal(size=(3, 32)))
+
+        scores, rows = matrix_top_k(queries, matrix, k=10, block=64)
+
+        full = queries @ matrix.T
+        np.testing.assert_array_equal(rows, top_k_rows(full, 10))
+        np.testing.assert_allclose(scores, np.take_along_axis(full, rows, axis=1), rtol=1e-6)
+
+
+class CandidateIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = candidate_index(None)
+        self.index.refresh(force=True)
+        self.rng = np.random.default_rng(0)
+
+    def _file(self, vec):
+        f = File.objects.create(name="cv.pdf", size_mb=0.1)
+        f.set_embedding(vec)
+        f.save()
+        return f
+
+    def test_link_is_indexed_by_signal(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        cand = CandidateFactory()
+        f = self._file(vec)
+
+        FileCandidate.objects.create(candidate=cand, file=f)
+        hits = self.index.search(vec, k=5)
+
+        self.assertEqual(hits[0][:2], (f.id, cand.id))
+        self.assertAlmostEqual(hits[0][2], 1.0, places=5)
+
+    def test_file_update_and_link_delete(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        other = self.rng.normal(size=384).astype(np.float32)
+        cand = CandidateFactory()
+        f = self._file(vec)
+        link = FileCandidate.objects.create(candidate=cand, file=f)
+
+        f.set_embedding(other)
+        f.save()
+        self.assertAlmostEqual(self.index.search(other, k=1)[0][2], 1.0, places=5)
+
+        link.delete()
+        self.assertEqual(self.index.search(other, k=1), [])
+
+    def test_ignores_empty_embedding(self):
+        cand = CandidateFactory()
+        f = self._file([0.0])
+        FileCandidate.objects.create(candidate=cand, file=f)
+
+        self.assertEqual(len(self.index), 0)
+
+    def test_ignores_other_embedding_version(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        f = File.objects.create(name="cv.pdf", size_mb=0.1)
+        f.set_embedding(vec, version="modelo-antigo:p0")
+        f.save()
+        FileCandidate.objects.create(candidate=CandidateFactory(), file=f)
+
+        self.assertEqual(self.index.search(vec, k=5), [])
+        self.index.refresh(force=True)
+        self.assertEqual(len(self.index), 0)
+
+    def test_link_is_applied_after_commit(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        cand = CandidateFactory()
+        f = self._file(vec)
+        self.index.search(vec, k=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FileCandidate.objects.create(candidate=cand, file=f)
+        with patch("ai.search.fetch_tenant_rows") as fetch:
+            hits = self.index.search(vec, k=1)
+
+        # alteração aplicada em memória, sem recarregar do banco
+        fetch.assert_not_called()
+        self.assertEqual(hits[0][:2], (f.id, cand.id))
+
+    def test_rolled_back_link_never_reaches_index(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        f = self._file(vec)
+        version = corpus_version(None)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                FileCandidate.objects.create(candidate=CandidateFactory(), file=f)
+                raise RuntimeError("rollback")
+
+        self.assertEqual(corpus_version(None), version)
+        self.assertEqual(self.index.search(vec, k=5), [])
+
+    def test_only_indexed_changes_bump_the_version(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        cand = CandidateFactory(location="Curitiba", years_experience=5)
+        f = self._file(vec)
+        FileCandidate.objects.create(candidate=cand, file=f)
+        version = corpus_version(None)
+
+        # processo que ainda não carregou a empresa
+        with patch.dict(candidate_index._indexes, clear=True):
+            cand.years_experience = "5"
+            cand.name = "Outro nome"
+            cand.save()
+            f.extracted_info = {"info": {}}
+            f.pages_read = 2
+            f.save()
+            f.save(update_fields=["stored_name"])
+        self.assertEqual(corpus_version(None), version)
+
+        cand.location = "Recife"
+        cand.save()
+        self.assertEqual(corpus_version(None), version + 1)
+        f.set_embedding(self.rng.normal(size=384))
+        f.save()
+        self.assertEqual(corpus_version(None), version + 2)
+
+    def test_corpus_version_lives_in_the_database(self):
+        before = corpus_version(7)
+
+        bump_corpus_version(7)
+        caches["default"].clear()
+
+        self.assertEqual(corpus_version(7), before + 1)
+        self.assertEqual(CorpusVersion.objects.get(tenant="7").version, before + 1)
+
+    def test_ivf_trains_outside_the_lock(self):
+        vectors = self.rng.normal(size=(20, 384)).astype(np.float32)
+        cand = CandidateFactory()
+        files = [self._file(vec) for vec in vectors]
+        for f in files:
+            FileCandidate.objects.create(candidate=cand, file=f)
+        index = CandidateIndex(n_lists=4, n_probe=4, min_train=10)
+        release = threading.Event()
+        build = IVFIndex.build
+
+        def slow_build(ivf, *args, **kwargs):
+            release.wait(5)
+            return build(ivf, *args, **kwargs)
+
+        with patch.object(IVFIndex, "build", slow_build):
+            index.refresh(force=True)
+            # k-means parado: a busca não espera o treino e sai exata
+            self.assertIsNone(index._ivf)
+            self.assertEqual(index.search(vectors[3], k=1)[0][0], files[3].id)
+            release.set()
+            index.wait_for_ivf()
+
+        self.assertIsNotNone(index._ivf)
+        self.assertEqual(index.search(vectors[3], k=1)[0][0], files[3].id)
+
+    def test_search_is_scoped_by_company(self):
+        vec = self.rng.normal(size=384).astype(np.float32)
+        company = Company.objects.create(name="ACME", cnpj="11.222.333/0001-81", user_creator=UserFactory())
+        cand = CandidateFactory(user_creator=UserFactory(company=company))
+        f = self._file(vec)
+        FileCandidate.objects.create(candidate=cand, file=f)
+
+        self.assertEqual(candidate_index(company.id).search(vec, k=5)[0][:2], (f.id, cand.id))
+        self.assertEqual(self.index.search(vec, k=5), [])
+
+
+class KeywordIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add(1, term_counts("Experiência com Kubernetes e Docker em produção"))
+        self.index.add(2, term_counts("Analista SAP FI, contabilidade e fechamento fiscal"))
+        self.index.add(3, term_counts("Desenvolvedor Python, Django e Docker"))
+
+    def test_exact_term_ranks_first(self):
+        self.assertEqual(self.index.search("kubernetes")[0][0], 1)
+        self.assertEqual(self.index.search("SAP FI")[0][0], 2)
+        self.assertEqual({d for d, _ in self.index.search("docker")}, {1, 3})
+
+    def test_accents_and_case_are_ignored(self):
+        self.assertEqual(term_counts("Experiência"), term_counts("EXPERIENCIA"))
+
+    def test_remove_document(self):
+        self.index.remove(1)
+
+        self.assertEqual(self.index.search("kubernetes"), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_rrf_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=2)
+
+        self.assertEqual(fused[0][0], "b")
+
+
+class HybridSearchTest(TestCase):
+
+    def setUp(self):
+        self.index = candidate_index(None)
+        self.index.refresh(force=True)
+        rng = np.random.default_rng(2)
+        self.files = {}
+        for text in ("Especialista em Kubernetes", "Analista SAP FI", "Desenvolvedor Python"):
+            f = File.objects.create(name="cv.pdf", size_mb=0.1, full_text=text)
+            f.set_embedding(rng.normal(size=384).astype(np.float32))
+            f.terms = term_counts(text)
+            f.save()
+            FileCandidate.objects.create(candidate=CandidateFactory(), file=f)
+            self.files[text] = f
+
+    def test_keyword_search_finds_exact_term(self):
+        hits = self.index.keyword_search("kubernetes", k=5)
+
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0][0], self.files["Especialista em Kubernetes"].id)
+
+    def test_hybrid_combines_both_lists(self):
+        target = self.files["Analista SAP FI"]
+
+        hits = self.index.hybrid_search(target.embedding_vector, "sap", k=3)
+
+        self.assertEqual(hits[0][0], target.id)
+        self.assertEqual(len(hits), 3)
+
+    def test_file_update_reindexes_terms(self):
+        f = self.files["Desenvolvedor Python"]
+        f.terms = term_counts("Desenvolvedor Golang")
+        f.save()
+
+        self.assertEqual(self.index.keyword_search("python"), [])
+        self.assertEqual(self.index.keyword_search("golang")[0][0], f.id)
+
+
+class FilteredSearchTest(TestCase):
+
+    def setUp(self):
+        self.index = candidate_index(None)
+        self.index.refresh(force=True)
+        rng = np.random.default_rng(3)
+        self.vec = rng.normal(size=384).astype(np.float32)
+        self.links = {}
+        for name, location, years, skills in (
+            ("ana", "Curitiba - PR", 6, ["Python", "Django"]),
+            ("bruno", "São Paulo", 8, ["Python"]),
+            ("carla", "Curitiba", 2, ["Python"]),
+        ):
+            cand = CandidateFactory(location=location, years_experience=years, current_position="Desenvolvedor")
+            f = File.objects.create(name="cv.pdf", size_mb=0.1, word_cloud=skills)
+            f.set_embedding(self.vec + 0.1 * rng.normal(size=384).astype(np.float32))
+            f.save()
+            self.links[name] = FileCandidate.objects.create(candidate=cand, file=f)
+
+    def _candidates(self, filters):
+        hits = self.index.search(self.vec, k=10, filters=parse_filters(filters))
+        return {cid for _, cid, _ in hits}
+
+    def test_parse_filters(self):
+        self.assertIsNone(parse_filters({}))
+        self.assertEqual(
+            parse_filters({"location": " São  Paulo", "skills": "Python", "min_years": "5"}),
+            {"location": "sao paulo", "min_years": 5, "skills": ["python"]},
+        )
+        with self.assertRaises(ValueError):
+            parse_filters({"min_years": "cinco"})
+        with self.assertRaises(ValueError):
+            parse_filters({"salario": 10})
+
+    def test_filters_restrict_scored_rows(self):
+        ana, carla = self.links["ana"].candidate_id, self.links["carla"].candidate_id
+
+        self.assertEqual(self._candidates({"location": "curitiba"}), {ana, carla})
+        self.assertEqual(self._candidates({"location": "curitiba", "min_years": 5}), {ana})
+        self.assertEqual(self._candidates({"skills": ["django"]}), {ana})
+        self.assertEqual(self._candidates({"current_position": "gerente"}), set())
+
+    def test_unknown_experience_fails_year_filters(self):
+        cand = CandidateFactory(location="Curitiba", years_experience=None, current_position="Desenvolvedor")
+        f = File.objects.create(name="cv.pdf", size_mb=0.1)
+        f.set_embedding(self.vec)
+        f.save()
+        FileCandidate.objects.create(candidate=cand, file=f)
+
+        self.assertIn(cand.id, self._candidates({"location": "curitiba"}))
+        self.assertNotIn(cand.id, self._candidates({"max_years": 10}))
+        self.assertNotIn(cand.id, self._candidates({"min_years": 0}))
+
+    def test_bitmap_memo_is_bounded(self):
+        attrs = CandidateAttributes([row_attributes("Curitiba", 3, "Dev", ["Python"])])
+
+        with patch("ai.filters.MAX_BITMAPS", 2):
+            for city in ("a", "b", "c"):
+                attrs.mask({"location": city})
+
+        self.assertEqual(list(attrs._bitmaps), [("location", "b"), ("location", "c")])
+        attrs.clear_bitmaps()
+        self.assertEqual(len(attrs._bitmaps), 0)
+
+    def test_candidate_update_refreshes_attributes(self):
+        cand = self.links["bruno"].candidate
+        cand.location = "Curitiba"
+        cand.save()
+
+        self.assertIn(cand.id, self._candidates({"location": "curitiba"}))
+
+
+class PassageSearchTest(TestCase):
+
+    def setUp(self):
+        self.index = CandidateIndex(passages=True)
+        self.index.refresh(force=True)
+        self.rng = np.random.default_rng(4)
+
+    def test_split_passages_overlap(self):
+        words = [f"w{i}" for i in range(300)]
+
+        passages = split_passages(" ".join(words), size=100, overlap=20)
+
+        self.assertEqual(split_passages("curto demais", size=100), [])
+        self.assertEqual(passages[0].split()[-20:], passages[1].split()[:20])
+        self.assertEqual(passages[-1].split()[-1], "w299")
+
+    def test_segment_scores_match_python_loop(self):
+        blocks = [self.rng.normal(size=(n, 16)).astype(np.float32) for n in (1, 4, 2, 7)]
+        matrix = SegmentMatrix.from_blocks(blocks, 16)
+        query = self.rng.normal(size=16).astype(np.float32)
+
+        expected_max = [(b @ query).max() for b in blocks]
+        expected_mean = [np.sort(b @ query)[::-1][:2].mean() for b in blocks]
+
+        np.testing.assert_allclose(matrix.scores(query), expected_max, rtol=1e-5)
+        np.testing.assert_allclose(matrix.scores(query, m=2), expected_mean, rtol=1e-5)
+        np.testing.assert_allclose(
+            matrix.scores(query, rows=np.array([3, 0])), [expected_max[3], expected_max[0]], rtol=1e-5
+        )
+
+    def test_updates_append_without_rebuilding(self):
+        blocks = [self.rng.normal(size=(n, 16)).astype(np.float32) for n in (3, 1, 2)]
+        new = self.rng.normal(size=(2, 16)).astype(np.float32)
+        query = self.rng.normal(size=16).astype(np.float32)
+
+        matrix = SegmentMatrix.from_blocks(blocks, 16).insert(1, new)
+        grown = matrix.insert(4, new)
+        # o segundo insert escreve no mesmo buffer, depois das linhas da versão anterior
+        self.assertTrue(np.shares_memory(matrix.vectors, grown.vectors))
+        updated = grown.replace(np.array([False, True, False, False, True]), blocks[0]).take(
+            np.array([True, True, False, True, True])
+        )
+
+        expected = SegmentMatrix.from_blocks([blocks[0], blocks[0], blocks[2], blocks[0]], 16)
+        np.testing.assert_allclose(updated.scores(query), expected.scores(query), rtol=1e-5)
+        np.testing.assert_allclose(updated.scores(query, m=2), expected.scores(query, m=2), rtol=1e-5)
+        np.testing.assert_allclose(
+            updated.scores(query, rows=np.array([2, 0])), expected.scores(query, rows=np.array([2, 0])), rtol=1e-5
+        )
+        np.testing.assert_allclose(updated.compacted().vectors, expected.vectors)
+        self.assertGreater(len(updated.vectors), updated.live)
+        # lixo acima de COMPACT_RATIO do buffer: compactado
+        single = updated.take(np.array([True, False, False, False]))
+        self.assertEqual((len(single.vectors), single.live), (3, 3))
+
+    def test_best_passage_ranks_long_resume(self):
+        target = self.rng.normal(size=384).astype(np.float32)
+        cand = CandidateFactory()
+        f = File.objects.create(name="cv.pdf", size_mb=0.1)
+        f.set_embedding(self.rng.normal(size=384).astype(np.float32))
+        f.set_passages(np.stack([self.rng.normal(size=384), target]).astype(np.float32))
+        f.save()
+        FileCandidate.objects.create(candidate=cand, file=f)
+
+        hits = self.index.search(target, k=1)
+
+        self.assertEqual(hits[0][0], f.id)
+        self.assertAlmostEqual(hits[0][2], 1.0, places=2)  # trechos guardados em float16
+
+
+class SnapshotTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(self.tmp.name)
+        rng = np.random.default_rng(5)
+        self.vec = rng.normal(size=384).astype(np.float32)
+        f = File.objects.create(name="cv.pdf", size_mb=0.1, word_cloud=["Python"])
+        f.set_embedding(self.vec)
+        f.save()
+        self.link = FileCandidate.objects.create(candidate=CandidateFactory(), file=f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_is_memory_mapped(self):
+        version, epoch = corpus_version(None), corpus_epoch(None)
+        self.store.write(None, version, epoch, fetch_tenant_rows(None))
+
+        rows = self.store.load(None, version, epoch)
+
+        self.assertIsInstance(rows["matrix"], np.memmap)
+        self.assertEqual(rows["link_ids"].tolist(), [self.link.id])
+        self.assertEqual(rows["attrs"][0][3], frozenset({"python"}))
+        self.assertIsNone(self.store.load(None, version + 1, epoch))
+
+    def test_snapshot_is_rejected_when_database_changed(self):
+        # versão igual (ex.: bulk_update sem signals), mas o banco mudou
+        version = corpus_version(None)
+        self.store.write(None, version, corpus_epoch(None), fetch_tenant_rows(None))
+
+        File.objects.filter(id=self.link.file_id).update(embedding_version="outro-modelo:p1")
+
+        self.assertEqual(corpus_version(None), version)
+        self.assertIsNone(self.store.load(None, version, corpus_epoch(None)))
+
+    def test_index_loads_from_snapshot(self):
+        version = corpus_version(None)
+        self.store.write(None, version, corpus_epoch(None), fetch_tenant_rows(None))
+
+        with patch.object(snapshot_store, "root", self.tmp.name), \
+                patch("ai.search.fetch_tenant_rows") as fetch:
+            index = CandidateIndex()
+            index.refresh()
+            hits = index.search(self.vec, k=1)
+
+        fetch.assert_not_called()
+        self.assertEqual(hits[0][0], self.link.file_id)
+
+
+class QuantizedSearchTest(TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1)
+        self.vectors = self.rng.normal(size=(30, 384)).astype(np.float32)
+        cand = CandidateFactory()
+        for vec in self.vectors:
+            f = File.objects.create(name="cv.pdf", size_mb=0.1)
+            f.set_embedding(vec)
+            f.save()
+            FileCandidate.objects.create(candidate=cand, file=f)
+
+    def test_codes_are_smaller(self):
+        self.assertEqual(Quantizer.nbytes(10, 384, "int8") * 4, Quantizer.nbytes(10, 384, "none"))
+        self.assertEqual(Quantizer.nbytes(10, 384, "binary") * 32, Quantizer.nbytes(10, 384, "none"))
+
+    def test_rerank_returns_exact_scores(self):
+        for mode in ("int8", "binary"):
+            index = CandidateIndex(quantization=mode, rerank=5)
+            index.refresh(force=True)
+            self.assertEqual(index.matrix.dtype, np.int8 if mode == "int8" else np.uint8)
+
+            hits = index.search(self.vectors[4], k=3)
+
+            self.assertEqual(len(hits), 3)
+            self.assertAlmostEqual(hits[0][2], 1.0, places=5)
+            self.assertTrue(all(a[2] >= b[2] for a, b in zip(hits, hits[1:])))
+
+
+class BatchMatchingTest(TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(6)
+        self.user = UserFactory()
+        self.index = CandidateIndex(self.user.company_id, passages=True)
+        self.index.refresh(force=True)
+        self.vectors = self.rng.normal(size=(20, 384)).astype(np.float32)
+        self.candidates = [CandidateFactory(user_creator=self.user) for _ in range(5)]
+        for i, vec in enumerate(self.vectors):
+            f = File.objects.create(name="cv.pdf", size_mb=0.1)
+            f.set_embedding(vec)
+            f.set_passages(np.stack([vec, self.rng.normal(size=384)]).astype(np.float32))
+            f.save()
+            FileCandidate.objects.create(candidate=self.candidates[i % 5], file=f)
+
+    def test_batch_matches_single_search(self):
+        queries = self.rng.normal(size=(4, 384)).astype(np.float32)
+
+        # memória mínima força um bloco por linha
+        for memory_mb in (None, 1e-6):
+            batch = self.index.search_batch(queries, k=3, memory_mb=memory_mb)
+            for query, hits in zip(queries, batch):
+                expected = self.index.search(query, k=3)
+                self.assertEqual([h[:2] for h in hits], [h[:2] for h in expected])
+                np.testing.assert_allclose([h[2] for h in hits], [h[2] for h in expected], rtol=1e-5)
+
+    def test_match_creates_queries_and_indications(self):
+        with patch("ai.matching.create_embeddings", return_value=self.vectors[[0, 7]]):
+            matches = match_job_descriptions(self.user, ["vaga python", "vaga java", "  "], top_n=2)
+
+        self.assertEqual(len(matches), 2)
+        self.assertEqual(matches[0]["results"][0]["candidate_id"], self.candidates[0].id)
+        self.assertEqual(matches[1]["results"][0]["candidate_id"], self.candidates[2].id)
+        self.assertEqual(Queries.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Indication.objects.filter(query=matches[0]["query"]).count(), 2)
+
+
+class FakeCrossEncoder:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32):
+        time.sleep(self.delay)
+        self.batches.append(len(pairs))
+        return [float("kubernetes" in passage) for _, passage in pairs]
+
+
+class RerankTest(TransactionTestCase):
+    # os trechos são lidos na thread do re-rank: precisa ver os dados commitados
+
+    def setUp(self):
+        self.reranker = CrossEncoderReranker(model_name="fake", top_k=2, budget_ms=100)
+        texts = ["desenvolvedor java", "engenheiro kubernetes", "analista de dados"]
+        self.files = [File.objects.create(name="cv.pdf", size_mb=0.1, full_text=t) for t in texts]
+        self.hits = [(f.id, i, 0.9 - i * 0.1) for i, f in enumerate(self.files)]
+        self.query = np.ones(384, dtype=np.float32)
+
+    def test_rescores_head_in_one_batch(self):
+        model = FakeCrossEncoder()
+        with patch("ai.rerank.get_cross_encoder", return_value=model):
+            hits, rerank_scores = self.reranker.rerank("kubernetes", self.query, self.hits)
+
+        self.assertEqual(model.batches, [2])
+        self.assertEqual(hits, [self.hits[1], self.hits[0], self.hits[2]])  # score da busca mantido
+        self.assertEqual(rerank_scores, {self.files[1].id: 1.0, self.files[0].id: 0.0})
+
+    def test_budget_falls_back_to_bi_encoder_order(self):
+        with patch("ai.rerank.get_cross_encoder", return_value=FakeCrossEncoder(delay=0.3)):
+            hits, rerank_scores = self.reranker.rerank("kubernetes", self.query, self.hits, budget_ms=20)
+
+        self.assertEqual(rerank_scores, {})
+        self.assertEqual(hits, self.hits)
+
+    def test_budget_covers_passage_fetch(self):
+        def slow_passages(query_emb, file_ids):
+            time.sleep(0.3)
+            return {}
+
+        start = time.perf_counter()
+        with patch("ai.rerank.best_passages", side_effect=slow_passages), \
+                patch("ai.rerank.get_cross_encoder", return_value=FakeCrossEncoder()):
+            hits, rerank_scores = self.reranker.rerank("kubernetes", self.query, self.hits, budget_ms=20)
+
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertEqual((hits, rerank_scores), (self.hits, {}))
+
+
+class ModelServerProtocolTest(SimpleTestCase):
+
+    def test_message_roundtrip(self):
+        import socket
+        a, b = socket.socketpair()
+        vecs = np.arange(6, dtype=np.float32).reshape(2, 3)
+
+        send_message(a, {"shape": [2, 3]}, vecs.tobytes())
+        header, body = recv_message(b)
+
+        a.close()
+        b.close()
+        self.assertEqual(header["shape"], [2, 3])
+        np.testing.assert_array_equal(np.frombuffer(body, dtype=np.float32).reshape(2, 3), vecs)
+
+    def test_micro_batcher_groups_concurrent_requests(self):
+        from concurrent.futures import ThreadPoolExecutor
+        calls = []
+
+        def fn(items):
+            calls.append(len(items))
+            return [i * 2 for i in items]
+
+        batcher = MicroBatcher(fn, max_batch=100, max_wait=0.2)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(batcher.submit, [[1], [2, 3], [4], [5]]))
+
+        self.assertEqual(results, [[2], [4, 6], [8], [10]])
+        self.assertLess(len(calls), 4)
+
+
+class LazyModelImportTest(SimpleTestCase):
+
+    # num interpretador novo: o processo dos testes pode já ter importado os modelos
+    SCRIPT = """
+import json, os, sys
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+import ai.rerank, common.embedding, rh.pdf_extractor
+print(json.dumps(sorted(m for m in sys.argv[1:] if m in sys.modules)))
+"""
+
+    def test_setup_and_imports_do_not_load_models(self):
+        heavy = ["torch", "transformers", "sentence_transformers", "spacy", "onnxruntime"]
+
+        result = subprocess.run(
+            [sys.executable, "-c", self.SCRIPT, *heavy],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout), [])
+
+
+class FakeTokenizer:
+
+    def __call__(self, texts, **kwargs):
+        # textos de tamanhos diferentes: a segunda linha tem padding
+        lengths = [min(len(t.split()), 3) for t in texts]
+        mask = np.array([[1] * n + [0] * (3 - n) for n in lengths], dtype=np.int64)
+        return {"input_ids": mask * 7, "attention_mask": mask, "token_type_ids": np.zeros_like(mask)}
+
+
+class FakeSession:
+
+    def __init__(self, path, options=None, providers=None):
+        self.path = path
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name=n) for n in ("input_ids", "attention_mask")]
+
+    def run(self, outputs, feeds):
+        batch, seq = feeds["input_ids"].shape
+        hidden = np.zeros((batch, seq, 4), dtype=np.float32)
+        hidden[:, :, 0] = 1.0
+        hidden[:, 2:, 1] = 5.0  # só tokens de padding / terceiro token
+        return [hidden]
+
+
+class EmbeddingBackendTest(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(f"{self.tmp.name}/manifest.json", "w") as f:
+            json.dump({"model": "all-MiniLM-L6-v2", "max_length": 256, "quantized": True}, f)
+        ort = types.SimpleNamespace(
+            SessionOptions=MagicMock,
+            GraphOptimizationLevel=types.SimpleNamespace(ORT_ENABLE_ALL=99),
+            InferenceSession=FakeSession,
+        )
+        transformers = types.SimpleNamespace(
+            AutoTokenizer=types.SimpleNamespace(from_pretrained=lambda path: FakeTokenizer())
+        )
+        # onnxruntime / transformers falsos: o teste não depende deles instalados
+        self.modules = patch.dict(sys.modules, {"onnxruntime": ort, "transformers": transformers})
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+        self.tmp.cleanup()
+
+    def test_configured_backend_is_loaded_once(self):
+        with patch("common.model_loader._models", {}), \
+                patch("common.embedding_backends.settings.EMBEDDING_BACKEND", "onnx-int8"), \
+                patch("common.embedding_backends.load_backend", side_effect=lambda name: MagicMock(name=name)) as load:
+            first, second = get_backend(), get_backend()
+            torch = get_backend("torch")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, torch)
+        self.assertEqual([c.args for c in load.call_args_list], [("onnx-int8",), ("torch",)])
+
+    def test_torch_backend_uses_sentence_transformer(self):
+        model = MagicMock()
+        model.encode.return_value = np.ones((2, 4), dtype=np.float64)
+
+        with patch("common.embedding_backends.get_sentence_model", return_value=model):
+            vectors = load_backend("torch").encode(["a", "b"], batch_size=8)
+
+        model.encode.assert_called_once_with(["a", "b"], batch_size=8, convert_to_numpy=True)
+        self.assertEqual(vectors.dtype, np.float32)
+
+    def test_onnx_int8_uses_quantized_model(self):
+        with patch("common.embedding_backends.settings.EMBEDDING_ONNX_DIR", self.tmp.name):
+            backend = load_backend("onnx-int8")
+
+        self.assertIsInstance(backend, OnnxBackend)
+        self.assertEqual(backend.name, "onnx-int8")
+        self.assertTrue(backend.session.path.endswith("model.int8.onnx"))
+        self.assertEqual(backend.input_names, {"input_ids", "attention_mask"})
+
+    def test_onnx_mean_pooling_ignores_padding(self):
+        backend = OnnxBackend(self.tmp.name)
+
+        vectors = backend.encode(["um dois tres quatro", "um"], batch_size=1)
+
+        self.assertEqual(backend.session.path, f"{self.tmp.name}/model.onnx")
+        # linha 1: 3 tokens válidos, um com a coluna 1 ligada; linha 2: só o primeiro token
+        np.testing.assert_allclose(vectors[0], normalize_rows([[1.0, 5 / 3, 0, 0]])[0], rtol=1e-6)
+        np.testing.assert_allclose(vectors[1], [1.0, 0, 0, 0], rtol=1e-6)
+
+    def test_missing_onnxruntime_is_reported(self):
+        with patch.dict(sys.modules, {"onnxruntime": None}):
+            with self.assertRaises(RuntimeError):
+                OnnxBackend(self.tmp.name)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            load_backend("tensorflow")
+
+
+class QueryEmbeddingCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        caches["embeddings"].clear()
+
+    @patch("common.embedding._encode")
+    def test_repeated_prompt_skips_model(self, mock_encode):
+        mock_encode.return_value = np.ones((1, 384), dtype=np.float32)
+
+        first = create_query_embedding("Desenvolvedor  Python Sênior")
+        second = create_query_embedding("  desenvolvedor python SÊNIOR ")
+
+        self.assertEqual(mock_encode.call_count, 1)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(query_cache_stats()["hits"], 1)
+        self.assertEqual(query_cache_stats()["misses"], 1)
+
+
+class BatchEmbeddingTest(SimpleTestCase):
+
+    @staticmethod
+    def fake_encode(texts, batch_size=32):
+        # primeira coluna = tamanho do texto: identifica de qual texto veio a linha
+        out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        out[:, 0] = [len(t) for t in texts]
+        return out
+
+    def test_rows_come_back_in_input_order(self):
+        texts = ["um texto bem mais longo que os outros", "curto", "", "   ", "médio tamanho"]
+
+        with patch("common.embedding._encode", side_effect=self.fake_encode) as encode:
+            vectors = create_embeddings(texts, batch_size=2)
+
+        # o modelo só vê os textos não vazios, do menor para o maior
+        self.assertEqual(encode.call_args[0][0], ["curto", "médio tamanho", texts[0]])
+        self.assertEqual(vectors.shape, (5, EMBEDDING_DIM))
+        self.assertEqual(vectors[:, 0].tolist(), [len(texts[0]), 5, 0, 0, 13])
+        # textos vazios ou só com espaços viram linhas zeradas
+        self.assertFalse(vectors[2].any() or vectors[3].any())
+
+    def test_all_empty_skips_model(self):
+        with patch("common.embedding._encode") as encode:
+            vectors = create_embeddings(["", None, "  "])
+
+        encode.assert_not_called()
+        self.assertEqual(vectors.shape, (3, EMBEDDING_DIM))
+        self.assertFalse(vectors.any())
+
+
+class ResultCacheTest(TestCase):
+
+    def setUp(self):
+        self.cache = ResultCache(threshold=0.95)
+        self.rng = np.random.default_rng(1)
+        self.emb = self.rng.normal(size=384).astype(np.float32)
+        self.params = {"top_k": 10, "n_probe": 8}
+
+    def test_similar_prompt_reuses_results(self):
+        self.cache.put(1, self.emb, self.params, [{"id": 7}], corpus_version(1))
+
+        near = self.emb + 0.01 * self.rng.normal(size=384).astype(np.float32)
+
+        self.assertEqual(self.cache.get(1, near, self.params), [{"id": 7}])
+        self.assertIsNone(self.cache.get(2, near, self.params))
+        self.assertIsNone(self.cache.get(1, near, {"top_k": 5, "n_probe": 8}))
+        self.assertIsNone(self.cache.get(1, self.rng.normal(size=384), self.params))
+
+    def test_corpus_change_invalidates(self):
+        self.cache.put(3, self.emb, self.params, [{"id": 7}], corpus_version(3))
+
+        bump_corpus_version(3)
+
+        self.assertIsNone(self.cache.get(3, self.emb, self.params))
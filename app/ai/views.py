@@ -1,10 +1,19 @@
+import time
+
+from django.db.models import Prefetch
 from rest_framework import viewsets
 from rest_framework.decorators import action
 
-from ai.models import Queries
+from ai.filters import parse_filters
+from ai.matching import match_job_descriptions
+from ai.models import Indication, Queries
+from ai.rerank import reranker
+from ai.result_cache import result_cache
+from ai.search import candidate_index, corpus_version
 from ai.serializer import QuerieSerializer
-from company.models import Candidate, FileCandidate
+from company.models import Candidate
 from rh.models import File
+from project import settings
 
 # Swagger
 from drf_yasg import openapi
@@ -12,8 +21,11 @@ from drf_yasg.utils import swagger_auto_schema
 
 # Common
 from common.token import TokenValidator
-from common.response import ResponseDefault, BadRequest
-from common.embedding import create_embedding, cosine_sim
+from common.response import ResponseDefault, BadRequest, NotFound
+from common.embedding import create_query_embedding, query_cache_stats
+
+
+SEARCH_MODES = ("vector", "keyword", "hybrid")
 
 
 class QuerieViewSet(viewsets.ModelViewSet):
@@ -28,81 +40,221 @@ class QuerieViewSet(viewsets.ModelViewSet):
         if not prompt_text:
             return BadRequest("Nenhum prompt enviado.")
 
+        try:
+            top_k = int(request.data.get("top_k") or settings.SEARCH_TOP_K)
+            n_probe = int(request.data.get("n_probe") or settings.SEARCH_IVF_PROBE)
+        except (TypeError, ValueError):
+            return BadRequest("top_k e n_probe devem ser inteiros.")
+
+        mode = request.data.get("mode") or settings.SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            return BadRequest(f"mode deve ser um de: {', '.join(SEARCH_MODES)}.")
+
+        # re-rank com cross-encoder (SEARCH_CROSS_ENCODER); "rerank": false desliga
+        rerank = reranker.enabled and request.data.get("rerank", True) not in (False, "false", "0", 0)
+
+        # filtros estruturados: {"location", "current_position", "min_years", "max_years", "skills"}
+        try:
+            filters = parse_filters(request.data.get("filters"))
+        except ValueError as e:
+            return BadRequest(str(e))
+
         # salva a pergunta
-        Queries.objects.create(
+        query = Queries.objects.create(
             ask=prompt_text,
             user=request.user
         )
 
-        # ➤ 1) gera embedding da pergunta
-        query_emb = create_embedding(prompt_text)
+        # tempo de cada etapa (ms), devolvido na resposta
+        timings = {}
+        clock = time.perf_counter()
+
+        def lap(stage):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[stage] = round((now - clock) * 1000, 2)
+            clock = now
+
+        # ➤ 1) gera embedding da pergunta (cache por prompt normalizado)
+        query_emb = create_query_embedding(prompt_text)
+        lap("embedding_ms")
 
-        # ➤ 2) busca todos arquivos associados a candidatos
-        file_links = FileCandidate.objects.select_related("file", "candidate")
+        company_id = request.user.company_id
+        params = {"top_k": top_k, "n_probe": n_probe, "mode": mode, "filters": filters, "rerank": rerank}
 
-        response_list = []
+        # ➤ 2) ranking recente de um prompt quase igual (mesma empresa, corpus inalterado)
+        cached = result_cache.get(company_id, query_emb, params)
+        lap("cache_ms")
+        if cached is not None:
+            query.save_results(cached)
+            return ResponseDefault(
+                message="Candidatos ranqueados por similaridade",
+                data={
+                    "query_id": query.id, "query": prompt_text, "results": cached,
+                    "from_cache": True, "reranked": False, "timings": timings,
+                }
+            )
+
+        version = corpus_version(company_id)
+        index = candidate_index(company_id)
+
+        # ➤ 3) busca nos arquivos associados a candidatos da empresa:
+        #       vetorial (IVF), por palavra-chave (BM25) ou as duas fundidas (RRF),
+        #       pontuando só os candidatos que passam nos filtros
+        if mode == "keyword":
+            hits = index.keyword_search(prompt_text, k=top_k, filters=filters)
+        elif mode == "hybrid":
+            hits = index.hybrid_search(query_emb, prompt_text, k=top_k, n_probe=n_probe, filters=filters)
+        else:
+            hits = index.search(query_emb, k=top_k, n_probe=n_probe, filters=filters)
+        lap("search_ms")
 
-        for link in file_links:
-            file = link.file
+        # ➤ 4) re-rank dos primeiros hits pelo cross-encoder, dentro do orçamento
+        #       (SEARCH_CROSS_ENCODER_BUDGET_MS); estourou -> ordem do bi-encoder
+        rerank_scores = {}
+        if rerank:
+            hits, rerank_scores = reranker.rerank(prompt_text, query_emb, hits)
+            lap("rerank_ms")
+        reranked = bool(rerank_scores)
 
-            if type(file) != File:
-                continue
-            
-            # garante que o arquivo tenha embedding
-            if not file.embedding:
-                continue
+        # ➤ 5) agrega por candidato e monta a resposta
+        final = self._build_results(hits, rerank_scores)
+        lap("build_ms")
 
-            score = cosine_sim(query_emb, file.embedding)
+        # ranking que caiu no fallback não entra no cache
+        if reranked or not rerank:
+            result_cache.put(company_id, query_emb, params, final, version)
 
-            response_list.append({
-                "candidate_id": link.candidate.id,
-                "file_id": file.id,
-                "key_skills": file.word_cloud[:5],
-                "score": score,
-            })
+        # ➤ 6) grava o ranking: reabrir a busca lê as indicações (GET querie/<id>/results)
+        query.save_results(final)
+        lap("save_ms")
 
-        # ➤ 3) agrega por candidato (pega o arquivo com maior score)
+        return ResponseDefault(
+            message="Candidatos ranqueados por similaridade",
+            data={
+                "query_id": query.id, "query": prompt_text, "results": final,
+                "from_cache": False, "reranked": reranked, "timings": timings,
+            }
+        )
+
+    def _build_results(self, hits, rerank_scores=None):
+        """
+        [(file_id, candidate_id, score), ...] -> lista de candidatos da resposta.
+        `rerank_scores`: {file_id: score do cross-encoder} dos hits re-ranqueados.
+        """
+        rerank_scores = rerank_scores or {}
+        # agrega por candidato (hits já vêm ordenados: fica o primeiro)
         candidates_final = {}
-        for item in response_list:
-            cid = item["candidate_id"]
-            if cid not in candidates_final or item["score"] > candidates_final[cid]["score"]:
-                candidates_final[cid] = item
-
-        # ordena por score
-        ordered = sorted(candidates_final.values(), key=lambda x: x["score"], reverse=True)
-
-        # monta resposta
-        final = []
-        for item in ordered:
-            cand = Candidate.objects.get(pk=item["candidate_id"])
-            files = FileCandidate.objects.filter(candidate=cand)
-            data_files = [
-                {
-                    "id": fc.file.id,
-                    "name": fc.file.name,
-                    "size_mb": fc.file.size_mb,
-                    "download_url": fc.file.download_url,   # <- agora funciona
+        for file_id, candidate_id, score in hits:
+            if candidate_id not in candidates_final:
+                candidates_final[candidate_id] = {
+                    "file_id": file_id, "score": score, "rerank_score": rerank_scores.get(file_id),
                 }
-                for fc in files
-            ]
-
-            final.append({
-                "id": cand.id,
-                "name": cand.name,
-                "email": cand.email,
-                "score": item["score"],
-                "key_skills": item["key_skills"],
-                "candidate_description": cand.profile_summary(),
-                "birth_date": cand.birth_date,
-                "current_position": cand.current_position,
-                "years_experience": cand.years_experience,
-                "location": cand.location,
-                "phone": cand.phone,
-                "files_uploaded": data_files,
-            })
+
+        files = File.objects.only("id", "word_cloud").in_bulk(
+            [item["file_id"] for item in candidates_final.values()]
+        )
+        candidates = Candidate.objects.prefetch_related("files__file").in_bulk(
+            list(candidates_final.keys())
+        )
+
+        # monta resposta (candidato removido depois da busca fica de fora)
+        return [
+            self._candidate_result(
+                candidates[cid], files.get(item["file_id"]), item["score"], item["rerank_score"]
+            )
+            for cid, item in candidates_final.items()
+            if cid in candidates
+        ]
+
+    def _candidate_result(self, cand, file, score, rerank_score=None):
+        """Um candidato da resposta (busca nova ou indicação gravada)."""
+        data_files = [
+            {
+                "id": fc.file.id,
+                "name": fc.file.name,
+                "size_mb": fc.file.size_mb,
+                "download_url": fc.file.download_url,   # <- agora funciona
+            }
+            for fc in cand.files.all()
+        ]
+
+        return {
+            "id": cand.id,
+            "name": cand.name,
+            "email": cand.email,
+            "score": score,                 # da busca (cosseno / BM25 / RRF)
+            "rerank_score": rerank_score,   # do cross-encoder; None fora do topo re-ranqueado
+            "file_id": file.id if file else None,
+            "key_skills": ((file.word_cloud if file else None) or [])[:5],
+            "candidate_description": cand.profile_summary(),
+            "birth_date": cand.birth_date,
+            "current_position": cand.current_position,
+            "years_experience": cand.years_experience,
+            "location": cand.location,
+            "phone": cand.phone,
+            "files_uploaded": data_files,
+        }
+
+    @action(detail=True, methods=['get'], url_path='results')
+    @TokenValidator.require_token
+    def results(self, request, pk=None):
+        """Ranking gravado de uma busca anterior (sem embedding nem busca)."""
+        indications = Indication.objects.select_related("candidate", "file").order_by("rank")
+        query = (
+            Queries.objects
+            .filter(pk=pk, user=request.user)
+            .prefetch_related(
+                Prefetch("indications", queryset=indications),
+                "indications__candidate__files__file",
+            )
+            .first()
+        )
+        if query is None:
+            return NotFound("Busca não encontrada.")
 
         return ResponseDefault(
             message="Candidatos ranqueados por similaridade",
-            data={"results": final}
+            data={
+                "query_id": query.id,
+                "query": query.ask,
+                "created_at": query.created_at,
+                "results": [
+                    self._candidate_result(ind.candidate, ind.file, ind.score, ind.rerank_score)
+                    for ind in query.indications.all()
+                ],
+            }
         )
 
+    @action(detail=False, methods=['post'], url_path='match-batch')
+    @TokenValidator.require_token
+    def match_batch(self, request):
+        """Várias descrições de vaga contra a base de candidatos numa passada só."""
+        descriptions = request.data.get("job_descriptions")
+        if not isinstance(descriptions, list) or not descriptions:
+            return BadRequest("Envie job_descriptions como uma lista de textos.")
+
+        try:
+            top_k = int(request.data.get("top_k") or 5)
+        except (TypeError, ValueError):
+            return BadRequest("top_k deve ser inteiro.")
+
+        matches = match_job_descriptions(request.user, [str(d) for d in descriptions], top_n=top_k)
+
+        return ResponseDefault(
+            message="Vagas ranqueadas em lote",
+            data={
+                "matches": [
+                    {"query_id": m["query"].id, "job_description": m["query"].ask, "results": m["results"]}
+                    for m in matches
+                ]
+            }
+        )
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    @TokenValidator.require_token
+    def cache_stats(self, request):
+        return ResponseDefault(
+            message="Estatísticas do cache de embeddings de prompts",
+            data={"query_embedding_cache": query_cache_stats()}
+        )
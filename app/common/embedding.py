@@ -1,21 +1,188 @@
+import hashlib
+import logging
+import re
+import unicodedata
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import List
+from django.core.cache import caches
+
+from project import settings
+from common.embedding_backends import get_backend
+from common.model_loader import SENTENCE_MODEL_NAME
+from common.model_server import get_client
+from common import vector_ops
+
+logger = logging.getLogger(__name__)
+
+# dimensão dos vetores gerados pelo all-MiniLM-L6-v2
+EMBEDDING_DIM = 384
 
-# Carrega uma única vez (fica em RAM e é reaproveitado)
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Versão gravada em cada vetor (File.embedding_version) e usada na chave do
+# cache de prompts: modelo + backend (torch/onnx/onnx-int8) + pré-processamento.
+# Mude o sufixo quando o texto passar a ser preparado de outro jeito; vetores de
+# versões diferentes não são comparáveis e a busca ignora os antigos até o reembed.
+EMBEDDING_VERSION = f"{SENTENCE_MODEL_NAME}:{settings.EMBEDDING_BACKEND}:p1"
 
-def create_embedding(text: str) -> List[float]:
+
+def create_embedding(text: str) -> np.ndarray:
     """
-    Gera embedding rápido usando SentenceTransformers.
+    Gera embedding rápido usando SentenceTransformers (float32).
     """
     if not text or not text.strip():
-        return [0.0]
+        return np.zeros(1, dtype=np.float32)
+
+    return _encode([text])[0]
+
+
+def create_embeddings(texts, batch_size: int = 32) -> np.ndarray:
+    """
+    Gera embeddings em lote: matriz float32 (N, 384) na mesma ordem de `texts`.
+
+    Os textos são ordenados por tamanho antes do encode, então cada lote
+    tem textos parecidos e quase nenhum padding. Textos vazios viram
+    linhas zeradas.
+    """
+    out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+    idx = [i for i, t in enumerate(texts) if t and t.strip()]
+    if not idx:
+        return out
+
+    order = sorted(idx, key=lambda i: len(texts[i]))
+    out[order] = _encode([texts[i] for i in order], batch_size=batch_size)
+    return out
+
+
+def split_passages(text: str, size: int = None, overlap: int = None, limit: int = None) -> list:
+    """
+    Divide o texto em trechos de `size` palavras com `overlap` palavras de
+    sobreposição (cabem na janela de 256 tokens do MiniLM), no máximo `limit`.
+    Textos curtos (um trecho só) retornam [].
+    """
+    size = size or settings.EMBEDDING_PASSAGE_WORDS
+    overlap = settings.EMBEDDING_PASSAGE_OVERLAP if overlap is None else overlap
+    limit = limit or settings.EMBEDDING_MAX_PASSAGES
+
+    words = (text or "").split()
+    if len(words) <= size:
+        return []
+    step = max(size - overlap, 1)
+    starts = range(0, len(words) - overlap, step)
+    return [" ".join(words[i:i + size]) for i in starts][:limit]
+
+
+def create_document_embeddings(text: str):
+    """
+    Embedding do documento inteiro + embeddings dos trechos (split_passages),
+    num único lote do modelo. Retorna (vetor (384,), matriz (P, 384)).
+    """
+    passages = split_passages(text)
+    vectors = create_embeddings([text] + passages)
+    return vectors[0], vectors[1:]
+
+
+def _encode(texts: list, batch_size: int = 32) -> np.ndarray:
+    """
+    Encode pelo servidor de modelos (MODEL_SERVER_SOCKET), se houver;
+    senão, ou se ele falhar, usa o backend (EMBEDDING_BACKEND) do próprio processo.
+    """
+    client = get_client()
+    if client is not None:
+        try:
+            return client.encode(texts)
+        except (OSError, RuntimeError) as e:
+            logger.warning("model server indisponível (%s), usando modelo local", e)
+
+    return get_backend().encode(texts, batch_size=batch_size)
+
+
+# -------------------------
+# CACHE DE EMBEDDINGS DE PROMPTS
+# -------------------------
+QUERY_CACHE_HITS = "qemb:stats:hits"
+QUERY_CACHE_MISSES = "qemb:stats:misses"
+
+
+def normalize_prompt(text: str) -> str:
+    """'  Desenvolvedor   PYTHON Sênior ' -> 'desenvolvedor python sênior'."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _count(key: str):
+    cache = caches["embeddings"]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def create_query_embedding(text: str) -> np.ndarray:
+    """
+    create_embedding com cache (LRU + TTL) por prompt normalizado e versão
+    do modelo. Prompts repetidos não passam pelo modelo.
+    """
+    normalized = normalize_prompt(text)
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    key = f"qemb:{EMBEDDING_VERSION}:{digest}"
+
+    cache = caches["embeddings"]
+    cached = cache.get(key)
+    if cached is not None:
+        _count(QUERY_CACHE_HITS)
+        return vector_from_bytes(cached)
+
+    _count(QUERY_CACHE_MISSES)
+    vec = create_embedding(normalized)
+    cache.set(key, vector_to_bytes(vec), timeout=settings.QUERY_EMBEDDING_CACHE_TTL)
+    return vec
+
+
+def query_cache_stats() -> dict:
+    cache = caches["embeddings"]
+    hits = cache.get(QUERY_CACHE_HITS, 0)
+    misses = cache.get(QUERY_CACHE_MISSES, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+# -------------------------
+# FORMATO BINÁRIO (float32)
+# -------------------------
+def vector_to_bytes(vec) -> bytes:
+    """Serializa o vetor como bytes float32 (formato salvo em File.embedding)."""
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def vector_from_bytes(buf) -> np.ndarray:
+    """
+    Lê o vetor salvo em File.embedding sem cópia (np.frombuffer).
+    Aceita bytes/memoryview; listas (formato JSON antigo) são convertidas.
+    """
+    if buf is None:
+        return None
+    if isinstance(buf, (bytes, bytearray, memoryview)):
+        return np.frombuffer(buf, dtype=np.float32)
+    return np.asarray(buf, dtype=np.float32)
+
+
+def matrix_to_bytes(matrix) -> bytes:
+    """Serializa uma matriz (P, 384) como float16 (File.passage_embeddings)."""
+    return np.asarray(matrix, dtype=np.float16).tobytes()
+
+
+def matrix_from_bytes(buf) -> np.ndarray:
+    """Lê a matriz salva por matrix_to_bytes como float32 (P, 384)."""
+    if not buf:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.frombuffer(buf, dtype=np.float16).reshape(-1, EMBEDDING_DIM).astype(np.float32)
 
-    vec = model.encode(text)
-    return vec.tolist()
 
-def cosine_sim(a, b):
-    a = np.array(a)
-    b = np.array(b)
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
\ No newline at end of file
+def cosine_sim(a, b) -> float:
+    """Cosseno entre dois vetores salvos (bytes float32, listas ou arrays)."""
+    return vector_ops.cosine_sim(vector_from_bytes(a), vector_from_bytes(b))
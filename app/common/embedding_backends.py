@@ -0,0 +1,174 @@
+import inspect
+import json
+import os
+
+import numpy as np
+
+from project import settings
+from common.model_loader import get_model, get_sentence_model, SENTENCE_MODEL_NAME
+from common.vector_ops import normalize_rows
+
+# Backends de embedding plugáveis (settings.EMBEDDING_BACKEND):
+# - "torch":     SentenceTransformer (padrão)
+# - "onnx":      modelo exportado para ONNX rodando no ONNX Runtime
+# - "onnx-int8": idem, com quantização dinâmica int8 dos pesos
+#
+# onnx / onnxruntime são dependências opcionais, só importadas aqui dentro.
+
+ONNX_MODEL = "model.onnx"
+ONNX_MODEL_INT8 = "model.int8.onnx"
+MANIFEST = "manifest.json"
+
+
+class TorchBackend:
+    name = "torch"
+
+    def encode(self, texts: list, batch_size: int = 32) -> np.ndarray:
+        vecs = get_sentence_model().encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+class OnnxBackend:
+    """
+    all-MiniLM-L6-v2 no ONNX Runtime (CPU).
+    Reproduz o pipeline do SentenceTransformer: tokenização,
+    mean pooling pela attention mask e normalização L2.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx requer o pacote onnxruntime") from e
+        from transformers import AutoTokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+
+        with open(os.path.join(model_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.max_length = self.manifest["max_length"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_INT8 if quantized else ONNX_MODEL),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def encode(self, texts: list, batch_size: int = 32) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out.append(normalize_rows(pooled))
+
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(out)
+
+
+def load_backend(name: str):
+    if name == "torch":
+        return TorchBackend()
+    if name in ("onnx", "onnx-int8"):
+        return OnnxBackend(settings.EMBEDDING_ONNX_DIR, quantized=(name == "onnx-int8"))
+    raise ValueError(f"EMBEDDING_BACKEND desconhecido: {name}")
+
+
+def get_backend(name: str = None):
+    """Backend configurado (carregado uma vez por processo)."""
+    name = name or settings.EMBEDDING_BACKEND
+    return get_model(f"embedding_backend:{name}", lambda: load_backend(name))
+
+
+# -------------------------
+# EXPORTAÇÃO / PARIDADE
+# -------------------------
+def export_onnx(output_dir: str, quantize: bool = True, opset: int = 17) -> dict:
+    """
+    Exporta o transformer do SentenceTransformer para ONNX (eixos batch/seq
+    dinâmicos) e, se `quantize`, gera também a versão int8 dinâmica.
+    """
+    import torch
+
+    st = get_sentence_model()
+    transformer = st[0]
+    tokenizer = transformer.tokenizer
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            )[0]
+
+    os.makedirs(output_dir, exist_ok=True)
+    sample = tokenizer(["exemplo de currículo"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "seq"} for n in input_names + ["last_hidden_state"]}
+
+    # torch >= 2.5 usa o exportador dynamo por padrão; aqui queremos o TorchScript
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+
+    model_path = os.path.join(output_dir, ONNX_MODEL)
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(transformer.auto_model.eval()),
+            tuple(sample[n] for n in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **kwargs,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(model_path, os.path.join(output_dir, ONNX_MODEL_INT8), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(output_dir)
+    manifest = {
+        "model": SENTENCE_MODEL_NAME,
+        "max_length": st.max_seq_length,
+        "quantized": quantize,
+    }
+    with open(os.path.join(output_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def parity_check(reference, candidate, texts: list, threshold: float = 0.99) -> dict:
+    """
+    Compara dois backends texto a texto (cosseno entre os vetores).
+    ok=False se algum texto ficar abaixo de `threshold`.
+    """
+    a = normalize_rows(reference.encode(texts))
+    b = normalize_rows(candidate.encode(texts))
+    cos = (a * b).sum(axis=1)
+    return {
+        "mean_cos": float(cos.mean()),
+        "min_cos": float(cos.min()),
+        "threshold": threshold,
+        "ok": bool(cos.min() >= threshold),
+    }
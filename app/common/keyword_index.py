@@ -0,0 +1,116 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# Índice invertido com BM25 para a busca por palavra-chave.
+# Complementa a busca vetorial (MiniLM) em termos exatos ("kubernetes",
+# "sap fi", "c#") e em currículos longos, que o modelo trunca.
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset(
+    "a o e de da do das dos em no na nos nas um uma para por com sem que se "
+    "ao aos as os ou the and of in to for with on at".split()
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sem acento e com espaços normalizados ("" para não-texto)."""
+    if not text or not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def tokenize(text: str) -> list:
+    """Minúsculas, sem acento; mantém tokens técnicos como c++ e c#."""
+    return [t for t in TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+def term_counts(full_text: str, word_cloud=None) -> dict:
+    """Frequência de cada termo do texto + entidades (calculada uma vez no upload)."""
+    tokens = tokenize(full_text)
+    for entity in word_cloud or []:
+        tokens.extend(tokenize(entity))
+    return dict(Counter(tokens))
+
+
+class BM25Index:
+    """
+    Índice invertido termo -> {doc_id: tf} com score BM25 (Okapi).
+    Documentos entram e saem individualmente (sem rebuild).
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.lengths
+
+    def add(self, doc_id, counts: dict):
+        """Adiciona (ou substitui) um documento a partir de {termo: tf}."""
+        self.remove(doc_id)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.doc_terms[doc_id] = tuple(counts)
+        self.lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query: str, k: int = 10, allowed=None) -> list:
+        """
+        [(doc_id, score), ...] dos k melhores, em ordem decrescente.
+        `allowed` (set de doc_ids) restringe os documentos pontuados.
+        """
+        terms = set(tokenize(query))
+        n = len(self.lengths)
+        if not terms or n == 0:
+            return []
+
+        avg_length = self.total_length / n or 1.0
+        scores = {}
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 10, c: int = 60) -> list:
+    """
+    Funde rankings [[doc_id, ...], ...] por RRF: score = soma de 1 / (c + posição).
+    Retorna [(doc_id, score), ...] dos k melhores.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (c + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
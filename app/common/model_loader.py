@@ -0,0 +1,138 @@
+import subprocess
+import sys
+import threading
+import time
+
+# Modelos carregados sob demanda, uma vez por processo.
+# Nada aqui importa torch/spacy no import do módulo: migrate, makemigrations,
+# testes e o boot do gunicorn não pagam esse custo.
+
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
+SPACY_MODEL_NAME = "pt_core_news_sm"
+
+# componentes do spaCy que o sistema usa: só doc.ents (PDFExtractor e model server)
+SPACY_COMPONENTS = ("ner",)
+
+# dependências pesadas medidas pelo relatório de startup
+HEAVY_DEPENDENCIES = [
+    "numpy",
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "spacy",
+    "PyPDF2",
+    "openai",
+]
+
+_lock = threading.Lock()
+_models = {}
+
+# nome do modelo -> segundos gastos no carregamento
+load_times = {}
+
+
+def get_model(name: str, factory):
+    """
+    Retorna o modelo `name`, criando-o com `factory()` na primeira chamada.
+    Thread-safe: threads concorrentes esperam um único carregamento.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = factory()
+            load_times[name] = time.perf_counter() - start
+            _models[name] = model
+    return model
+
+
+def get_sentence_model():
+    """SentenceTransformer usado em common/embedding.py."""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(SENTENCE_MODEL_NAME)
+
+    return get_model("sentence_transformer", load)
+
+
+def required_components(nlp, wanted) -> set:
+    """
+    Componentes `wanted` + os que eles usam: um tok2vec/transformer
+    compartilhado entra se algum dos escolhidos escuta a sua saída.
+    """
+    keep = set(wanted)
+    for name, component in reversed(nlp.pipeline):
+        listeners = getattr(component, "listening_components", None) or []
+        if keep.intersection(listeners):
+            keep.add(name)
+    return keep
+
+
+def prune_pipeline(nlp, wanted=SPACY_COMPONENTS):
+    """Remove do pipeline tudo que não é necessário para `wanted` (no lugar)."""
+    keep = required_components(nlp, wanted)
+    for name in [n for n in nlp.pipe_names if n not in keep]:
+        nlp.remove_pipe(name)
+    return nlp
+
+
+def get_spacy_model(components=SPACY_COMPONENTS):
+    """
+    Pipeline spaCy usado em rh/pdf_extractor.py, só com `components`
+    (e as dependências deles): parser, morphologizer, lemmatizer etc.
+    não rodam em cada currículo. components=None carrega o pipeline completo.
+    """
+    def load():
+        import spacy
+        nlp = spacy.load(SPACY_MODEL_NAME)
+        return prune_pipeline(nlp, components) if components else nlp
+
+    key = "spacy:" + ("+".join(components) if components else "full")
+    return get_model(key, load)
+
+
+def get_cross_encoder(name: str):
+    """CrossEncoder do re-rank da busca (ai/rerank.py)."""
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(name, device="cpu")
+
+    return get_model(f"cross_encoder:{name}", load)
+
+
+def warm_up():
+    """
+    Carrega todos os modelos antes da primeira request
+    (chamado no post_worker_init do gunicorn).
+    """
+    from project import settings
+
+    get_sentence_model()
+    get_spacy_model()
+    # carregar na primeira busca estouraria o orçamento do re-rank
+    if settings.SEARCH_CROSS_ENCODER:
+        get_cross_encoder(settings.SEARCH_CROSS_ENCODER)
+    return dict(load_times)
+
+
+def import_report(modules=None) -> dict:
+    """
+    Mede o tempo de import (s) de cada dependência pesada,
+    cada uma num interpretador novo para não somar imports já feitos.
+    Retorna None para módulos que não estão instalados.
+    """
+    report = {}
+    for module in modules or HEAVY_DEPENDENCIES:
+        code = (
+            "import time; t = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - t)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        report[module] = float(result.stdout) if result.returncode == 0 else None
+    return report
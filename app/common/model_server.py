@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from project import settings
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# PROTOCOLO
+# -------------------------
+# Cada mensagem: 4 bytes (tamanho do header JSON) + header JSON + corpo binário
+# opcional (header["nbytes"] bytes).
+#
+# requests:  {"op": "encode", "texts": [...]}
+#            {"op": "ner", "texts": [...]}
+# respostas: encode -> {"shape": [n, d], "nbytes": ...} + float32 bytes
+#            ner    -> {"entities": [[[texto, label], ...], ...]}
+#            erro   -> {"error": "..."}
+
+_HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("conexão fechada pelo outro lado")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_message(sock, header: dict, body: bytes = b""):
+    header = dict(header, nbytes=len(body))
+    raw = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(raw)) + raw + body)
+
+
+def recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, size))
+    body = _recv_exact(sock, header.get("nbytes", 0))
+    return header, body
+
+
+# -------------------------
+# MICRO-BATCHING
+# -------------------------
+class MicroBatcher:
+    """
+    Junta requests concorrentes num único lote.
+
+    Cada `submit(items)` entra numa fila; uma thread pega o primeiro pedido,
+    espera até `max_wait` segundos (ou `max_batch` itens) por outros,
+    chama `fn(todos_os_itens)` uma vez e devolve a fatia de cada pedido.
+    """
+
+    def __init__(self, fn, max_batch: int = 64, max_wait: float = 0.005):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, items: list):
+        future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            items = [i for texts, _ in batch for i in texts]
+            try:
+                results = self.fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for texts, future in batch:
+                future.set_result(results[start:start + len(texts)])
+                start += len(texts)
+
+
+# -------------------------
+# SERVIDOR
+# -------------------------
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                if header["op"] == "encode":
+                    vecs = server.encoder.submit(header["texts"])
+                    vecs = np.asarray(vecs, dtype=np.float32)
+                    send_message(self.request, {"shape": list(vecs.shape)}, vecs.tobytes())
+                elif header["op"] == "ner":
+                    ents = server.ner.submit(header["texts"])
+                    send_message(self.request, {"entities": ents})
+                else:
+                    send_message(self.request, {"error": f"op desconhecida: {header['op']}"})
+            except Exception as e:
+                logger.exception("model server: falha ao processar %s", header.get("op"))
+                send_message(self.request, {"error": str(e)})
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Processo único que carrega o backend de embedding e o spaCy e atende
+    os workers do gunicorn por um Unix socket.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, max_batch: int = 64, max_wait: float = 0.005):
+        from common.embedding_backends import get_backend
+        from common.model_loader import get_spacy_model
+
+        backend = get_backend()
+        nlp = get_spacy_model()
+
+        self.encoder = MicroBatcher(
+            lambda texts: backend.encode(texts, batch_size=max_batch),
+            max_batch=max_batch, max_wait=max_wait,
+        )
+        self.ner = MicroBatcher(
+            lambda texts: [
+                [[ent.text, ent.label_] for ent in doc.ents] for doc in nlp.pipe(texts)
+            ],
+            max_batch=max_batch, max_wait=max_wait,
+        )
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+
+
+# -------------------------
+# CLIENTE
+# -------------------------
+class ModelClient:
+    """Cliente do ModelServer (uma conexão por chamada)."""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _call(self, header: dict):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, header)
+            response, body = recv_message(sock)
+
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response, body
+
+    def encode(self, texts) -> np.ndarray:
+        response, body = self._call({"op": "encode", "texts": list(texts)})
+        return np.frombuffer(body, dtype=np.float32).reshape(response["shape"])
+
+    def ner(self, texts) -> list:
+        response, _ = self._call({"op": "ner", "texts": list(texts)})
+        return response["entities"]
+
+
+def get_client():
+    """Cliente do servidor configurado em MODEL_SERVER_SOCKET, ou None (modelo em processo)."""
+    socket_path = getattr(settings, "MODEL_SERVER_SOCKET", None)
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    return ModelClient(socket_path)
@@ -0,0 +1,65 @@
+import numpy as np
+
+# Quantização das embeddings normalizadas para a primeira passada da busca:
+# - "int8":   8 bits por dimensão (4x menor que float32), produto interno
+#             com os códigos convertidos bloco a bloco (BLAS; o matmul inteiro
+#             do numpy não usa BLAS e é mais lento)
+# - "binary": 1 bit por dimensão (32x menor), distância de Hamming (popcount)
+# O ranking final é refeito com o cosseno exato em float dos melhores.
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# popcount de cada byte (numpy 1.x não tem np.bitwise_count)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class Quantizer:
+    """Codifica vetores normalizados e pontua a consulta contra os códigos."""
+
+    def __init__(self, mode: str, block: int = 4096):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"quantização desconhecida: {mode}")
+        self.mode = mode
+        self.block = block
+        self.scale = 127.0
+
+    def fit(self, matrix: np.ndarray):
+        """Escala simétrica do int8 a partir do maior |valor| do corpus."""
+        if self.mode == "int8" and matrix.size:
+            max_abs = float(np.abs(matrix).max())
+            self.scale = 127.0 / max_abs if max_abs > 0 else 127.0
+        return self
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+        if self.mode == "int8":
+            return np.clip(np.rint(matrix * self.scale), -127, 127).astype(np.int8)
+        return np.packbits(matrix > 0, axis=1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Score aproximado de cada linha (maior = mais similar), em blocos
+        para limitar a memória temporária.
+        """
+        q = self.encode(query)[0]
+
+        if self.mode == "int8":
+            out = np.empty(len(codes), dtype=np.float32)
+            q = q.astype(np.float32)
+            for start in range(0, len(codes), self.block):
+                out[start:start + self.block] = codes[start:start + self.block].astype(np.float32) @ q
+        else:
+            out = np.empty(len(codes), dtype=np.int32)
+            for start in range(0, len(codes), self.block):
+                xor = np.bitwise_xor(codes[start:start + self.block], q)
+                out[start:start + self.block] = -POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+        return out
+
+    @staticmethod
+    def nbytes(n: int, dim: int, mode: str) -> int:
+        """Memória (bytes) de n vetores de `dim` dimensões no modo dado."""
+        if mode == "int8":
+            return n * dim
+        if mode == "binary":
+            return n * ((dim + 7) // 8)
+        return n * dim * 4
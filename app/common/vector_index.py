@@ -0,0 +1,317 @@
+import numpy as np
+
+from common.vector_ops import normalize_rows, top_k, unit_vector
+
+
+# -------------------------
+# SEGMENTOS (várias linhas por documento)
+# -------------------------
+def segment_max(scores: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Máximo de cada segmento scores[offsets[i]:offsets[i + 1]] numa única
+    chamada (np.maximum.reduceat). Todo segmento precisa ser não vazio.
+    """
+    return np.maximum.reduceat(scores, offsets[:-1], axis=0)
+
+
+def segment_top_mean(scores: np.ndarray, offsets: np.ndarray, m: int) -> np.ndarray:
+    """
+    Média dos m maiores scores de cada segmento (vetorizado, sem loop por segmento).
+    Com scores 2D (linhas x consultas) calcula coluna a coluna.
+    """
+    if scores.ndim == 2:
+        return np.stack([segment_top_mean(col, offsets, m) for col in scores.T], axis=1)
+    lengths = np.diff(offsets)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    # ordena por segmento e, dentro dele, por score decrescente
+    order = np.lexsort((-scores, segment))
+    rank = np.arange(len(scores)) - np.repeat(offsets[:-1], lengths)
+    keep = rank < m
+    sums = np.bincount(segment[keep], weights=scores[order][keep], minlength=len(lengths))
+    return (sums / np.minimum(lengths, m)).astype(np.float32)
+
+
+class _Buffer:
+    """Vetores (capacidade, d) compartilhados pelas versões de um SegmentMatrix; `size` linhas em uso."""
+
+    def __init__(self, array: np.ndarray, size: int):
+        self.array = array
+        self.size = size
+
+
+class SegmentMatrix:
+    """
+    Matriz de vetores agrupados em segmentos (ex.: trechos de cada
+    currículo): o segmento i são as linhas starts[i]:starts[i] + lengths[i]
+    de `vectors`. O score de cada segmento é o máximo (ou a média dos m
+    maiores) dos seus vetores.
+
+    Imutável para quem lê: alterações devolvem uma nova instância. Blocos
+    novos só são acrescentados no fim de um buffer com folga (que dobra
+    quando enche), então insert/replace não recopiam a matriz; vetores
+    substituídos ou removidos ficam como lixo até passarem de COMPACT_RATIO
+    do buffer, quando os segmentos são recopiados em ordem (compactação).
+    """
+
+    COMPACT_RATIO = 0.5
+
+    def __init__(self, vectors: np.ndarray, offsets: np.ndarray):
+        """Segmentos contíguos e em ordem: vectors (M, d) + offsets (N + 1)."""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self._buffer = _Buffer(vectors, len(vectors))
+        self._used = len(vectors)
+        self.starts = offsets[:-1].copy()
+        self.lengths = np.diff(offsets)
+        self._compact = True
+
+    @classmethod
+    def from_blocks(cls, blocks: list, dim: int) -> "SegmentMatrix":
+        lengths = [len(b) for b in blocks]
+        offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+        return cls(vectors.astype(np.float32, copy=False), offsets)
+
+    def _derive(self, starts, lengths, buffer=None, used=None) -> "SegmentMatrix":
+        new = SegmentMatrix.__new__(SegmentMatrix)
+        new._buffer = buffer or self._buffer
+        new._used = self._used if used is None else used
+        new.starts = starts
+        new.lengths = lengths
+        new._compact = False
+        return new._maybe_compact()
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Buffer em uso (M, d); fora da forma compacta inclui vetores mortos."""
+        return self._buffer.array[:self._used]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """Offsets (N + 1) dos segmentos; só correspondem a `vectors` na forma compacta."""
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=offsets[1:])
+        return offsets
+
+    @property
+    def live(self) -> int:
+        """Vetores em uso pelos segmentos (sem o lixo)."""
+        return int(self.lengths.sum())
+
+    def block(self, i: int) -> np.ndarray:
+        return self.vectors[self.starts[i]:self.starts[i] + self.lengths[i]]
+
+    # -------------------------
+    # ALTERAÇÕES (append-only)
+    # -------------------------
+    def _append(self, block: np.ndarray):
+        """Acrescenta `block` depois do buffer em uso: (buffer, início, linhas em uso)."""
+        buffer, used, n = self._buffer, self._used, len(block)
+        # só escreve no buffer compartilhado se ninguém acrescentou depois desta versão
+        if buffer.size != used or used + n > len(buffer.array) or not buffer.array.flags.writeable:
+            capacity = max(2 * (used + n), 64)
+            array = np.empty((capacity, buffer.array.shape[1]), dtype=np.float32)
+            array[:used] = buffer.array[:used]
+            buffer = _Buffer(array, used)
+        buffer.array[used:used + n] = block
+        buffer.size = used + n
+        return buffer, used, used + n
+
+    def insert(self, pos: int, block: np.ndarray) -> "SegmentMatrix":
+        buffer, start, used = self._append(block)
+        return self._derive(
+            np.insert(self.starts, pos, start), np.insert(self.lengths, pos, len(block)), buffer, used
+        )
+
+    def take(self, keep: np.ndarray) -> "SegmentMatrix":
+        return self._derive(self.starts[keep], self.lengths[keep])
+
+    def replace(self, mask: np.ndarray, block: np.ndarray) -> "SegmentMatrix":
+        rows = np.flatnonzero(mask)
+        # um bloco por linha: segmentos nunca compartilham vetores (lixo = buffer - live)
+        buffer, start, used = self._append(np.concatenate([block] * len(rows)) if len(rows) else block[:0])
+        starts, lengths = self.starts.copy(), self.lengths.copy()
+        starts[rows] = start + len(block) * np.arange(len(rows))
+        lengths[rows] = len(block)
+        return self._derive(starts, lengths, buffer, used)
+
+    def _gather(self, rows: np.ndarray):
+        """Posições no buffer dos vetores dos segmentos `rows`, em ordem, e os offsets deles."""
+        starts, lengths = self.starts[rows], self.lengths[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        idx = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+        return idx, offsets
+
+    def _maybe_compact(self) -> "SegmentMatrix":
+        if self._used - self.live <= self.COMPACT_RATIO * self._used:
+            return self
+        return self.compacted()
+
+    def compacted(self) -> "SegmentMatrix":
+        """Cópia com os segmentos contíguos e em ordem, sem lixo."""
+        if self._compact:
+            return self
+        idx, offsets = self._gather(np.arange(len(self)))
+        return SegmentMatrix(self.vectors[idx], offsets)
+
+    # -------------------------
+    # SCORE
+    # -------------------------
+    def scores(self, query: np.ndarray, rows: np.ndarray = None, m: int = 1) -> np.ndarray:
+        """
+        Score de cada segmento (de `rows`, se dado) contra a consulta:
+        m=1 -> máximo; m>1 -> média dos m maiores.
+        Com várias consultas (Q, d) retorna (segmentos, Q).
+        """
+        if rows is None and self._compact:
+            scores, offsets = self.vectors @ query.T, self.offsets
+        elif rows is None:
+            # pontua o buffer inteiro (sem copiar vetores) e junta os scores de cada segmento
+            idx, offsets = self._gather(np.arange(len(self)))
+            scores = (self.vectors @ query.T)[idx]
+        else:
+            # junta só os vetores dos segmentos pedidos, sem loop em Python
+            idx, offsets = self._gather(rows)
+            scores = self.vectors[idx] @ query.T
+
+        if m <= 1:
+            return segment_max(scores, offsets)
+        return segment_top_mean(scores, offsets, m)
+
+
+class IVFIndex:
+    """
+    Índice aproximado (IVF flat) para busca por similaridade de cosseno.
+
+    Os vetores são agrupados por k-means esférico em `n_lists` listas.
+    Na busca só as `n_probe` listas mais próximas da consulta são varridas:
+    - n_probe maior  -> recall maior, latência maior
+    - n_probe == n_lists -> busca exata
+
+    As listas guardam posições na matriz do build (não uma cópia
+    reordenada dos vetores). Com poucos vetores (< min_train) o índice
+    faz busca exata direto.
+    """
+
+    def __init__(self, n_lists: int = None, n_probe: int = 8, n_iter: int = 10,
+                 min_train: int = 1024, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.min_train = min_train
+        self.seed = seed
+        self._reset()
+
+    def _reset(self):
+        self.dim = None
+        self.centroids = None
+        self._vectors = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._ids)
+
+    # -------------------------
+    # CONSTRUÇÃO
+    # -------------------------
+    def build(self, vectors, ids, normalized: bool = False, keep_vectors: bool = True):
+        """
+        Constrói o índice a partir de uma matriz (N, dim) e dos ids de cada linha.
+
+        normalized=True: a matriz já tem linhas de norma 1 e é usada como
+        está, sem cópia. keep_vectors=False: o índice não guarda a matriz
+        depois do treino e só `probe` funciona (quem chama pontua as linhas
+        na matriz que mantém).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n = len(ids)
+        if n == 0:
+            self._reset()
+            return self
+
+        vectors = np.asarray(vectors).reshape(n, -1)
+        if not normalized:
+            vectors = normalize_rows(vectors)
+        self.dim = vectors.shape[1]
+        self._ids = ids
+        self._vectors = vectors if keep_vectors else None
+
+        n_lists = self.n_lists or int(np.sqrt(n))
+        if n < self.min_train or n_lists < 2:
+            # busca exata: uma única lista com tudo
+            self.centroids = None
+            self._rows = np.arange(n, dtype=np.int64)
+            self._offsets = np.array([0, n], dtype=np.int64)
+            return self
+
+        centroids, assign = self._kmeans(vectors, min(n_lists, n))
+        counts = np.bincount(assign, minlength=len(centroids))
+
+        self.centroids = centroids
+        self._rows = np.argsort(assign, kind="stable")
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+
+    def _kmeans(self, vectors: np.ndarray, k: int):
+        """K-means esférico (produto interno) com Lloyd vetorizado."""
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+        assign = np.zeros(len(vectors), dtype=np.int64)
+        for _ in range(self.n_iter):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+
+            # listas vazias mantêm o centróide anterior
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        return centroids, assign
+
+    # -------------------------
+    # BUSCA
+    # -------------------------
+    def _probe_rows(self, query, n_probe: int = None) -> np.ndarray:
+        """Posições (na matriz do build) das linhas das `n_probe` listas mais próximas."""
+        if self.centroids is None:
+            return self._rows
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        lists = top_k(self.centroids @ query, n_probe)
+        return np.concatenate([self._rows[self._offsets[l]:self._offsets[l + 1]] for l in lists])
+
+    def probe(self, query, n_probe: int = None) -> np.ndarray:
+        """Ids das linhas das `n_probe` listas mais próximas da consulta (sem pontuar)."""
+        query = unit_vector(query, self.dim)
+        if len(self._ids) == 0 or query is None:
+            return np.zeros(0, dtype=np.int64)
+        return self._ids[self._probe_rows(query, n_probe)]
+
+    def search(self, query, k: int = 10, n_probe: int = None):
+        """
+        Retorna (ids, scores) dos k vetores mais similares à consulta.
+        """
+        query = unit_vector(query, self.dim)
+        if len(self._ids) == 0 or query is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if self._vectors is None:
+            raise ValueError("índice construído com keep_vectors=False: use probe()")
+
+        if self.centroids is None:
+            # lista única: pontua a matriz inteira sem indexar
+            scores = self._vectors @ query
+            best = top_k(scores, min(k, len(scores)))
+            return self._ids[best], scores[best]
+
+        rows = self._probe_rows(query, n_probe)
+        scores = self._vectors[rows] @ query
+        best = top_k(scores, min(k, len(scores)))
+        return self._ids[rows[best]], scores[best]
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Kernels de álgebra vetorial usados por todos os caminhos de ranking
+# (ai.search, common.vector_index, ai.result_cache, benchmarks).
+#
+# Convenções:
+# - tudo em float32, vetores como linhas de uma matriz (N, d)
+# - vetor nulo (ou o [0.0] que create_embedding devolve para texto vazio)
+#   não tem direção: normalizado continua nulo e tem cosseno 0 com tudo
+# - top-k por argpartition (O(N)) e só os k escolhidos são ordenados
+
+
+def as_matrix(vectors) -> np.ndarray:
+    """(N, d) float32 sem cópia quando já está no formato; aceita um vetor só (1, d)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def row_norms(matrix: np.ndarray) -> np.ndarray:
+    """Norma L2 de cada linha, sem materializar matrix ** 2."""
+    return np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+
+
+def normalize_rows(matrix, copy: bool = True) -> np.ndarray:
+    """
+    Normaliza (L2) cada linha da matriz. Linhas zeradas continuam zeradas.
+    Com copy=False normaliza no lugar (se a entrada já for float32).
+    """
+    matrix = np.array(matrix, dtype=np.float32, copy=copy)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = row_norms(matrix)
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix
+
+
+def unit_vector(vec, dim: int = None):
+    """
+    Consulta pronta para produto interno: vetor float32 de norma 1,
+    ou None se vazio, nulo ou de dimensão diferente de `dim`.
+    """
+    if vec is None:
+        return None
+    vec = np.asarray(vec, dtype=np.float32).ravel()
+    if len(vec) == 0 or (dim is not None and len(vec) != dim):
+        return None
+    norm = float(np.sqrt(vec @ vec))
+    if norm == 0:
+        return None
+    return vec / norm
+
+
+def cosine_sim(a, b) -> float:
+    """Cosseno entre dois vetores; 0.0 se algum for nulo ou as dimensões diferirem."""
+    a = np.asarray(a, dtype=np.float32).ravel()
+    b = np.asarray(b, dtype=np.float32).ravel()
+    if a.shape != b.shape:
+        return 0.0
+    denom = float(np.sqrt((a @ a) * (b @ b)))
+    return float(a @ b) / denom if denom else 0.0
+
+
+def cosine_matrix(a, b) -> np.ndarray:
+    """Cossenos (N, M) entre as linhas de `a` e de `b` (linhas nulas -> 0)."""
+    return normalize_rows(a) @ normalize_rows(b).T
+
+
+# -------------------------
+# TOP-K
+# -------------------------
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Posições dos k maiores scores, em ordem decrescente."""
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """top_k de cada linha de scores (Q, N): posições (Q, k) em ordem decrescente."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(k), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def merge_top_k(best_scores, best_ids, scores, ids, k: int):
+    """
+    Junta o top-k corrente de cada consulta (Q, k) com os scores de um
+    novo bloco (Q, B) de `ids` (B,). Retorna o novo top-k (não ordenado).
+    """
+    scores = np.hstack([best_scores, scores])
+    ids = np.hstack([best_ids, np.broadcast_to(ids, (len(scores), len(ids)))])
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        ids = np.take_along_axis(ids, keep, axis=1)
+    return scores, ids
+
+
+def block_rows(n_queries: int, memory_bytes: float, row_bytes: float = 0) -> int:
+    """
+    Linhas por bloco para a matriz de scores (Q, B) em float32 caber em
+    `memory_bytes`; `row_bytes` soma o que mais cada linha do bloco ocupa.
+    """
+    return max(int(memory_bytes // (n_queries * 4 + row_bytes)), 1)
+
+
+def blocked_top_k(score_block, rows: np.ndarray, n_queries: int, k: int, block: int):
+    """
+    Top-k de Q consultas sobre `rows` sem materializar a matriz (Q, N):
+    `score_block(chunk)` devolve os scores (Q, B) das linhas `chunk`,
+    e o top-k corrente é fundido bloco a bloco (merge_top_k).
+    Retorna (scores, rows), ambos (Q, k), em ordem decrescente.
+    """
+    k = min(k, len(rows))
+    best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((n_queries, 0), dtype=np.int64)
+    for start in range(0, len(rows), block):
+        chunk = rows[start:start + block]
+        best_scores, best_rows = merge_top_k(best_scores, best_rows, score_block(chunk), chunk, k)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+
+def matrix_top_k(queries, matrix: np.ndarray, k: int, block: int = 65536):
+    """Top-k por produto interno de cada consulta contra `matrix`, em blocos de linhas."""
+    queries = as_matrix(queries)
+    return blocked_top_k(
+        lambda chunk: queries @ matrix[chunk[0]:chunk[-1] + 1].T,
+        np.arange(len(matrix)), len(queries), k, block,
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0006_candidate_profile_resume'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='candidate',
+            name='years_experience',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True),
+        ),
+    ]
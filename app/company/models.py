@@ -71,7 +71,8 @@ class Candidate(models.Model):
         blank=True,
         null=True,
     )
-    years_experience = models.PositiveIntegerField(default=0)
+    # None = não informado (a busca não o trata como 0 anos nos filtros)
+    years_experience = models.PositiveIntegerField(blank=True, null=True, default=None)
     location = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     user_creator = models.ForeignKey(
@@ -111,7 +112,11 @@ class Candidate(models.Model):
         Retorna um resumo textual do perfil do candidato.
         """
         if not self.profile_resume:
-            self.profile_resume = f"{self.name}, {self.get_age()} anos, {self.years_experience} anos de experiência — atualmente em '{self.current_position or 'sem posição atual'}'."
+            experience = (
+                f"{self.years_experience} anos de experiência"
+                if self.years_experience is not None else "experiência não informada"
+            )
+            self.profile_resume = f"{self.name}, {self.get_age()} anos, {experience} — atualmente em '{self.current_position or 'sem posição atual'}'."
             self.save()
         return self.profile_resume
 
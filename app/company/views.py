@@ -76,7 +76,7 @@ class CandidateViewSet(viewsets.ModelViewSet):
             email=serializer.validated_data["email"],
             birth_date=serializer.validated_data["birth_date"],
             current_position=serializer.validated_data.get("current_position"),
-            years_experience=serializer.validated_data.get("years_experience", 0),
+            years_experience=serializer.validated_data.get("years_experience"),
             location=serializer.validated_data.get("location"),
             phone=serializer.validated_data["phone"],
             user_creator=request.user,  # vem do token
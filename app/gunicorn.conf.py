@@ -0,0 +1,17 @@
+import os
+
+# Lido automaticamente pelo gunicorn (cwd = pasta da aplicação).
+
+
+def post_worker_init(worker):
+    """Carrega os modelos de IA antes do worker aceitar requests."""
+    if os.environ.get("WARMUP_MODELS", "1") != "1":
+        return
+
+    from common.model_loader import warm_up
+
+    times = warm_up()
+    worker.log.info(
+        "modelos carregados: %s",
+        ", ".join(f"{name}={secs:.2f}s" for name, secs in times.items()),
+    )
@@ -191,4 +191,83 @@ X_API_KEY = os.environ.get("X_API_KEY", SECRET_KEY)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 BASE_URL = "http://127.0.0.1:8000"  # coloque sua URL real
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
\ No newline at end of file
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Busca semântica de candidatos (ai.search)
+SEARCH_TOP_K = int(os.environ.get("SEARCH_TOP_K", 50))
+SEARCH_IVF_LISTS = int(os.environ.get("SEARCH_IVF_LISTS", 0))  # 0 = sqrt(N)
+SEARCH_IVF_PROBE = int(os.environ.get("SEARCH_IVF_PROBE", 8))  # recall x latência
+SEARCH_IVF_MIN_TRAIN = int(os.environ.get("SEARCH_IVF_MIN_TRAIN", 1024))  # abaixo disso: busca exata
+SEARCH_QUANTIZATION = os.environ.get("SEARCH_QUANTIZATION", "none")  # none | int8 | binary
+SEARCH_RERANK = int(os.environ.get("SEARCH_RERANK", 200))  # re-rank em float após a quantização
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "vector")  # vector | keyword | hybrid
+SEARCH_HYBRID_POOL = int(os.environ.get("SEARCH_HYBRID_POOL", 100))  # candidatos de cada lista no RRF
+SEARCH_PASSAGES = os.environ.get("SEARCH_PASSAGES", "0") == "1"  # score = melhor trecho do currículo (até 33 vetores por arquivo em memória)
+SEARCH_PASSAGE_TOP_M = int(os.environ.get("SEARCH_PASSAGE_TOP_M", 1))  # 1 = máximo; m > 1 = média dos m melhores
+SEARCH_BATCH_MEMORY_MB = int(os.environ.get("SEARCH_BATCH_MEMORY_MB", 256))  # teto dos blocos (Q, N) do match em lote
+
+# Re-rank do prompt com cross-encoder (ai.rerank); vazio = desligado.
+# Ex.: cross-encoder/ms-marco-MiniLM-L-6-v2
+SEARCH_CROSS_ENCODER = os.environ.get("SEARCH_CROSS_ENCODER", "")
+SEARCH_CROSS_ENCODER_TOP_K = int(os.environ.get("SEARCH_CROSS_ENCODER_TOP_K", 20))  # hits re-pontuados
+SEARCH_CROSS_ENCODER_BUDGET_MS = int(os.environ.get("SEARCH_CROSS_ENCODER_BUDGET_MS", 150))  # senão, ordem do bi-encoder
+SEARCH_CROSS_ENCODER_WORKERS = int(os.environ.get("SEARCH_CROSS_ENCODER_WORKERS", 2))
+
+# Trechos do currículo (embeddings por passagem)
+EMBEDDING_PASSAGE_WORDS = int(os.environ.get("EMBEDDING_PASSAGE_WORDS", 160))
+EMBEDDING_PASSAGE_OVERLAP = int(os.environ.get("EMBEDDING_PASSAGE_OVERLAP", 40))
+EMBEDDING_MAX_PASSAGES = int(os.environ.get("EMBEDDING_MAX_PASSAGES", 32))
+
+# Snapshot em disco das embeddings (manage.py embedding_snapshot); vazio = desligado.
+# Cada pasta vale enquanto a corpus_version e o corpus_epoch (ambos lidos do banco) baterem.
+EMBEDDING_SNAPSHOT_DIR = os.environ.get("EMBEDDING_SNAPSHOT_DIR", "")
+
+# Cache semântico de resultados (ai.result_cache)
+SEARCH_RESULT_CACHE_THRESHOLD = float(os.environ.get("SEARCH_RESULT_CACHE_THRESHOLD", 0.97))
+SEARCH_RESULT_CACHE_SIZE = int(os.environ.get("SEARCH_RESULT_CACHE_SIZE", 50))  # prompts por empresa
+SEARCH_RESULT_CACHE_TTL = int(os.environ.get("SEARCH_RESULT_CACHE_TTL", 60 * 60))
+
+# Leitura dos PDFs (rh.pdf_extractor.read_pdf_text): páginas / caracteres no máximo
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 30))
+PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS", 100_000))
+
+# Extração de currículos em lote (rh.pdf_extractor.extract_resumes)
+RESUME_PDF_WORKERS = int(os.environ.get("RESUME_PDF_WORKERS", 4))  # processos lendo PDFs
+RESUME_NLP_BATCH_SIZE = int(os.environ.get("RESUME_NLP_BATCH_SIZE", 32))  # textos por lote do nlp.pipe
+RESUME_NLP_PROCESSES = int(os.environ.get("RESUME_NLP_PROCESSES", 1))  # n_process do nlp.pipe
+
+# Servidor local de modelos (manage.py model_server). Vazio = modelos no próprio worker
+MODEL_SERVER_SOCKET = os.environ.get("MODEL_SERVER_SOCKET")
+
+# Backend de embedding: torch | onnx | onnx-int8 (ver manage.py onnx_export)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR", str(BASE_DIR / "models" / "minilm-onnx"))
+
+# Cache: locmem por padrão; Redis (django-redis) quando REDIS_URL estiver definido
+REDIS_URL = os.environ.get("REDIS_URL")
+QUERY_EMBEDDING_CACHE_TTL = int(os.environ.get("QUERY_EMBEDDING_CACHE_TTL", 60 * 60 * 24))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 10000))
+
+if REDIS_URL:
+    CACHES = {
+        alias: {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": alias,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+        for alias in ("default", "embeddings")
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "default",
+        },
+        # LRU limitado a QUERY_EMBEDDING_CACHE_SIZE prompts
+        "embeddings": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "embeddings",
+            "OPTIONS": {"MAX_ENTRIES": QUERY_EMBEDDING_CACHE_SIZE},
+        },
+    }
@@ -0,0 +1,130 @@
+import re
+from functools import cached_property
+
+# Campos do currículo extraídos por regex (PDFExtractor.extract_resume_info).
+# Todos os padrões são compilados uma vez, no import, e o texto em minúsculas
+# é calculado uma vez por currículo e compartilhado entre os campos. Cada
+# padrão varre o texto uma vez só e para no primeiro match; a lista de
+# cidades vira uma única regex em vez de um `in` (e um lower()) por cidade,
+# e o padrão "Cidade - UF" só roda a partir da primeira UF candidata.
+
+EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+PHONE_RE = re.compile(r"(\(?\d{2}\)?\s?\d{4,5}[-.\s]?\d{4})")
+
+# aplicados ao texto em minúsculas
+AGE_RE = re.compile(r"(\d{2})\s*anos")
+YEARS_RE = re.compile(r"(\d{1,2})\s*(anos de experiência|anos experiência|anos exp)")
+
+# em ordem de prioridade: o primeiro padrão que aparecer no texto vence
+POSITION_RES = [
+    re.compile(pat, flags=re.IGNORECASE)
+    for pat in (
+        r"cargo atual[:\- ]*(.+)",
+        r"posição atual[:\- ]*(.+)",
+        r"atualmente em[:\- ]*(.+)",
+        r"atual[:\- ]*(.+)",
+    )
+]
+
+SKILLS_RE = re.compile(r"(habilidades|skills)[:\- ]*(.+?)(\n\n|\Z)", flags=re.IGNORECASE | re.DOTALL)
+SKILLS_SPLIT_RE = re.compile(r"[,•\n]")
+
+# "Cidade - UF", "Cidade/UF", "Cidade, UF"
+UFS = "SP|RJ|MG|ES|RS|SC|PR|BA|PE|CE|GO|DF|AM|PA|PB|RN|SE|MT|MS|RO|RR|AC|AP|MA|TO"
+LOCATION_RE = re.compile(r"([A-ZÁ-Úa-zá-ú\s]+)[\-\/,\s]+(" + UFS + ")")
+# Todo match de LOCATION_RE fica dentro de um trecho contínuo desses caracteres
+# e termina numa UF precedida de separador. Procurar direto com LOCATION_RE
+# testa (com backtracking) cada posição de cada frase do currículo; por isso
+# a busca começa no trecho da primeira UF candidata.
+UF_CANDIDATE_RE = re.compile(r"[\-\/,\s](?:" + UFS + ")")
+LOCATION_CHARS_RE = re.compile(r"[A-ZÁ-Úa-zá-ú\s\-\/,]")
+
+# lista básica de cidades do Brasil (curta, mas útil), em ordem de prioridade
+CITIES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Curitiba",
+    "Salvador", "Fortaleza", "Recife", "Porto Alegre", "Manaus", "Belém",
+    "Goiânia", "Campinas", "Florianópolis", "Vitória", "São Luís"
+]
+CITY_BY_LOWER = {city.lower(): city for city in CITIES}
+# lookahead: acha também ocorrências sobrepostas
+CITIES_RE = re.compile("(?=(" + "|".join(re.escape(c) for c in CITY_BY_LOWER) + "))")
+
+
+class FieldScanner:
+    """
+    Campos de um texto de currículo, calculados sob demanda e uma vez só.
+    Mesmo resultado dos extratores originais do PDFExtractor.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def email(self):
+        match = EMAIL_RE.search(self.text)
+        return match.group(0) if match else None
+
+    @cached_property
+    def phone(self):
+        match = PHONE_RE.search(self.text)
+        return match.group(1) if match else None
+
+    @cached_property
+    def age(self):
+        match = AGE_RE.search(self.lower)
+        return int(match.group(1)) if match else None
+
+    @cached_property
+    def years_experience(self):
+        match = YEARS_RE.search(self.lower)
+        return int(match.group(1)) if match else None
+
+    @cached_property
+    def current_position(self):
+        for pattern in POSITION_RES:
+            match = pattern.search(self.text)
+            if match:
+                # pega só a primeira frase
+                return match.group(1).split("\n")[0].strip()
+        return None
+
+    @cached_property
+    def skills(self) -> list:
+        block = SKILLS_RE.search(self.text)
+        if not block:
+            return []
+        items = SKILLS_SPLIT_RE.split(block.group(2))
+        return [i.strip() for i in items if len(i.strip()) > 1]
+
+    @cached_property
+    def location(self):
+        """Localização por padrão "Cidade - UF" ou pela lista de cidades (sem o fallback do spaCy)."""
+        candidate = UF_CANDIDATE_RE.search(self.text)
+        if candidate:
+            start = candidate.start()
+            while start > 0 and LOCATION_CHARS_RE.match(self.text, start - 1):
+                start -= 1
+            match = LOCATION_RE.search(self.text, start)
+            if match:
+                return f"{match.group(1).strip()} - {match.group(2).strip()}"
+
+        found = {m.group(1) for m in CITIES_RE.finditer(self.lower)}
+        for lower, city in CITY_BY_LOWER.items():
+            if lower in found:
+                return city
+        return None
+
+    def fields(self) -> dict:
+        return {
+            "email": self.email,
+            "telefone": self.phone,
+            "idade": self.age,
+            "anos_experiencia": self.years_experience,
+            "cargo_atual": self.current_position,
+            "habilidades": self.skills,
+            "location": self.location,
+        }
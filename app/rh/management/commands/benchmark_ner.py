@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.model_loader import SPACY_COMPONENTS, SPACY_MODEL_NAME, prune_pipeline
+from rh.pdf_extractor import extract_pdf_text
+
+SAMPLE_RESUME = (
+    "Maria Silva\nSão Paulo - SP\nmaria.silva@email.com (11) 98765-4321\n"
+    "Desenvolvedora Python com 8 anos de experiência. Cargo atual: Engenheira de Software "
+    "na Empresa Exemplo Ltda. Trabalhou no Banco do Brasil e na Petrobras em Curitiba.\n"
+    "Habilidades: Python, Django, PostgreSQL, Docker, Kubernetes\n"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o pipeline spaCy completo com o podado (só NER + dependências): "
+        "tempo de carga, ms por currículo e se as entidades são as mesmas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="PDFs de exemplo (padrão: um currículo sintético).")
+        parser.add_argument("--docs", type=int, default=50, help="Documentos sintéticos sem PDFs.")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        import spacy
+
+        if options["paths"]:
+            texts = [extract_pdf_text(p) for p in options["paths"]]
+        else:
+            texts = [SAMPLE_RESUME * 4] * options["docs"]
+        texts = [t for t in texts if t]
+        if not texts:
+            raise CommandError("nenhum texto extraído")
+
+        results = {}
+        for label in ("completo", "podado"):
+            start = time.perf_counter()
+            nlp = spacy.load(SPACY_MODEL_NAME)
+            if label == "podado":
+                prune_pipeline(nlp, SPACY_COMPONENTS)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            best, ents = float("inf"), None
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                ents = [[(e.text, e.label_) for e in nlp(t).ents] for t in texts]
+                best = min(best, time.perf_counter() - start)
+            results[label] = (nlp.pipe_names, load_ms, best * 1000 / len(texts), ents)
+
+        self.stdout.write(f"{len(texts)} documentos, modelo {SPACY_MODEL_NAME}\n")
+        self.stdout.write(f"{'pipeline':<10}{'carga ms':>10}{'ms/doc':>10}  componentes")
+        for label, (names, load_ms, doc_ms, _) in results.items():
+            self.stdout.write(f"{label:<10}{load_ms:>10.1f}{doc_ms:>10.2f}  {', '.join(names)}")
+
+        full, pruned = results["completo"], results["podado"]
+        self.stdout.write(f"\nganho por currículo: {full[2] / pruned[2]:.1f}x")
+        if full[3] == pruned[3]:
+            self.stdout.write(self.style.SUCCESS("entidades idênticas"))
+        else:
+            self.stdout.write(self.style.WARNING("entidades diferentes entre os pipelines"))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.model_loader import get_spacy_model
+from rh.pdf_extractor import PDFExtractor, extract_resumes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a extração de currículos arquivo a arquivo (PDFExtractor) com o "
+        "lote (pool de processos para os PDFs + nlp.pipe): docs/s e se os resultados batem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="PDFs de currículo.")
+        parser.add_argument("--workers", type=int, default=None, help="Processos lendo PDFs (RESUME_PDF_WORKERS).")
+        parser.add_argument("--batch-size", type=int, default=None, help="Lote do nlp.pipe (RESUME_NLP_BATCH_SIZE).")
+        parser.add_argument("--n-process", type=int, default=None, help="n_process do nlp.pipe (RESUME_NLP_PROCESSES).")
+
+    def handle(self, *args, **options):
+        paths = options["paths"]
+        # carga do modelo fora da medição
+        get_spacy_model()
+
+        start = time.perf_counter()
+        single = [PDFExtractor(p).extract_resume_info() for p in paths]
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = [
+            e.extract_resume_info()
+            for e in extract_resumes(
+                paths,
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+                n_process=options["n_process"],
+            )
+        ]
+        batch_s = time.perf_counter() - start
+
+        self.stdout.write(f"{len(paths)} PDFs\n")
+        self.stdout.write(f"{'modo':<12}{'s':>8}{'docs/s':>10}")
+        self.stdout.write(f"{'por arquivo':<12}{single_s:>8.2f}{len(paths) / single_s:>10.1f}")
+        self.stdout.write(f"{'lote':<12}{batch_s:>8.2f}{len(paths) / batch_s:>10.1f}")
+        self.stdout.write(f"\nganho: {single_s / batch_s:.1f}x")
+
+        mismatches = [p for p, a, b in zip(paths, single, batch) if a != b]
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"resultados diferentes em: {', '.join(mismatches)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("resultados idênticos"))
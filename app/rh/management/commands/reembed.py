@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from project import settings
+from rh.models import File
+from ai.search import bump_corpus_version
+from company.models import FileCandidate
+from common.embedding import EMBEDDING_VERSION, create_embeddings, split_passages
+
+
+def encode_chunk(texts: list, batch_size: int):
+    """Roda num processo do pool: documento + trechos de cada texto num único encode."""
+    flat, spans = [], []
+    for text in texts:
+        passages = split_passages(text)
+        spans.append((len(flat), len(flat) + 1 + len(passages)))
+        flat.extend([text] + passages)
+
+    vectors = create_embeddings(flat, batch_size=batch_size)
+    return [(vectors[start], vectors[start + 1:end]) for start, end in spans]
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as embeddings (documento + trechos) dos arquivos fora da "
+        "EMBEDDING_VERSION atual, em lotes, com checkpoint para retomar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=32,
+                            help="Textos por lote do model.encode.")
+        parser.add_argument("--chunk", type=int, default=256,
+                            help="Arquivos lidos do banco / salvos por vez.")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Processos de encode (cada um carrega o modelo).")
+        parser.add_argument("--all", action="store_true",
+                            help="Recalcula também os que já estão na versão atual.")
+        parser.add_argument("--checkpoint", default=os.path.join(settings.BASE_DIR, ".reembed-checkpoint.json"),
+                            help="Arquivo com o último id gravado (retomada).")
+        parser.add_argument("--restart", action="store_true",
+                            help="Ignora o checkpoint e começa do início.")
+
+    # -------------------------
+    # CHECKPOINT
+    # -------------------------
+    def read_checkpoint(self, path: str, options) -> int:
+        if options["restart"] or not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            checkpoint = json.load(f)
+        # checkpoint de outra versão/modo não vale
+        if checkpoint.get("version") != EMBEDDING_VERSION or checkpoint.get("all") != options["all"]:
+            return 0
+        return checkpoint["last_id"]
+
+    def write_checkpoint(self, path: str, last_id: int, options):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": EMBEDDING_VERSION, "all": options["all"], "last_id": last_id}, f)
+        os.replace(tmp, path)
+
+    # -------------------------
+    # EXECUÇÃO
+    # -------------------------
+    def handle(self, *args, **options):
+        qs = File.objects.exclude(full_text__isnull=True).exclude(full_text="").order_by("id")
+        if not options["all"]:
+            qs = qs.filter(~Q(embedding_version=EMBEDDING_VERSION) | Q(embedding_version__isnull=True))
+
+        last_id = self.read_checkpoint(options["checkpoint"], options)
+        if last_id:
+            self.stdout.write(f"retomando depois do arquivo {last_id}")
+            qs = qs.filter(id__gt=last_id)
+
+        ids = list(qs.values_list("id", flat=True))
+        chunks = [ids[i:i + options["chunk"]] for i in range(0, len(ids), options["chunk"])]
+        total = len(ids)
+        self.stdout.write(f"{total} arquivos para a versão {EMBEDDING_VERSION}")
+
+        done = 0
+        start = time.monotonic()
+        pool = ProcessPoolExecutor(options["workers"]) if options["workers"] > 1 else None
+        try:
+            for files, results in self.encoded(chunks, pool, options):
+                for f, (embedding, passages) in zip(files, results):
+                    f.set_embedding(embedding)
+                    f.set_passages(passages)
+                File.objects.bulk_update(files, ["embedding", "passage_embeddings", "embedding_version"])
+                # bulk_update não dispara signals: recarrega os índices das empresas afetadas
+                self.bump_companies([f.id for f in files])
+
+                # chunks saem em ordem: tudo até este id já foi gravado
+                self.write_checkpoint(options["checkpoint"], files[-1].id, options)
+                done += len(files)
+
+                elapsed = time.monotonic() - start
+                rate = done / elapsed
+                eta = (total - done) / rate if rate else 0
+                self.stdout.write(f"{done}/{total} arquivos ({rate:.1f} arq/s, ETA {eta / 60:.1f} min)")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if os.path.exists(options["checkpoint"]):
+            os.remove(options["checkpoint"])
+
+        self.stdout.write(self.style.SUCCESS(f"Embeddings recalculadas: {done}"))
+
+    def bump_companies(self, file_ids: list):
+        companies = (
+            FileCandidate.objects
+            .filter(file_id__in=file_ids)
+            .values_list("candidate__user_creator__company_id", flat=True)
+            .distinct()
+        )
+        for company_id in set(companies):
+            bump_corpus_version(company_id)
+
+    def encoded(self, chunks: list, pool, options):
+        """
+        (arquivos, [(embedding, trechos), ...]) de cada chunk, em ordem.
+        Com pool, mantém `workers` chunks sendo codificados enquanto grava os anteriores.
+        """
+        def load(chunk_ids):
+            return list(File.objects.filter(id__in=chunk_ids).order_by("id").only("id", "full_text"))
+
+        if pool is None:
+            for chunk_ids in chunks:
+                files = load(chunk_ids)
+                yield files, encode_chunk([f.full_text for f in files], options["batch_size"])
+            return
+
+        pending = []
+        for chunk_ids in chunks:
+            files = load(chunk_ids)
+            pending.append((files, pool.submit(encode_chunk, [f.full_text for f in files], options["batch_size"])))
+            if len(pending) >= options["workers"]:
+                files, future = pending.pop(0)
+                yield files, future.result()
+        for files, future in pending:
+            yield files, future.result()
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import numpy as np
+
+
+def json_to_binary(apps, schema_editor):
+    """Converte as embeddings em lista JSON para bytes float32."""
+    File = apps.get_model("rh", "File")
+
+    batch = []
+    for f in File.objects.filter(embedding__isnull=False).only("id", "embedding").iterator(chunk_size=500):
+        if not f.embedding:
+            continue
+        f.embedding_f32 = np.asarray(f.embedding, dtype=np.float32).tobytes()
+        batch.append(f)
+        if len(batch) >= 500:
+            File.objects.bulk_update(batch, ["embedding_f32"])
+            batch = []
+
+    if batch:
+        File.objects.bulk_update(batch, ["embedding_f32"])
+
+
+def binary_to_json(apps, schema_editor):
+    """Volta as embeddings binárias para lista JSON."""
+    File = apps.get_model("rh", "File")
+
+    batch = []
+    for f in File.objects.filter(embedding_f32__isnull=False).only("id", "embedding_f32").iterator(chunk_size=500):
+        f.embedding = np.frombuffer(f.embedding_f32, dtype=np.float32).tolist()
+        batch.append(f)
+        if len(batch) >= 500:
+            File.objects.bulk_update(batch, ["embedding"])
+            batch = []
+
+    if batch:
+        File.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rh", "0002_file_embedding_file_full_text_file_word_cloud"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="file",
+            name="embedding_f32",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name="file",
+            name="embedding",
+        ),
+        migrations.RenameField(
+            model_name="file",
+            old_name="embedding_f32",
+            new_name="embedding",
+        ),
+    ]
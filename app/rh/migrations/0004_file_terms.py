@@ -0,0 +1,66 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:23
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import migrations, models
+
+# Cópia congelada do tokenizador de common/keyword_index.py na época desta
+# migração: mudanças futuras no tokenizador não alteram o que ela gera.
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset(
+    "a o e de da do das dos em no na nos nas um uma para por com sem que se "
+    "ao aos as os ou the and of in to for with on at".split()
+)
+
+
+def fold(text):
+    if not text or not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+def term_counts(full_text, word_cloud=None):
+    tokens = tokenize(full_text)
+    for entity in word_cloud or []:
+        tokens.extend(tokenize(entity))
+    return dict(Counter(tokens))
+
+
+def fill_terms(apps, schema_editor):
+    """Tokeniza os arquivos já processados para o índice BM25."""
+    File = apps.get_model("rh", "File")
+
+    batch = []
+    for f in File.objects.filter(full_text__isnull=False).only("id", "full_text", "word_cloud").iterator(chunk_size=500):
+        f.terms = term_counts(f.full_text, f.word_cloud)
+        batch.append(f)
+        if len(batch) >= 500:
+            File.objects.bulk_update(batch, ["terms"])
+            batch = []
+    if batch:
+        File.objects.bulk_update(batch, ["terms"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0003_file_embedding_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='terms',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_terms, migrations.RunPython.noop),
+    ]
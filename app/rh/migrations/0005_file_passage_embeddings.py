@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0004_file_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='passage_embeddings',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
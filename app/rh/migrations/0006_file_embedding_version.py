@@ -0,0 +1,28 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+# embeddings existentes foram geradas pelo all-MiniLM-L6-v2 (backend torch) com o texto completo;
+# mesmo valor que common.embedding.EMBEDDING_VERSION grava hoje para esses vetores
+INITIAL_VERSION = "all-MiniLM-L6-v2:torch:p1"
+
+
+def tag_existing(apps, schema_editor):
+    File = apps.get_model("rh", "File")
+    File.objects.filter(embedding__isnull=False).update(embedding_version=INITIAL_VERSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0005_file_passage_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='embedding_version',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(tag_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0006_file_embedding_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='pages_read',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='text_truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
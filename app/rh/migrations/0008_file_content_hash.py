@@ -0,0 +1,52 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:52
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    """
+    Calcula o hash dos arquivos já enviados que ainda estão em disco.
+    Uploads com o mesmo nome sobrescrevem o arquivo: só o registro mais
+    recente de cada nome (e de cada conteúdo) recebe o hash.
+    """
+    File = apps.get_model("rh", "File")
+
+    names, seen = set(), set()
+    for f in File.objects.filter(processed=True).only("id", "name").order_by("-id").iterator(chunk_size=500):
+        path = os.path.join(settings.MEDIA_ROOT, "uploads", f.name)
+        if f.name in names or not os.path.exists(path):
+            continue
+        names.add(f.name)
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        if digest.hexdigest() in seen:
+            continue
+        seen.add(digest.hexdigest())
+        File.objects.filter(id=f.id).update(content_hash=digest.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0007_file_pages_read_text_truncated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='extracted_info',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
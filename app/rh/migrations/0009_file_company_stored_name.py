@@ -0,0 +1,57 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_company(apps, schema_editor):
+    """
+    Arquivos já com content_hash passam a pertencer à empresa dos candidatos
+    ligados a eles. Os ligados a mais de uma empresa (ou a nenhuma) perdem o
+    content_hash: sem empresa, não são reaproveitados por nenhum upload.
+    Os arquivos em disco continuam com o nome antigo (stored_name vazio).
+    """
+    File = apps.get_model("rh", "File")
+    FileCandidate = apps.get_model("company", "FileCandidate")
+
+    for file_id in File.objects.filter(content_hash__isnull=False).values_list("id", flat=True).iterator(chunk_size=500):
+        companies = set(
+            FileCandidate.objects
+            .filter(file_id=file_id)
+            .values_list("candidate__user_creator__company_id", flat=True)
+        )
+        if len(companies) == 1 and None not in companies:
+            File.objects.filter(id=file_id).update(company_id=companies.pop())
+        else:
+            File.objects.filter(id=file_id).update(content_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_candidate_years_experience_null'),
+        ('rh', '0008_file_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploaded_files', to='company.company'),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='stored_name',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='file',
+            constraint=models.UniqueConstraint(fields=('company', 'content_hash'), name='rh_file_company_content_hash'),
+        ),
+        migrations.RunPython(fill_company, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+# bancos que já rodaram a 0006 com a versão sem o backend: os vetores são os
+# mesmos do torch, só muda a etiqueta (sem reembed)
+LEGACY_VERSION = "all-MiniLM-L6-v2:p1"
+INITIAL_VERSION = "all-MiniLM-L6-v2:torch:p1"
+
+
+def retag(apps, schema_editor):
+    File = apps.get_model("rh", "File")
+    File.objects.filter(embedding_version=LEGACY_VERSION).update(embedding_version=INITIAL_VERSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0009_file_company_stored_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(retag, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,20 @@
 from django.db import models
 from django.utils import timezone
+import logging
 import os
+import time
 
 from project import settings
 from rh.pdf_extractor import PDFExtractor
 
 # Common
-from common.embedding import create_embedding
+from common.embedding import (
+    EMBEDDING_VERSION, create_document_embeddings, vector_to_bytes, vector_from_bytes,
+    matrix_to_bytes, matrix_from_bytes,
+)
+from common.keyword_index import term_counts
+
+logger = logging.getLogger(__name__)
 
 class File(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -20,8 +28,44 @@ class File(models.Model):
     # word_cloud AGORA vai guardar as entities extraídas
     word_cloud = models.JSONField(blank=True, null=True)
 
-    # vetor de embedding (lista de floats)
-    embedding = models.JSONField(null=True, blank=True)
+    # vetor de embedding (bytes float32, lido com np.frombuffer)
+    embedding = models.BinaryField(null=True, blank=True)
+
+    # embeddings dos trechos do currículo (bytes float16, P x 384)
+    passage_embeddings = models.BinaryField(null=True, blank=True)
+
+    # modelo/pré-processamento que gerou embedding e trechos (common.embedding.EMBEDDING_VERSION)
+    embedding_version = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+
+    # {termo: frequência} de full_text + word_cloud, para a busca BM25
+    terms = models.JSONField(blank=True, null=True)
+
+    # páginas do PDF lidas e se o texto foi cortado pelos limites (PDF_MAX_PAGES / PDF_MAX_CHARS)
+    pages_read = models.PositiveIntegerField(null=True, blank=True)
+    text_truncated = models.BooleanField(default=False)
+
+    # SHA-256 do conteúdo: o mesmo PDF enviado de novo pela mesma empresa reaproveita este registro
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+
+    # empresa de quem enviou: o reaproveitamento por content_hash não cruza empresas
+    company = models.ForeignKey(
+        "company.Company",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="uploaded_files",
+    )
+
+    # nome em MEDIA_ROOT/uploads (<content_hash><extensão>); vazio nos uploads antigos, gravados pelo `name`
+    stored_name = models.CharField(max_length=100, null=True, blank=True)
+
+    # resultado da extração (regras + GPT) devolvido no upload, guardado para reuso
+    extracted_info = models.JSONField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["company", "content_hash"], name="rh_file_company_content_hash"),
+        ]
 
     def mark_processed(self):
         """Marca o arquivo como processado."""
@@ -36,6 +80,30 @@ class File(models.Model):
         """Retorna o tamanho do arquivo em MB."""
         return self.size_mb
 
+    @property
+    def embedding_vector(self):
+        """Retorna a embedding como np.ndarray float32 (sem cópia) ou None."""
+        return vector_from_bytes(self.embedding)
+
+    def set_embedding(self, vec, version: str = EMBEDDING_VERSION):
+        """Define a embedding a partir de um vetor/lista de floats (e a versão que a gerou)."""
+        self.embedding = vector_to_bytes(vec)
+        self.embedding_version = version
+
+    @property
+    def current_embedding(self):
+        """Bytes da embedding se ela é da versão atual; None se é de outro modelo (ou não existe)."""
+        return self.embedding if self.embedding_version == EMBEDDING_VERSION else None
+
+    @property
+    def passage_vectors(self):
+        """Embeddings dos trechos como matriz float32 (P, 384); (0, 384) se não houver."""
+        return matrix_from_bytes(self.passage_embeddings)
+
+    def set_passages(self, matrix):
+        """Define as embeddings dos trechos (vazio -> None)."""
+        self.passage_embeddings = matrix_to_bytes(matrix) if len(matrix) else None
+
     def rename(self, new_name: str):
         """Renomeia o arquivo."""
         self.name = new_name
@@ -59,8 +127,13 @@ class File(models.Model):
             "extension": os.path.splitext(file_path)[1],
             "processed_at": timezone.now().isoformat(),
             "pdf_with_text": extractor.pdf_with_text(),
+            "pages_read": extractor.pages_read,
+            "truncated": extractor.truncated,
         }
 
+        self.pages_read = extractor.pages_read
+        self.text_truncated = extractor.truncated
+
         if data["pdf_with_text"]:
             # Informações gerais (currículo)
             info = extractor.extract_resume_info()
@@ -76,18 +149,28 @@ class File(models.Model):
             # Texto completo
             self.full_text = extractor.text
 
-            # Embedding a partir do texto completo
-            self.embedding = create_embedding(self.full_text)
+            # Termos para a busca por palavra-chave (tokenizados uma vez aqui)
+            self.terms = term_counts(self.full_text, entities)
+
+            # Embedding do texto completo + dos trechos (currículos longos), num lote só
+            start = time.perf_counter()
+            embedding, passages = create_document_embeddings(self.full_text)
+            extractor.timings["embedding_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.set_embedding(embedding)
+            self.set_passages(passages)
 
             # marca como processado
             self.processed = True
             self.save()
 
+        # tempos por etapa: texto do PDF, carga do spaCy, NER, campos, embedding
+        data["timings"] = extractor.timings
+        logger.info("arquivo %s processado: %s", self.id, extractor.timings)
         return data
 
     @property
     def download_url(self):
-        return f"{settings.BASE_URL}/media/uploads/{self.name}"
+        return f"{settings.BASE_URL}/media/uploads/{self.stored_name or self.name}"
 
 
 class Certificate(File):
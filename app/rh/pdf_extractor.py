@@ -1,21 +1,171 @@
+import logging
 import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
 from PyPDF2 import PdfReader
-import spacy
+
+from project import settings
+from common.model_loader import get_spacy_model
+from common.model_server import get_client
+from rh.field_scanner import FieldScanner
+
+logger = logging.getLogger(__name__)
+
+# mesma interface de spacy.tokens.Span usada aqui (ent.text / ent.label_)
+Entity = namedtuple("Entity", ["text", "label_"])
+
+# texto lido do PDF + quantas páginas foram lidas e se parou antes do fim
+PDFText = namedtuple("PDFText", ["text", "pages_read", "truncated"])
+
+
+def iter_pdf_pages(reader: PdfReader, max_pages: int = None):
+    """Gera o texto de cada página, uma por vez, até `max_pages` páginas."""
+    for i, page in enumerate(reader.pages):
+        if max_pages is not None and i >= max_pages:
+            return
+        yield page.extract_text() or ""
+
+
+def read_pdf_text(file_path, max_pages: int = None, max_chars: int = None) -> PDFText:
+    """
+    Lê o PDF página a página e junta o texto uma vez só no final.
+    Para ao atingir `max_pages` (PDF_MAX_PAGES) páginas ou `max_chars`
+    (PDF_MAX_CHARS) caracteres: um portfólio de 300 páginas não segura o worker
+    e o currículo em si quase sempre está nas primeiras páginas.
+    """
+    max_pages = max_pages or settings.PDF_MAX_PAGES
+    max_chars = max_chars or settings.PDF_MAX_CHARS
+
+    reader = PdfReader(file_path)
+    pages, chars = [], 0
+    truncated = len(reader.pages) > max_pages
+    for text in iter_pdf_pages(reader, max_pages):
+        if chars + len(text) > max_chars:
+            pages.append(text[:max_chars - chars])
+            truncated = True
+            break
+        pages.append(text)
+        chars += len(text)
+
+    return PDFText("".join(pages).strip(), len(pages), truncated)
+
+
+def extract_pdf_text(file_path) -> str:
+    """Texto do PDF (até PDF_MAX_PAGES páginas / PDF_MAX_CHARS caracteres)."""
+    return read_pdf_text(file_path).text
+
+
+def _read_pdf_text_safe(file_path) -> PDFText:
+    """read_pdf_text para o pool: um PDF corrompido não derruba o lote."""
+    try:
+        return read_pdf_text(file_path)
+    except Exception as e:
+        logger.warning("falha ao ler %s: %s", file_path, e)
+        return PDFText("", 0, False)
+
+
+def extract_entities_batch(texts: list, batch_size: int = None, n_process: int = None) -> list:
+    """
+    NER de vários textos: [[Entity, ...], ...] na mesma ordem.
+    Pelo servidor de modelos, se houver; senão nlp.pipe em lotes
+    (e em `n_process` processos) em vez de um nlp(texto) por arquivo.
+    """
+    client = get_client()
+    if client is not None:
+        try:
+            return [[Entity(*e) for e in ents] for ents in client.ner(texts)]
+        except (OSError, RuntimeError) as e:
+            logger.warning("model server indisponível (%s), usando spaCy local", e)
+
+    docs = get_spacy_model().pipe(
+        texts,
+        batch_size=batch_size or settings.RESUME_NLP_BATCH_SIZE,
+        n_process=n_process or settings.RESUME_NLP_PROCESSES,
+    )
+    return [[Entity(ent.text, ent.label_) for ent in doc.ents] for doc in docs]
+
+
+def extract_resumes(file_paths: list, workers: int = None, batch_size: int = None,
+                    n_process: int = None) -> list:
+    """
+    Versão em lote de PDFExtractor(path).extract_resume_info() para importações:
+    - texto dos PDFs num pool de `workers` processos (RESUME_PDF_WORKERS)
+    - NER de todos os textos com nlp.pipe (extract_entities_batch)
+    Retorna um PDFExtractor por arquivo, na ordem de `file_paths`, já com
+    texto e entidades (extract_resume_info() não roda o spaCy de novo).
+    """
+    file_paths = list(file_paths)
+    workers = workers or settings.RESUME_PDF_WORKERS
+
+    start = time.perf_counter()
+    if workers > 1 and len(file_paths) > 1:
+        with ProcessPoolExecutor(min(workers, len(file_paths))) as pool:
+            pdfs = list(pool.map(_read_pdf_text_safe, file_paths, chunksize=4))
+    else:
+        pdfs = [_read_pdf_text_safe(p) for p in file_paths]
+    text_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    ents = extract_entities_batch([pdf.text for pdf in pdfs], batch_size=batch_size, n_process=n_process)
+    ner_ms = (time.perf_counter() - start) * 1000
+
+    extractors = []
+    for path, pdf, doc_ents in zip(file_paths, pdfs, ents):
+        extractor = PDFExtractor(path, pdf=pdf, ents=doc_ents)
+        # tempo do lote dividido entre os arquivos
+        extractor.timings.update(
+            text_ms=round(text_ms / len(file_paths), 2),
+            ner_ms=round(ner_ms / len(file_paths), 2),
+        )
+        extractors.append(extractor)
+    return extractors
 
 
 class PDFExtractor:
-    def __init__(self, file_path):
+    def __init__(self, file_path, pdf: PDFText = None, ents: list = None):
+        """`pdf` / `ents` já calculados (extract_resumes) pulam a leitura do PDF / o NER."""
         self.file_path = file_path
-        self.text = self._extract_text()
-        self.nlp = spacy.load("pt_core_news_sm")
-        self.doc = self.nlp(self.text)
-
-    def _extract_text(self) -> str:
-        reader = PdfReader(self.file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text.strip()
+        # tempo de cada etapa (ms) do processamento deste arquivo
+        self.timings = {}
+
+        start = time.perf_counter()
+        pdf = self._extract_text() if pdf is None else pdf
+        self.text = pdf.text
+        # páginas lidas e se o texto foi cortado (PDF_MAX_PAGES / PDF_MAX_CHARS)
+        self.pages_read = pdf.pages_read
+        self.truncated = pdf.truncated
+        self.timings["text_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        start = time.perf_counter()
+        self.ents = self._extract_ents() if ents is None else ents
+        self.timings["ner_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _extract_ents(self) -> list:
+        """NER pelo servidor de modelos, se houver; senão spaCy no processo."""
+        client = get_client()
+        if client is not None:
+            try:
+                return [Entity(*e) for e in client.ner([self.text])[0]]
+            except (OSError, RuntimeError) as e:
+                logger.warning("model server indisponível (%s), usando spaCy local", e)
+
+        start = time.perf_counter()
+        nlp = get_spacy_model()
+        # > 0 só na primeira chamada do processo (carregamento do modelo)
+        self.timings["model_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        doc = nlp(self.text)
+        return [Entity(ent.text, ent.label_) for ent in doc.ents]
+
+    @cached_property
+    def scanner(self) -> FieldScanner:
+        """Campos por regex do texto (padrões compilados, texto em minúsculas uma vez só)."""
+        return FieldScanner(self.text)
+
+    def _extract_text(self) -> PDFText:
+        return read_pdf_text(self.file_path)
 
     def pdf_with_text(self) -> bool:
         return len(self.text) > 0
@@ -25,15 +175,13 @@ class PDFExtractor:
     # -------------------------
 
     def extract_entities(self):
-        return [ent.text for ent in self.doc.ents]
+        return [ent.text for ent in self.ents]
 
     def extract_email(self):
-        matches = re.findall(r"[\w\.-]+@[\w\.-]+\.\w+", self.text)
-        return matches[0] if matches else None
+        return self.scanner.email
 
     def extract_phone(self):
-        match = re.findall(r"(\(?\d{2}\)?\s?\d{4,5}[-.\s]?\d{4})", self.text)
-        return match[0] if match else None
+        return self.scanner.phone
 
     def extract_name(self):
         lines = [l.strip() for l in self.text.splitlines() if l.strip()]
@@ -73,7 +221,7 @@ class PDFExtractor:
         # ---------------------------------------
         persons = [
             ent.text.strip()
-            for ent in self.doc.ents
+            for ent in self.ents
             if ent.label_ == "PER"
         ]
 
@@ -108,56 +256,31 @@ class PDFExtractor:
         """
         Procura padrões como '28 anos', 'Idade: 32', etc.
         """
-        match = re.search(r"(\d{2})\s*anos", self.text.lower())
-        return int(match.group(1)) if match else None
+        return self.scanner.age
 
     def extract_years_experience(self):
         """
         Procura padrões: '5 anos de experiência', 'experiência: 10 anos', etc.
         """
-        match = re.search(
-            r"(\d{1,2})\s*(anos de experiência|anos experiência|anos exp)",
-            self.text.lower(),
-        )
-        return int(match.group(1)) if match else None
+        return self.scanner.years_experience
 
     def extract_current_position(self):
         """
         Tenta achar o cargo atual com heurística baseada em palavras-chave.
         """
-        patterns = [
-            r"cargo atual[:\- ]*(.+)",
-            r"posição atual[:\- ]*(.+)",
-            r"atualmente em[:\- ]*(.+)",
-            r"atual[:\- ]*(.+)",
-        ]
-        for pat in patterns:
-            match = re.search(pat, self.text, flags=re.IGNORECASE)
-            if match:
-                # pega só a primeira frase
-                pos = match.group(1).split("\n")[0]
-                return pos.strip()
-        return None
+        return self.scanner.current_position
 
     def extract_skills(self):
         """
         Procura seção 'Habilidades', 'Skills', etc.
         """
-        skills_block = re.search(
-            r"(habilidades|skills)[:\- ]*(.+?)(\n\n|\Z)",
-            self.text,
-            flags=re.IGNORECASE | re.DOTALL
-        )
-        if skills_block:
-            items = re.split(r"[,•\n]", skills_block.group(2))
-            return [i.strip() for i in items if len(i.strip()) > 1]
-        return []
+        return self.scanner.skills
 
     def extract_companies(self):
         """
         Lista empresas detectadas pelo spaCy (ORG).
         """
-        return list({ent.text for ent in self.doc.ents if ent.label_ == "ORG"})
+        return list({ent.text for ent in self.ents if ent.label_ == "ORG"})
 
     def extract_location(self):
         """
@@ -170,39 +293,17 @@ class PDFExtractor:
         E depois tenta spaCy (LOC/GPE).
         """
 
-        # -------------------------
-        # 1) padrões clássicos "Cidade - UF", "Cidade/UF", "Cidade, UF"
-        # -------------------------
-        patterns = [
-            r"([A-ZÁ-Úa-zá-ú\s]+)[\-\/,\s]+(SP|RJ|MG|ES|RS|SC|PR|BA|PE|CE|GO|DF|AM|PA|PB|RN|SE|MT|MS|RO|RR|AC|AP|MA|TO)",
-        ]
-
-        for pat in patterns:
-            match = re.search(pat, self.text)
-            if match:
-                cidade = match.group(1).strip()
-                uf = match.group(2).strip()
-                return f"{cidade} - {uf}"
-
-        # -------------------------
-        # 2) Lista básica de cidades do Brasil (curta, mas útil)
-        # -------------------------
-        cidades = [
-            "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Curitiba",
-            "Salvador", "Fortaleza", "Recife", "Porto Alegre", "Manaus", "Belém",
-            "Goiânia", "Campinas", "Florianópolis", "Vitória", "São Luís"
-        ]
-
-        for cidade in cidades:
-            if cidade.lower() in self.text.lower():
-                return cidade
+        # 1) padrões "Cidade - UF" e 2) lista de cidades (rh.field_scanner)
+        location = self.scanner.location
+        if location:
+            return location
 
         # -------------------------
         # 3) spaCy fallback (LOC/GPE)
         # -------------------------
         locs = [
             ent.text.strip()
-            for ent in self.doc.ents
+            for ent in self.ents
             if ent.label_ in ("LOC", "GPE")
         ]
 
@@ -313,6 +414,7 @@ class PDFExtractor:
     # -------------------------
 
     def extract_resume_info(self):
+        start = time.perf_counter()
         data =  {
             "nome": self.extract_name(),
             "email": self.extract_email(),
@@ -326,4 +428,5 @@ class PDFExtractor:
         }
 
         data["resumo"] = self.profile_summary(data)
+        self.timings["fields_ms"] = round((time.perf_counter() - start) * 1000, 2)
         return data
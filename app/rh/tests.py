@@ -1,15 +1,28 @@
+import hashlib
+import json
 import os
-from io import BytesIO
+import tempfile
+from io import BytesIO, StringIO
 from unittest.mock import patch, MagicMock
 
 from django.urls import reverse
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
 
 from rest_framework.test import APITestCase
+import numpy as np
 
 from rh.models import File
+from rh.field_scanner import FieldScanner
+from rh.pdf_extractor import PDFExtractor, PDFText, extract_resumes, read_pdf_text
+from common.model_loader import prune_pipeline
+from common.embedding import EMBEDDING_VERSION
 from access.factories import UserFactory, TokenFactory
+from ai.search import corpus_version
+from company.factories import CandidateFactory
+from company.models import Company, FileCandidate
 
 
 class FileViewSetTest(APITestCase):
@@ -112,8 +125,385 @@ class FileViewSetTest(APITestCase):
         url = reverse("file-upload")
         self.client.post(url, {"file": pdf}, **self.token_header)
 
-        path = "uploads/test.pdf"
+        # gravado pelo conteúdo, não pelo nome enviado
+        path = f"uploads/{hashlib.sha256(b'%PDF-1.4').hexdigest()}.pdf"
         self.assertTrue(os.path.exists(path))
 
         os.remove(path)
 
+
+    @patch("rh.views.GPTClient")
+    @patch("rh.models.PDFExtractor")
+    def test_upload_same_content_is_deduplicated(self, mock_extractor, mock_gpt):
+        content = b"%PDF-1.4 mesmo curriculo"
+        extracted = {"info": {"nome": "Miguel"}, "entities": []}
+        self._join_company()
+        existing = File.objects.create(
+            name="antigo.pdf",
+            size_mb=0.1,
+            date_upload=timezone.now(),
+            processed=True,
+            content_hash=hashlib.sha256(content).hexdigest(),
+            extracted_info=extracted,
+            company=self.user.company,
+        )
+
+        pdf = SimpleUploadedFile("novo.pdf", content, content_type="application/pdf")
+        with tempfile.TemporaryDirectory() as media, patch("rh.views.settings.MEDIA_ROOT", media):
+            res = self.client.post(reverse("file-upload"), {"file": pdf}, **self.token_header)
+            # o arquivo temporário do upload repetido é descartado
+            self.assertEqual(os.listdir(os.path.join(media, "uploads")), [])
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.data["deduplicated"])
+        self.assertEqual(res.data["file"]["id"], existing.id)
+        self.assertEqual(res.data["file"]["extracted_info"], extracted)
+        self.assertEqual(File.objects.count(), 1)
+        mock_extractor.assert_not_called()
+        mock_gpt.assert_not_called()
+
+    def _join_company(self):
+        """Autentica o usuário numa empresa (o reaproveitamento é por empresa)."""
+        self.user.company = Company.objects.create(name="ACME", cnpj="99.888.777/0001-66", user_creator=self.user)
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, name, content, media):
+        pdf = SimpleUploadedFile(name, content, content_type="application/pdf")
+        with patch("rh.views.settings.MEDIA_ROOT", media):
+            return self.client.post(reverse("file-upload"), {"file": pdf}, **self.token_header)
+
+    def _mock_processing(self, mock_extractor, mock_gpt):
+        info = dict.fromkeys(
+            ["nome", "email", "telefone", "cargo_atual", "habilidades", "resumo", "anos_experiencia", "location"], ""
+        )
+        mock_extractor.return_value = MagicMock(
+            text="python django", pages_read=1, truncated=False, timings={},
+            pdf_with_text=lambda: True, extract_resume_info=lambda: info, extract_entities=lambda: [],
+        )
+        mock_gpt.return_value.extract.return_value = {}
+
+    @patch("rh.models.create_document_embeddings", return_value=(np.ones(384), np.zeros((0, 384))))
+    @patch("rh.views.GPTClient")
+    @patch("rh.models.PDFExtractor")
+    def test_deduplication_does_not_cross_companies(self, mock_extractor, mock_gpt, _):
+        self._mock_processing(mock_extractor, mock_gpt)
+        content = b"%PDF-1.4 mesmo curriculo"
+        owner = UserFactory()
+        other = File.objects.create(
+            name="cv.pdf", size_mb=0.1, processed=True, extracted_info={"info": {}},
+            content_hash=hashlib.sha256(content).hexdigest(),
+            company=Company.objects.create(name="Outra", cnpj="11.222.333/0001-81", user_creator=owner),
+        )
+
+        with tempfile.TemporaryDirectory() as media:
+            res = self._upload("cv.pdf", content, media)
+
+        self.assertFalse(res.data["deduplicated"])
+        self.assertNotEqual(res.data["file"]["id"], other.id)
+        self.assertIsNone(File.objects.get(id=res.data["file"]["id"]).company_id)
+
+    @patch("rh.models.create_document_embeddings", return_value=(np.ones(384), np.zeros((0, 384))))
+    @patch("rh.views.GPTClient")
+    @patch("rh.models.PDFExtractor")
+    def test_upload_without_company_is_never_deduplicated(self, mock_extractor, mock_gpt, _):
+        self._mock_processing(mock_extractor, mock_gpt)
+        content = b"%PDF-1.4 sem empresa"
+        orphan = File.objects.create(
+            name="cv.pdf", size_mb=0.1, processed=True, extracted_info={"info": {"nome": "Outro"}},
+            content_hash=hashlib.sha256(content).hexdigest(),
+        )
+
+        with tempfile.TemporaryDirectory() as media:
+            first = self._upload("cv.pdf", content, media)
+            second = self._upload("cv.pdf", content, media)
+
+        self.assertFalse(first.data["deduplicated"] or second.data["deduplicated"])
+        self.assertNotIn(orphan.id, (first.data["file"]["id"], second.data["file"]["id"]))
+        self.assertIsNone(File.objects.get(id=second.data["file"]["id"]).content_hash)
+
+    @patch("rh.models.create_document_embeddings", return_value=(np.ones(384), np.zeros((0, 384))))
+    @patch("rh.views.GPTClient")
+    @patch("rh.models.PDFExtractor")
+    def test_resumed_upload_describes_new_file(self, mock_extractor, mock_gpt, _):
+        self._mock_processing(mock_extractor, mock_gpt)
+        content = b"%PDF-1.4 upload interrompido"
+        digest = hashlib.sha256(content).hexdigest()
+        self._join_company()
+        pending = File.objects.create(name="antigo.pdf", size_mb=9.0, content_hash=digest, company=self.user.company)
+
+        with tempfile.TemporaryDirectory() as media:
+            res = self._upload("novo.PDF", content, media)
+            self.assertEqual(os.listdir(os.path.join(media, "uploads")), [f"{digest}.pdf"])
+
+        pending.refresh_from_db()
+        self.assertEqual(res.data["file"]["id"], pending.id)
+        self.assertEqual((pending.name, pending.size_mb), ("novo.PDF", 0.0))
+        self.assertTrue(pending.download_url.endswith(f"/media/uploads/{digest}.pdf"))
+
+    @patch("rh.models.create_document_embeddings", return_value=(np.ones(384), np.zeros((0, 384))))
+    @patch("rh.views.GPTClient")
+    @patch("rh.models.PDFExtractor")
+    def test_same_name_uploads_do_not_overwrite(self, mock_extractor, mock_gpt, _):
+        self._mock_processing(mock_extractor, mock_gpt)
+
+        with tempfile.TemporaryDirectory() as media:
+            self._upload("cv.pdf", b"%PDF-1.4 primeiro", media)
+            self._upload("cv.pdf", b"%PDF-1.4 segundo", media)
+            stored = sorted(os.listdir(os.path.join(media, "uploads")))
+
+        self.assertEqual(stored, sorted(f.stored_name for f in File.objects.all()))
+        self.assertEqual(len(stored), 2)
+
+
+    def test_embedding_binary_roundtrip(self):
+        f = File.objects.create(name="emb.pdf", size_mb=0.1)
+        vec = np.linspace(-1, 1, 384, dtype=np.float32)
+
+        f.set_embedding(vec)
+        f.save()
+        f.refresh_from_db()
+
+        self.assertEqual(len(bytes(f.embedding)), 384 * 4)
+        self.assertEqual(f.embedding_vector.dtype, np.float32)
+        np.testing.assert_array_equal(f.embedding_vector, vec)
+
+
+class ReembedCommandTest(TestCase):
+
+    def setUp(self):
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        self.old = File.objects.create(name="old.pdf", size_mb=0.1, full_text="python django")
+        self.old.set_embedding(np.ones(384), version="modelo-antigo:p0")
+        self.old.save()
+        self.current = File.objects.create(name="new.pdf", size_mb=0.1, full_text="java spring")
+        self.current.set_embedding(np.ones(384))
+        self.current.save()
+
+    def _run(self, *args):
+        out = StringIO()
+        with patch("rh.management.commands.reembed.create_embeddings",
+                   side_effect=lambda texts, **kw: np.full((len(texts), 384), 0.5, dtype=np.float32)):
+            call_command("reembed", "--checkpoint", self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_only_stale_versions_are_reembedded(self):
+        output = self._run()
+
+        self.old.refresh_from_db()
+        self.current.refresh_from_db()
+        self.assertIn("1 arquivos para a versão", output)
+        self.assertEqual(self.old.embedding_version, EMBEDDING_VERSION)
+        self.assertEqual(float(self.old.embedding_vector[0]), 0.5)
+        self.assertEqual(float(self.current.embedding_vector[0]), 1.0)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_after_checkpoint(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump({"version": EMBEDDING_VERSION, "all": True, "last_id": self.old.id}, f)
+
+        output = self._run("--all")
+
+        self.old.refresh_from_db()
+        self.assertIn("retomando", output)
+        self.assertEqual(self.old.embedding_version, "modelo-antigo:p0")
+
+    def test_bumps_only_companies_of_reembedded_files(self):
+        def link(f, cnpj):
+            owner = UserFactory()
+            owner.company = Company.objects.create(name=cnpj, cnpj=cnpj, user_creator=owner)
+            owner.save()
+            FileCandidate.objects.create(candidate=CandidateFactory(user_creator=owner), file=f)
+            return owner.company_id
+
+        stale, current = link(self.old, "11.222.333/0001-81"), link(self.current, "44.555.666/0001-72")
+        before = corpus_version(stale), corpus_version(current)
+
+        self._run("--chunk", "1")
+
+        self.assertEqual(corpus_version(stale), before[0] + 1)
+        self.assertEqual(corpus_version(current), before[1])
+
+
+class SpacyPipelineTest(SimpleTestCase):
+
+    def _pipeline(self, listener: bool):
+        import spacy
+        nlp = spacy.blank("pt")
+        nlp.add_pipe("tok2vec")
+        config = {}
+        if listener:
+            config = {"model": {
+                "@architectures": "spacy.TransitionBasedParser.v2",
+                "state_type": "ner",
+                "extra_state_tokens": False,
+                "hidden_width": 64,
+                "maxout_pieces": 2,
+                "use_upper": True,
+                "tok2vec": {"@architectures": "spacy.Tok2VecListener.v1", "width": 96, "upstream": "*"},
+            }}
+        nlp.add_pipe("ner", config=config)
+        nlp.add_pipe("sentencizer")
+        return nlp
+
+    def test_keeps_tok2vec_that_ner_listens_to(self):
+        nlp = prune_pipeline(self._pipeline(listener=True))
+
+        self.assertEqual(nlp.pipe_names, ["tok2vec", "ner"])
+
+    def test_drops_everything_but_ner(self):
+        nlp = prune_pipeline(self._pipeline(listener=False))
+
+        self.assertEqual(nlp.pipe_names, ["ner"])
+
+    def test_model_is_loaded_once_per_process(self):
+        nlp = MagicMock()
+        nlp.return_value.ents = []
+        with patch("common.model_loader._models", {}), \
+                patch("spacy.load", return_value=nlp) as load, \
+                patch("common.model_loader.prune_pipeline", side_effect=lambda n, c: n), \
+                patch("rh.pdf_extractor.read_pdf_text", return_value=PDFText("Maria Silva", 1, False)):
+            first = PDFExtractor("a.pdf")
+            second = PDFExtractor("b.pdf")
+
+        load.assert_called_once()
+        self.assertIn("ner_ms", first.timings)
+        self.assertLess(second.timings["model_ms"], 50)
+
+
+class FakeNLP:
+    """nlp do spaCy de mentira: toda palavra capitalizada vira uma entidade PER."""
+
+    def __init__(self):
+        self.pipe_calls = 0
+
+    def __call__(self, text):
+        return MagicMock(ents=[MagicMock(text=w, label_="PER") for w in text.split() if w.istitle()])
+
+    def pipe(self, texts, batch_size=32, n_process=1):
+        self.pipe_calls += 1
+        return [self(t) for t in texts]
+
+
+class BatchExtractionTest(SimpleTestCase):
+
+    TEXTS = {
+        "a.pdf": "Maria Silva\nmaria@email.com\n30 anos\nHabilidades: Python, Django",
+        "b.pdf": "João Souza\nCuritiba/PR\n5 anos de experiência",
+        "c.pdf": "",
+    }
+
+    def test_batch_matches_per_file(self):
+        nlp = FakeNLP()
+        with patch("rh.pdf_extractor.get_spacy_model", return_value=nlp), \
+                patch("rh.pdf_extractor.read_pdf_text", side_effect=lambda p: PDFText(self.TEXTS[p], 1, False)):
+            single = [PDFExtractor(p).extract_resume_info() for p in self.TEXTS]
+            batch = extract_resumes(list(self.TEXTS), workers=1)
+
+        self.assertEqual(nlp.pipe_calls, 1)
+        self.assertEqual([e.extract_resume_info() for e in batch], single)
+        self.assertEqual(batch[0].extract_entities(), ["Maria", "Silva", "Habilidades:", "Python,", "Django"])
+        self.assertFalse(batch[2].pdf_with_text())
+
+
+class PDFTextLimitsTest(SimpleTestCase):
+
+    def _read(self, texts, **limits):
+        pages = [MagicMock(**{"extract_text.return_value": t}) for t in texts]
+        with patch("rh.pdf_extractor.PdfReader", return_value=MagicMock(pages=pages)):
+            return read_pdf_text("cv.pdf", **limits), pages
+
+    def test_reads_all_pages_within_limits(self):
+        pdf, _ = self._read(["Maria ", "Silva", None], max_pages=10, max_chars=100)
+
+        self.assertEqual(pdf, PDFText("Maria Silva", 3, False))
+
+    def test_page_cap_stops_reading(self):
+        pdf, pages = self._read(["a", "b", "c", "d"], max_pages=2, max_chars=100)
+
+        self.assertEqual(pdf, PDFText("ab", 2, True))
+        pages[2].extract_text.assert_not_called()
+
+    def test_char_cap_cuts_text(self):
+        pdf, pages = self._read(["abc", "def", "ghi"], max_pages=10, max_chars=5)
+
+        self.assertEqual(pdf, PDFText("abcde", 2, True))
+        pages[2].extract_text.assert_not_called()
+
+
+def legacy_fields(text: str) -> dict:
+    """Extratores do PDFExtractor antes do FieldScanner (referência para o teste)."""
+    import re
+
+    emails = re.findall(r"[\w\.-]+@[\w\.-]+\.\w+", text)
+    phones = re.findall(r"(\(?\d{2}\)?\s?\d{4,5}[-.\s]?\d{4})", text)
+    age = re.search(r"(\d{2})\s*anos", text.lower())
+    years = re.search(r"(\d{1,2})\s*(anos de experiência|anos experiência|anos exp)", text.lower())
+
+    position = None
+    for pat in [r"cargo atual[:\- ]*(.+)", r"posição atual[:\- ]*(.+)",
+                r"atualmente em[:\- ]*(.+)", r"atual[:\- ]*(.+)"]:
+        match = re.search(pat, text, flags=re.IGNORECASE)
+        if match:
+            position = match.group(1).split("\n")[0].strip()
+            break
+
+    skills = []
+    block = re.search(r"(habilidades|skills)[:\- ]*(.+?)(\n\n|\Z)", text, flags=re.IGNORECASE | re.DOTALL)
+    if block:
+        skills = [i.strip() for i in re.split(r"[,•\n]", block.group(2)) if len(i.strip()) > 1]
+
+    location = None
+    match = re.search(
+        r"([A-ZÁ-Úa-zá-ú\s]+)[\-\/,\s]+(SP|RJ|MG|ES|RS|SC|PR|BA|PE|CE|GO|DF|AM|PA|PB|RN|SE|MT|MS|RO|RR|AC|AP|MA|TO)",
+        text,
+    )
+    if match:
+        location = f"{match.group(1).strip()} - {match.group(2).strip()}"
+    else:
+        for cidade in ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Curitiba",
+                       "Salvador", "Fortaleza", "Recife", "Porto Alegre", "Manaus", "Belém",
+                       "Goiânia", "Campinas", "Florianópolis", "Vitória", "São Luís"]:
+            if cidade.lower() in text.lower():
+                location = cidade
+                break
+
+    return {
+        "email": emails[0] if emails else None,
+        "telefone": phones[0] if phones else None,
+        "idade": int(age.group(1)) if age else None,
+        "anos_experiencia": int(years.group(1)) if years else None,
+        "cargo_atual": position,
+        "habilidades": skills,
+        "location": location,
+    }
+
+
+class FieldScannerTest(SimpleTestCase):
+
+    CORPUS = [
+        "",
+        "Maria Silva\nmaria.silva@email.com / maria@outro.com.br\n(11) 98765-4321\n28 anos\n"
+        "Cargo atual: Engenheira de Software\nHabilidades: Python, Django, SQL\n\nFormação",
+        "JOÃO SOUZA\nCURITIBA\n10 anos de experiência em Java\nAtualmente em Empresa X - projetos\n"
+        "SKILLS • Java • Spring • Kafka",
+        "Ana Lima, 35 anos, 12 anos exp. Posição atual - Gerente\nrecife e salvador\n41 3333 4444",
+        "Pedro\nMora em Belo Horizonte MG\nexperiência: 3 anos experiência\natual: analista",
+        "Currículo\nİstanbul → porto alegre, vitória\nhabilidades:\nliderança\nexcel",
+        "Carlos 99 anos\nRua das Flores 123\n(21)912345678\nSkills - C#, C++, .NET",
+        "contato: a.b-c@d-e.org 5 anos de experiência e 40 anos de idade, brasília",
+        "Projetos. SP. Trabalhei em Recife SP e depois Natal RN, atual - consultor",
+        "Experiência em equipes ágeis. " * 200 + "Vitória/ES\nHabilidades: Go",
+    ]
+
+    def test_matches_legacy_extractors(self):
+        for text in self.CORPUS:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(FieldScanner(text).fields(), legacy_fields(text))
+
+    def test_extractor_uses_scanner(self):
+        extractor = PDFExtractor("cv.pdf", pdf=PDFText(self.CORPUS[1], 1, False), ents=[])
+
+        self.assertEqual(extractor.extract_email(), "maria.silva@email.com")
+        self.assertEqual(extractor.extract_location(), None)
+        self.assertEqual(extractor.extract_skills(), ["Python", "Django", "SQL"])
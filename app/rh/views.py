@@ -2,6 +2,7 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -14,7 +15,20 @@ from common.token import TokenValidator
 from common.response import ResponseDefault, NotFound, UnauthorizedRequest
 from external.gpt import GPTClient
 
+import hashlib
 import os
+import time
+import uuid
+
+
+def store_upload(uploaded_file, path: str) -> str:
+    """Grava o arquivo enviado em `path` chunk a chunk e devolve o SHA-256 do conteúdo."""
+    digest = hashlib.sha256()
+    with open(path, "wb+") as destination:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            destination.write(chunk)
+    return digest.hexdigest()
 
 
 class FileViewSet(viewsets.ModelViewSet):
@@ -67,29 +81,55 @@ class FileViewSet(viewsets.ModelViewSet):
 
         file_name = uploaded_file.name
         file_size_mb = round(uploaded_file.size / (1024 * 1024), 2)
+        company_id = getattr(request.user, "company_id", None)
 
-        # cria registro
-        file_obj = File.objects.create(
-            name=file_name,
-            size_mb=file_size_mb,
-            date_upload=timezone.now(),
-        )
-
-        # salva fisicamente
+        # salva fisicamente (num arquivo temporário), calculando o hash no caminho
         upload_dir = os.path.join(settings.MEDIA_ROOT, "uploads")
         os.makedirs(upload_dir, exist_ok=True)
 
-        file_path = os.path.join(upload_dir, file_name)
-
-        with open(file_path, "wb+") as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
+        tmp_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.part")
+        content_hash = store_upload(uploaded_file, tmp_path)
+
+        # mesmo conteúdo já processado para a empresa: reaproveita texto, entidades, embedding e extração
+        # (sem empresa não há reaproveitamento: o registro poderia ser de qualquer um)
+        file_obj = None
+        if company_id is not None:
+            file_obj = File.objects.filter(company_id=company_id, content_hash=content_hash).first()
+        if file_obj is not None and file_obj.processed and file_obj.extracted_info:
+            os.remove(tmp_path)
+            return self._upload_response(file_obj, file_obj.extracted_info, deduplicated=True)
+
+        # gravado pelo conteúdo: uploads com o mesmo nome não se sobrescrevem,
+        # e o mesmo conteúdo (de qualquer empresa) é sempre o mesmo arquivo
+        stored_name = f"{content_hash}{os.path.splitext(file_name)[1].lower()}"
+        file_path = os.path.join(upload_dir, stored_name)
+        os.replace(tmp_path, file_path)
+
+        # cria registro (ou retoma o de um upload anterior que não terminou)
+        if file_obj is None:
+            try:
+                with transaction.atomic():
+                    file_obj = File.objects.create(
+                        name=file_name,
+                        size_mb=file_size_mb,
+                        date_upload=timezone.now(),
+                        content_hash=content_hash if company_id is not None else None,
+                        company_id=company_id,
+                        stored_name=stored_name,
+                    )
+            except IntegrityError:
+                # upload simultâneo do mesmo conteúdo pela empresa (sem empresa não há hash nem conflito)
+                file_obj = File.objects.get(company_id=company_id, content_hash=content_hash)
+        # o registro retomado passa a descrever este upload
+        file_obj.name, file_obj.size_mb, file_obj.stored_name = file_name, file_size_mb, stored_name
 
         # processa arquivo
         extracted_info = file_obj.process_file(file_path)
 
         # GPT EXTRACTION
+        start = time.perf_counter()
         info_gpt = GPTClient().extract(file_obj.full_text)
+        extracted_info.setdefault("timings", {})["gpt_ms"] = round((time.perf_counter() - start) * 1000, 2)
         extracted_info["gpt_info"] = info_gpt
         extracted_info["info"]["nome"] = info_gpt.get("name", extracted_info["info"]["nome"])
         extracted_info["info"]["email"] = info_gpt.get("email", extracted_info["info"]["email"])
@@ -100,10 +140,14 @@ class FileViewSet(viewsets.ModelViewSet):
         extracted_info["info"]["anos_experiencia"] = info_gpt.get("years_experience", extracted_info["info"]["anos_experiencia"])
         extracted_info["info"]["location"] = info_gpt.get("location", extracted_info["info"]["location"])
         extracted_info["info"]["email"] = extracted_info["info"]["email"].replace(" ", "")
-        # marca como processado
+        # marca como processado e guarda a extração para os próximos uploads iguais
         file_obj.processed = True
+        file_obj.extracted_info = extracted_info
         file_obj.save()
 
+        return self._upload_response(file_obj, extracted_info, deduplicated=False)
+
+    def _upload_response(self, file_obj, extracted_info, deduplicated: bool):
         return ResponseDefault(
             message="Arquivo enviado e processado com sucesso.",
             data={
@@ -113,6 +157,7 @@ class FileViewSet(viewsets.ModelViewSet):
                     "size_mb": file_obj.size_mb,
                     "processed": file_obj.processed,
                     "extracted_info": extracted_info,
-                }
+                },
+                "deduplicated": deduplicated,
             }
         )